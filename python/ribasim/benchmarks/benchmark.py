@@ -0,0 +1,477 @@
+"""Benchmark the Python side of Ribasim on synthetic models of increasing size.
+
+Run all benchmarks, and compare them with a baseline report::
+
+    python python/ribasim/benchmarks/benchmark.py --compare baseline.json
+
+Store the report of the current checkout as the new baseline::
+
+    python python/ribasim/benchmarks/benchmark.py --output baseline.json
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from statistics import mean
+from time import perf_counter
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import ribasim
+from ribasim import Model, Node
+from ribasim.nodes import basin, tabulated_rating_curve
+from ribasim_testmodels import synthetic_network_model
+from shapely.geometry import Point
+
+# The number of Basins of the generated models, the number of nodes is about three times larger.
+SIZES = [100, 1_000, 10_000]
+# The number of nodes and links added in the add benchmarks.
+N_ADD = 100
+# The number of timesteps of the generated results.
+N_TIME = 10
+# The number of coupling steps of the BMI benchmarks.
+N_STEPS = 1_000
+# The variables a coupled model typically exchanges every step.
+BMI_VARIABLES = ["basin.storage", "basin.level", "basin.drainage", "basin.infiltration"]
+
+
+@dataclass
+class Measurement:
+    """The timing and memory use of one benchmark on one model size."""
+
+    benchmark: str
+    n_basins: int
+    n_nodes: int
+    time_min: float
+    time_mean: float
+    peak_memory: int
+
+
+@dataclass
+class Benchmark:
+    """An operation to time.
+
+    ``setup`` prepares the input for a single run of ``run``, and ``teardown``
+    cleans up after it, neither of which is timed.
+    """
+
+    name: str
+    setup: Callable[[Model, Path], Any]
+    run: Callable[[Any], Any]
+    max_n_basins: int | None = None
+    teardown: Callable[[Any], None] | None = None
+
+
+def _written(model: Model, directory: Path, name: str = "model") -> Path:
+    toml_path = directory / name / "ribasim.toml"
+    if not toml_path.is_file():
+        model.write(toml_path)
+    return toml_path
+
+
+def _with_results(model: Model, directory: Path, name: str = "model") -> Path:
+    """Write the model with results like the core writes them, for N_TIME days."""
+    toml_path = _written(model, directory, name)
+    results_dir = toml_path.parent / "results"
+    if results_dir.is_dir():
+        return toml_path
+    results_dir.mkdir()
+
+    rng = np.random.default_rng(0)
+    time = pd.date_range(model.starttime, periods=N_TIME, freq="D")
+    node_df = model.node_table().df
+    assert node_df is not None
+    basin_id = node_df.index[node_df["node_type"] == "Basin"].to_numpy()
+    basin_df = pd.DataFrame(
+        {
+            "time": np.repeat(time, len(basin_id)),
+            "node_id": np.tile(basin_id, N_TIME).astype(np.int32),
+        }
+    )
+    for column in [
+        "level",
+        "storage",
+        "inflow_rate",
+        "outflow_rate",
+        "storage_rate",
+        "precipitation",
+        "evaporation",
+        "drainage",
+        "infiltration",
+        "balance_error",
+        "relative_error",
+    ]:
+        basin_df[column] = rng.random(len(basin_df))
+    basin_df.to_feather(results_dir / "basin.arrow")
+
+    link_df = model.link.df
+    assert link_df is not None
+    link_df = link_df[link_df["link_type"] == "flow"]
+    n_link = len(link_df)
+    flow_df = pd.DataFrame(
+        {
+            "time": np.repeat(time, n_link),
+            "link_id": np.tile(link_df.index.to_numpy(), N_TIME).astype(np.int32),
+            "from_node_id": np.tile(link_df["from_node_id"].to_numpy(), N_TIME),
+            "to_node_id": np.tile(link_df["to_node_id"].to_numpy(), N_TIME),
+            "flow_rate": rng.random(n_link * N_TIME),
+        }
+    )
+    flow_df.to_feather(results_dir / "flow.arrow")
+    return toml_path
+
+
+def _add_nodes(model: Model) -> None:
+    x = model.basin.node.df.geometry.x.max() + 1000.0
+    for i in range(N_ADD):
+        model.basin.add(
+            Node(geometry=Point(x, i)),
+            [
+                basin.Profile(area=[1.0, 1000.0], level=[0.0, 1.0]),
+                basin.State(level=[1.0]),
+            ],
+        )
+
+
+def _setup_add_links(model: Model, directory: Path) -> tuple[Model, list[tuple]]:
+    model = model.model_copy(deep=True)
+    node_df = model.basin.node.df
+    assert node_df is not None
+    x = node_df.geometry.x.max() + 1000.0
+    pairs = []
+    for i, basin_id in enumerate(node_df.index[:N_ADD]):
+        rating_curve = model.tabulated_rating_curve.add(
+            Node(geometry=Point(x, i)),
+            [tabulated_rating_curve.Static(level=[0.0, 1.0], flow_rate=[0.0, 1.0])],
+        )
+        pairs.append((model.basin[int(basin_id)], rating_curve))
+    return model, pairs
+
+
+def _add_links(state: tuple[Model, list[tuple]]) -> None:
+    model, pairs = state
+    for from_node, to_node in pairs:
+        model.link.add(from_node, to_node)
+
+
+def _setup_basin_concentration(model: Model, directory: Path) -> Path:
+    """Write the model with a daily Basin / concentration table of four substances."""
+    toml_path = directory / "concentration" / "ribasim.toml"
+    if toml_path.is_file():
+        return toml_path
+    node_df = model.basin.node.df
+    assert node_df is not None
+    time = pd.date_range(model.starttime, periods=N_TIME, freq="D")
+    substances = ["Cl", "Tracer", "Continuity", "Initial"]
+    n = len(node_df) * N_TIME * len(substances)
+    model = model.model_copy(deep=True)
+    model.basin.concentration = basin.Concentration(
+        node_id=np.tile(node_df.index.to_numpy(), N_TIME * len(substances)),
+        time=np.tile(np.repeat(time, len(node_df)), len(substances)),
+        substance=np.repeat(substances, len(node_df) * N_TIME),
+        drainage=np.ones(n),
+        precipitation=np.ones(n),
+    )
+    model.write(toml_path)
+    return toml_path
+
+
+def _setup_delwaq(model: Model, directory: Path) -> Path:
+    # The Delwaq network simplification expects every UserDemand to return
+    # its water to its own Terminal, so generate a model without UserDemands.
+    toml_path = directory / "delwaq_model" / "ribasim.toml"
+    if not toml_path.is_file():
+        assert model.basin.node.df is not None
+        n_basins = len(model.basin.node.df)
+        model = synthetic_network_model(n_basins, demand_fraction=0.0)
+        _with_results(model, directory, "delwaq_model")
+    return toml_path
+
+
+def _delwaq_generate(toml_path: Path) -> None:
+    from ribasim.delwaq import generate
+
+    generate(toml_path, toml_path.parent / "delwaq")
+
+
+def _libribasim_path() -> Path:
+    lib_or_bin = "bin" if platform.system() == "Windows" else "lib"
+    extension = ".dll" if platform.system() == "Windows" else ".so"
+    repo_root = Path(__file__).parents[3]
+    return repo_root / "build" / "ribasim" / lib_or_bin / f"libribasim{extension}"
+
+
+_libribasim: list[Any] = []
+
+
+def _setup_bmi(model: Model, directory: Path) -> Any:
+    """Initialize libribasim with the model, Julia itself is only initialized once."""
+    from ribasim_api import RibasimApi
+
+    if not _libribasim:
+        lib_path = _libribasim_path()
+        _libribasim.append(RibasimApi(lib_path, lib_path.parent))
+        _libribasim[0].init_julia()
+    libribasim = _libribasim[0]
+    libribasim.initialize(str(_written(model, directory, "bmi")))
+    return libribasim
+
+
+def _get_value_ptr(libribasim: Any) -> None:
+    for _ in range(N_STEPS):
+        for name in BMI_VARIABLES:
+            libribasim.get_value_ptr(name)
+
+
+def _setup_bind(model: Model, directory: Path) -> Any:
+    return _setup_bmi(model, directory).bind(BMI_VARIABLES)
+
+
+def _get_many(variables: Any) -> None:
+    for _ in range(N_STEPS):
+        variables.get_many()
+
+
+# The BMI benchmarks need a build of libribasim
+BMI_BENCHMARKS = [
+    Benchmark(
+        "bmi_get_value_ptr",
+        _setup_bmi,
+        _get_value_ptr,
+        teardown=lambda libribasim: libribasim.finalize(),
+    ),
+    Benchmark(
+        "bmi_bind_get_many",
+        _setup_bind,
+        _get_many,
+        teardown=lambda variables: _libribasim[0].finalize(),
+    ),
+]
+
+BENCHMARKS = [
+    Benchmark(
+        "model_write",
+        lambda model, directory: (model, directory / "write" / "ribasim.toml"),
+        lambda state: state[0].write(state[1]),
+    ),
+    Benchmark("model_read", _written, Model.read),
+    Benchmark(
+        "validate_model",
+        lambda model, directory: model,
+        lambda model: model._validate_model(),
+    ),
+    Benchmark(
+        "node_table", lambda model, directory: model, lambda model: model.node_table()
+    ),
+    Benchmark(
+        "to_xugrid_add_flow",
+        lambda model, directory: Model.read(_with_results(model, directory)),
+        lambda model: model.to_xugrid(add_flow=True),
+    ),
+    Benchmark(
+        "multi_node_model_add",
+        lambda model, directory: model.model_copy(deep=True),
+        _add_nodes,
+    ),
+    Benchmark("link_table_add", _setup_add_links, _add_links),
+    Benchmark("basin_concentration_read", _setup_basin_concentration, Model.read),
+    Benchmark("delwaq_generate", _setup_delwaq, _delwaq_generate, max_n_basins=1_000),
+    *(BMI_BENCHMARKS if _libribasim_path().is_file() else []),
+]
+
+
+def measure(
+    benchmark: Benchmark, n_basins: int, model: Model, directory: Path, repeat: int
+) -> Measurement:
+    """Time a benchmark ``repeat`` times, and measure its peak memory use once more.
+
+    The memory is measured in a separate run, since tracing allocations slows it down.
+    Arrow memory is not traced, so the Arrow memory that the result still holds is added.
+    """
+    times = []
+    for _ in range(repeat):
+        state = benchmark.setup(model, directory)
+        try:
+            start = perf_counter()
+            benchmark.run(state)
+            times.append(perf_counter() - start)
+        finally:
+            if benchmark.teardown is not None:
+                benchmark.teardown(state)
+
+    state = benchmark.setup(model, directory)
+    arrow_memory = pa.total_allocated_bytes()
+    tracemalloc.start()
+    try:
+        result = benchmark.run(state)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        if benchmark.teardown is not None:
+            benchmark.teardown(state)
+    peak_memory += max(pa.total_allocated_bytes() - arrow_memory, 0)
+    del result
+
+    node_df = model.node_table().df
+    assert node_df is not None
+    return Measurement(
+        benchmark=benchmark.name,
+        n_basins=n_basins,
+        n_nodes=len(node_df),
+        time_min=min(times),
+        time_mean=mean(times),
+        peak_memory=peak_memory,
+    )
+
+
+def measure_import(repeat: int) -> Measurement:
+    """Time ``import ribasim`` in a new process, with ``python -X importtime``."""
+    times = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import ribasim"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        # The last line is "import time: self [us] | cumulative [us] | ribasim"
+        times.append(int(result.stderr.splitlines()[-1].split("|")[1]) / 1e6)
+    return Measurement(
+        benchmark="import_ribasim",
+        n_basins=0,
+        n_nodes=0,
+        time_min=min(times),
+        time_mean=mean(times),
+        peak_memory=0,
+    )
+
+
+def _max_rss() -> int | None:
+    """Return the peak resident set size of this process in bytes, if known."""
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def run(
+    sizes: list[int], names: list[str] | None = None, repeat: int = 3
+) -> dict[str, Any]:
+    """Run the benchmarks on models of the given sizes, and return the report."""
+    benchmarks = [b for b in BENCHMARKS if names is None or b.name in names]
+    measurements = []
+    if names is None or "import_ribasim" in names:
+        measurement = measure_import(repeat)
+        print(f"{measurement.benchmark:<22} {measurement.time_min:>24.4f} s")
+        measurements.append(asdict(measurement))
+    for n_basins in sizes:
+        model = synthetic_network_model(n_basins)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for benchmark in benchmarks:
+                if (
+                    benchmark.max_n_basins is not None
+                    and n_basins > benchmark.max_n_basins
+                ):
+                    continue
+                measurement = measure(benchmark, n_basins, model, Path(tmpdir), repeat)
+                print(
+                    f"{measurement.benchmark:<22} {n_basins:>7} basins "
+                    f"{measurement.time_min:>9.4f} s "
+                    f"{measurement.peak_memory / 2**20:>9.1f} MiB"
+                )
+                measurements.append(asdict(measurement))
+
+    return {
+        "metadata": {
+            "ribasim_version": ribasim.__version__,
+            "python_version": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.node(),
+            "datetime": datetime.now().isoformat(timespec="seconds"),
+            "repeat": repeat,
+            "max_rss": _max_rss(),
+        },
+        "results": measurements,
+    }
+
+
+def compare(
+    report: dict[str, Any], baseline: dict[str, Any], threshold: float = 0.2
+) -> pd.DataFrame:
+    """Compare a report with a baseline report.
+
+    A measurement is a regression if its minimum time or peak memory
+    is more than ``threshold`` larger than in the baseline.
+    Measurements that are not in both reports are left out.
+    """
+    keys = ["benchmark", "n_basins"]
+    df = pd.DataFrame(report["results"]).merge(
+        pd.DataFrame(baseline["results"]),
+        on=keys,
+        suffixes=("", "_baseline"),
+    )
+    df["time_ratio"] = df["time_min"] / df["time_min_baseline"]
+    df["memory_ratio"] = df["peak_memory"] / df["peak_memory_baseline"]
+    df["regression"] = (df["time_ratio"] > 1.0 + threshold) | (
+        df["memory_ratio"] > 1.0 + threshold
+    )
+    return df[[*keys, "time_min", "time_ratio", "memory_ratio", "regression"]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=SIZES,
+        help="The number of Basins of the benchmarked models.",
+    )
+    parser.add_argument(
+        "--benchmark",
+        nargs="+",
+        choices=["import_ribasim", *(b.name for b in BENCHMARKS)],
+        help="Run only these benchmarks.",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="Write the report to this file.")
+    parser.add_argument(
+        "--compare", type=Path, help="Compare the report with this baseline report."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="The relative slowdown or memory increase that counts as a regression.",
+    )
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.benchmark, args.repeat)
+    if args.output is not None:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text())
+        df = compare(report, baseline, args.threshold)
+        print(df.to_string(index=False, float_format="{:.3f}".format))
+        if df["regression"].any():
+            print(f"Found {df['regression'].sum()} regression(s)")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
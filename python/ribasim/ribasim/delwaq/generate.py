@@ -74,7 +74,11 @@ def _make_boundary(data, boundary_type):
     bid = _boundary_name(data.node_id.iloc[0], boundary_type)
     piv = (
         data.pivot_table(
-            index="time", columns="substance", values="concentration", fill_value=-999
+            index="time",
+            columns="substance",
+            values="concentration",
+            fill_value=-999,
+            observed=True,
         )
         .reset_index()
         .reset_index(drop=True)
@@ -295,6 +299,48 @@ def _setup_boundaries(model):
     return boundaries, substances
 
 
+def _initial_concentrations(
+    initial: pd.DataFrame | None,
+    basin_mapping: dict[int, int],
+    substances: set[str],
+    defaults: dict[str, float],
+) -> pd.DataFrame:
+    """Make a wide (segment x substance) table of the initial Basin concentrations.
+
+    Substances without a default start at zero. The values of Basin / concentration_state
+    override the defaults, also when they are NaN, and the last value of duplicates wins.
+    Basins that are not part of the Delwaq network are left out.
+    Raises a ValueError for substances that are not in ``substances``.
+    """
+    icdf = pd.DataFrame(
+        data={
+            substance: [defaults.get(substance, 0.0)] * len(basin_mapping)
+            for substance in sorted(substances)
+        },
+        index=list(basin_mapping.values()),
+    )
+    if initial is None:
+        return icdf
+
+    state = (
+        initial.assign(segment=initial["node_id"].map(basin_mapping))
+        .dropna(subset=["segment"])
+        .drop_duplicates(subset=["segment", "substance"], keep="last")
+    )
+    values = icdf.to_numpy()
+    rows = icdf.index.get_indexer(state["segment"].astype(np.int64))
+    columns = icdf.columns.get_indexer(state["substance"].astype(object))
+    # An index of -1 would silently write to the last segment or substance
+    if (columns == -1).any():
+        unknown = sorted(set(state["substance"].to_numpy()[columns == -1]))
+        raise ValueError(f"Initial concentrations of unknown substances: {unknown}")
+    if (rows == -1).any():
+        unknown = sorted(set(state["node_id"].to_numpy()[rows == -1]))
+        raise ValueError(f"Initial concentrations of unknown Basins: {unknown}")
+    values[rows, columns] = state["concentration"].to_numpy(np.float64, na_value=np.nan)
+    return pd.DataFrame(values, index=icdf.index, columns=icdf.columns)
+
+
 def generate(
     toml_path: Path,
     output_path: Path = output_path,
@@ -461,26 +507,18 @@ def generate(
         initial = model.basin.concentration_state.df
         substances.update(initial.substance.unique())
 
-    # Make a wide table with the initial default concentrations
-    # using zero for all user defined substances
-    icdf = pd.DataFrame(
-        data={
-            substance: [defaults.get(substance, 0.0)] * len(basin_mapping)
-            for substance in sorted(substances)
-        },
-        index=list(basin_mapping.values()),
+    icdf = _initial_concentrations(
+        model.basin.concentration_state.df, basin_mapping, substances, defaults
     )
 
-    # Override default concentrations with the user defined values
-    if model.basin.concentration_state.df is not None:
-        for _, row in initial.iterrows():
-            icdf.loc[basin_mapping[row.node_id], row.substance] = row.concentration
-
     # Add comment with original Basin ID
     reverse_node_mapping = {v: k for k, v in node_mapping.items()}
-    icdf["comment"] = [f"; {reverse_node_mapping[k]}" for k in icdf.index]
+    icdf["comment"] = ";"
+    icdf["basin_node_id"] = icdf.index.map(reverse_node_mapping)
 
-    initial_concentrations = icdf.to_string(header=False, index=False)
+    initial_concentrations = icdf.to_csv(
+        sep=" ", header=False, index=False, lineterminator="\n", na_rep="NaN"
+    ).rstrip("\n")
 
     # Write boundary list, ordered by bid to map the unique boundary names
     # to the links described in the pointer file.
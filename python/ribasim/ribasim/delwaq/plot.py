@@ -20,7 +20,7 @@ def plot_fraction(
     table = table[table["node_id"] == node_id]
     table = table[table["substance"].isin(tracers)]
 
-    groups = table.groupby("substance")
+    groups = table.groupby("substance", observed=True)
     stack = {k: v["concentration"].to_numpy() for (k, v) in groups}
 
     fig, ax = plt.subplots()
@@ -0,0 +1,328 @@
+"""Aggregate gridded forcing over the Basin / area polygons into Basin / time.
+
+The overlap of every Basin with every grid cell is computed once, as a sparse
+matrix of overlap areas, which is then applied to the whole time stack
+of every variable as a sparse matrix product.
+This module requires the optional dependencies `scipy` and `xarray`.
+"""
+
+import os
+from collections.abc import Iterator, Mapping
+from typing import TYPE_CHECKING, Any
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from numpy.typing import ArrayLike, NDArray
+
+from ribasim import profiling
+from ribasim.input_base import TableModel
+from ribasim.utils import LazyModule, _concat
+
+if TYPE_CHECKING:
+    import xarray as xr
+
+sparse = LazyModule("scipy.sparse", "forcing")
+
+__all__ = ("ZonalWeights", "basin_time", "iter_basin_time")
+
+# The number of Basin-cell pairs to intersect at once, to bound the memory use
+_PAIRS_PER_BATCH = 2**20
+
+
+def _cell_edges(centers: NDArray[np.float64]) -> NDArray[np.float64]:
+    """Return the edges of the cells around increasing cell centers."""
+    middle = (centers[:-1] + centers[1:]) / 2
+    return np.concatenate(
+        ([2 * centers[0] - middle[0]], middle, [2 * centers[-1] - middle[-1]])
+    )
+
+
+def _overlapping_cells(
+    edges: NDArray[np.float64],
+    lower: NDArray[np.float64],
+    upper: NDArray[np.float64],
+) -> tuple[NDArray[np.int64], NDArray[np.int64]]:
+    """Return the first and one past the last cell overlapping every interval."""
+    n = len(edges) - 1
+    start = np.clip(np.searchsorted(edges, lower, side="right") - 1, 0, n)
+    stop = np.clip(np.searchsorted(edges, upper, side="left"), 0, n)
+    return start, np.maximum(start, stop)
+
+
+def _axis(centers: ArrayLike, name: str) -> tuple[NDArray[np.float64], bool]:
+    """Return the increasing cell centers along an axis, and whether they were flipped."""
+    centers = np.asarray(centers, dtype=np.float64)
+    if centers.ndim != 1 or len(centers) < 2:
+        raise ValueError(f"The grid needs at least two cells along {name}.")
+    step = np.diff(centers)
+    if (step > 0).all():
+        return centers, False
+    elif (step < 0).all():
+        return centers[::-1], True
+    raise ValueError(f"The cell centers along {name} are not monotonic.")
+
+
+class ZonalWeights:
+    """The overlap of Basin / area polygons with the cells of a rectilinear grid.
+
+    The weights are stored as a sparse matrix of overlap areas,
+    with a row per Basin node and a column per grid cell, in row-major (y, x) order.
+    Compute them once for a grid and reuse them, or `save` them to reuse them later.
+    Multiple polygons of the same node are combined.
+
+    Parameters
+    ----------
+    area : TableModel | gpd.GeoDataFrame
+        The Basin / area polygons with a ``node_id`` column, such as ``model.basin.area``.
+    x : ArrayLike
+        The centers of the grid cells along x, in the CRS of the polygons.
+    y : ArrayLike
+        The centers of the grid cells along y, in the CRS of the polygons.
+    """
+
+    node_id: NDArray[np.int32]
+    x: NDArray[np.float64]
+    y: NDArray[np.float64]
+    matrix: Any
+
+    @profiling.profiled("ZonalWeights")
+    def __init__(
+        self, area: TableModel[Any] | gpd.GeoDataFrame, x: ArrayLike, y: ArrayLike
+    ):
+        if isinstance(area, TableModel):
+            area = area.df
+        if area is None or area.empty:
+            raise ValueError("Cannot compute zonal weights without Basin / area.")
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        x_centers, x_flipped = _axis(self.x, "x")
+        y_centers, y_flipped = _axis(self.y, "y")
+        x_edges = _cell_edges(x_centers)
+        y_edges = _cell_edges(y_centers)
+        nx, ny = len(x_edges) - 1, len(y_edges) - 1
+
+        self.node_id, row = np.unique(area["node_id"].to_numpy(), return_inverse=True)
+        self.node_id = self.node_id.astype(np.int32)
+        polygons = area.geometry.to_numpy()
+        xmin, ymin, xmax, ymax = shapely.bounds(polygons).T
+        x_start, x_stop = _overlapping_cells(x_edges, xmin, xmax)
+        y_start, y_stop = _overlapping_cells(y_edges, ymin, ymax)
+
+        # List every pair of a polygon and a cell within its bounding box
+        width = x_stop - x_start
+        count = width * (y_stop - y_start)
+        offset = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        polygon = np.repeat(np.arange(len(polygons)), count)
+        width = np.repeat(width, count)
+        ix = np.repeat(x_start, count) + offset % width
+        iy = np.repeat(y_start, count) + offset // width
+
+        # Cells inside a polygon overlap entirely, so only the cells that
+        # intersect its boundary need the relatively slow intersection
+        shapely.prepare(polygons)
+        overlap = np.empty(len(polygon))
+        for start in range(0, len(polygon), _PAIRS_PER_BATCH):
+            batch = slice(start, start + _PAIRS_PER_BATCH)
+            cells = shapely.box(
+                x_edges[ix[batch]],
+                y_edges[iy[batch]],
+                x_edges[ix[batch] + 1],
+                y_edges[iy[batch] + 1],
+            )
+            candidates = polygons[polygon[batch]]
+            inside = shapely.contains_properly(candidates, cells)
+            boundary = ~inside
+            boundary[boundary] = shapely.intersects(
+                candidates[boundary], cells[boundary]
+            )
+            overlap_area = np.where(inside, shapely.area(cells), 0.0)
+            overlap_area[boundary] = shapely.area(
+                shapely.intersection(candidates[boundary], cells[boundary])
+            )
+            overlap[batch] = overlap_area
+
+        # Number the cells as in the original grid
+        if x_flipped:
+            ix = nx - 1 - ix
+        if y_flipped:
+            iy = ny - 1 - iy
+        keep = overlap > 0
+        self.matrix = sparse.csr_array(
+            (overlap[keep], (row[polygon[keep]], iy[keep] * nx + ix[keep])),
+            shape=(len(self.node_id), ny * nx),
+        )
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        """The shape of the grid, as (y, x)."""
+        return len(self.y), len(self.x)
+
+    def aggregate(self, values: ArrayLike) -> NDArray[np.float64]:
+        """Return the area-weighted mean of gridded values over every Basin.
+
+        Cells with NaN values and parts of Basins outside of the grid are left out.
+        Basins that overlap no valid cell get NaN.
+
+        Parameters
+        ----------
+        values : ArrayLike
+            The values on the grid, with shape (..., y, x).
+
+        Returns
+        -------
+        NDArray[np.float64]
+            The mean per Basin, with shape (..., node), in the order of `node_id`.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.shape[-2:] != self.shape:
+            raise ValueError(
+                f"The values have shape {values.shape[-2:]}, but the grid is {self.shape}."
+            )
+        leading = values.shape[:-2]
+        # One column per grid, such that all time steps are one sparse product
+        values = values.reshape(-1, self.shape[0] * self.shape[1]).T
+        with profiling.span("ZonalWeights.aggregate"):
+            valid = ~np.isnan(values)
+            if valid.all():
+                total = self.matrix @ values
+                covered = self.matrix.sum(axis=1)[:, np.newaxis]
+            else:
+                total = self.matrix @ np.where(valid, values, 0.0)
+                covered = self.matrix @ valid.astype(np.float64)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = total / covered
+        return mean.T.reshape(*leading, len(self.node_id))
+
+    def save(self, path: str | os.PathLike[str]) -> None:
+        """Write the weights to a ``.npz`` file, see `load`."""
+        matrix = self.matrix
+        np.savez(
+            path,
+            node_id=self.node_id,
+            x=self.x,
+            y=self.y,
+            data=matrix.data,
+            indices=matrix.indices,
+            indptr=matrix.indptr,
+        )
+
+    @classmethod
+    def load(cls, path: str | os.PathLike[str]) -> "ZonalWeights":
+        """Read weights written by `save`."""
+        weights = cls.__new__(cls)
+        with np.load(path) as npz:
+            weights.node_id = npz["node_id"]
+            weights.x = npz["x"]
+            weights.y = npz["y"]
+            weights.matrix = sparse.csr_array(
+                (npz["data"], npz["indices"], npz["indptr"]),
+                shape=(len(weights.node_id), len(weights.y) * len(weights.x)),
+            )
+        return weights
+
+
+def iter_basin_time(
+    area: TableModel[Any] | gpd.GeoDataFrame,
+    grid: "xr.Dataset",
+    variables: Mapping[str, str],
+    weights: ZonalWeights | None = None,
+    x: str = "x",
+    y: str = "y",
+    time: str = "time",
+    chunk_size: int = 365,
+) -> Iterator[pd.DataFrame]:
+    """Aggregate gridded forcing into Basin / time, one chunk of time steps at a time.
+
+    Only a chunk of the grid is loaded at once, such that long series of
+    lazily loaded grids, like from `xarray.open_dataset`, fit in memory.
+    See `basin_time` for the parameters.
+
+    Yields
+    ------
+    pd.DataFrame
+        The Basin / time rows of ``chunk_size`` time steps.
+    """
+    if weights is None:
+        weights = ZonalWeights(area, grid[x], grid[y])
+    elif not (
+        np.array_equal(weights.x, grid[x]) and np.array_equal(weights.y, grid[y])
+    ):
+        raise ValueError("The weights were computed for a different grid.")
+    if chunk_size < 1:
+        raise ValueError("The chunk size must be positive.")
+
+    times = grid[time].to_numpy()
+    n = len(weights.node_id)
+    for start in range(0, len(times), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        df = pd.DataFrame(
+            {
+                "node_id": np.tile(weights.node_id, len(times[chunk])),
+                "time": np.repeat(times[chunk], n),
+            }
+        )
+        for column, name in variables.items():
+            values = grid[name].isel({time: chunk}).transpose(time, y, x).to_numpy()
+            df[column] = weights.aggregate(values).ravel()
+        yield df
+
+
+def basin_time(
+    area: TableModel[Any] | gpd.GeoDataFrame,
+    grid: "xr.Dataset",
+    variables: Mapping[str, str],
+    weights: ZonalWeights | None = None,
+    x: str = "x",
+    y: str = "y",
+    time: str = "time",
+    chunk_size: int = 365,
+) -> pd.DataFrame:
+    """Aggregate gridded forcing into a Basin / time table.
+
+    Every Basin gets the area-weighted mean of the cells it overlaps, see `ZonalWeights.aggregate`.
+    The grid must be in the CRS of the Basin / area polygons, and in the units of Basin / time.
+
+    Parameters
+    ----------
+    area : TableModel | gpd.GeoDataFrame
+        The Basin / area polygons with a ``node_id`` column, such as ``model.basin.area``.
+    grid : xr.Dataset
+        The gridded forcing, with dimensions time, y and x.
+    variables : Mapping[str, str]
+        The Basin / time columns to fill, such as ``"precipitation"``,
+        mapped to the name of their variable in the grid.
+    weights : ZonalWeights, optional
+        Weights computed before for this grid and these polygons.
+    x : str
+        The name of the x dimension of the grid.
+    y : str
+        The name of the y dimension of the grid.
+    time : str
+        The name of the time dimension of the grid.
+    chunk_size : int
+        The number of time steps to aggregate at once.
+
+    Returns
+    -------
+    pd.DataFrame
+        The Basin / time table, with a row per Basin and time step.
+        Without time steps it is empty, but still has the columns.
+
+    Examples
+    --------
+    >>> grid = xr.open_dataset("meteo.nc")
+    >>> df = basin_time(model.basin.area, grid, {"precipitation": "pr"})
+    >>> model.basin.time = basin.Time(df=df)
+    """
+    dfs = list(iter_basin_time(area, grid, variables, weights, x, y, time, chunk_size))
+    if not dfs:
+        return pd.DataFrame(
+            {
+                "node_id": pd.Series(dtype=np.int32),
+                "time": pd.Series(dtype=grid[time].dtype),
+                **{column: pd.Series(dtype=np.float64) for column in variables},
+            }
+        )
+    return _concat(dfs, ignore_index=True)
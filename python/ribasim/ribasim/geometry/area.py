@@ -1,8 +1,10 @@
+import numpy as np
 import pandera as pa
+import shapely
 from pandera.dtypes import Int32
 from pandera.typing import Index, Series
 from pandera.typing.geopandas import GeoSeries
-from shapely.geometry import MultiPolygon, Polygon
+from shapely.geometry import MultiPolygon
 
 from .base import _GeoBaseSchema
 
@@ -14,6 +16,10 @@ class BasinAreaSchema(_GeoBaseSchema):
 
     @pa.parser("geometry")
     def convert_to_multi(cls, series):
-        return series.apply(
-            lambda geom: MultiPolygon([geom]) if isinstance(geom, Polygon) else geom
-        )
+        geometry = series.to_numpy()
+        is_polygon = shapely.get_type_id(geometry) == shapely.GeometryType.POLYGON
+        if not is_polygon.any():
+            return series
+        series = series.copy()
+        series[is_polygon] = shapely.multipolygons(geometry[is_polygon, np.newaxis])
+        return series
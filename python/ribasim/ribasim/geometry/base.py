@@ -1,14 +1,35 @@
 from typing import Any, get_type_hints
 
+import pandas as pd
 import pandera as pa
+import shapely
 from pandera.typing import Series
 from pandera.typing.geopandas import GeoSeries
 
 from ribasim.schemas import _BaseSchema
 
 
+def _check_categories(df: Any, column: str, categories: tuple[str, ...]) -> Any:
+    """Raise a clear error for values outside the fixed categories of a column.
+
+    Otherwise the coercion to the categorical dtype fails without naming the values.
+    """
+    if isinstance(df, pd.DataFrame) and column in df:
+        unknown = set(df[column].dropna().unique()).difference(categories)
+        if unknown:
+            expected = ", ".join(repr(c) for c in categories if c)
+            raise ValueError(
+                f"Unknown {column} {', '.join(map(repr, sorted(unknown)))}, expected one of {expected}."
+            )
+    return df
+
+
 class _GeoBaseSchema(_BaseSchema):
     @pa.check("geometry")
     def is_correct_geometry_type(cls, geoseries: GeoSeries[Any]) -> Series[bool]:
         T = get_type_hints(cls)["geometry"].__args__[0]
-        return geoseries.map(lambda geom: isinstance(geom, T))
+        type_id = shapely.GeometryType[T.__name__.upper()]
+        return pd.Series(
+            shapely.get_type_id(geoseries.to_numpy()) == type_id,
+            index=geoseries.index,
+        )
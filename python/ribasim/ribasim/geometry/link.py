@@ -1,22 +1,20 @@
 from pathlib import Path
-from typing import NamedTuple
+from typing import TYPE_CHECKING, Annotated, NamedTuple
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import pandera as pa
 import shapely
-from matplotlib.axes import Axes
 from numpy.typing import NDArray
 from pandera.dtypes import Int32
 from pandera.typing import Index, Series
 from pandera.typing.geopandas import GeoDataFrame, GeoSeries
-from pydantic import NonNegativeInt, PrivateAttr, model_validator
+from pydantic import NonNegativeInt, PrivateAttr, field_validator, model_validator
 from shapely.geometry import LineString, MultiLineString, Point
 
 from ribasim.db_utils import _get_db_schema_version
 from ribasim.input_base import SpatialTableModel
-from ribasim.utils import UsedIDs, _concat
+from ribasim.utils import UsedIDs, _concat, _one_per_pixel
 from ribasim.validation import (
     can_connect,
     control_link_neighbor_amount,
@@ -24,10 +22,18 @@ from ribasim.validation import (
     node_type_connectivity,
 )
 
-from .base import _GeoBaseSchema
+from .base import _check_categories, _GeoBaseSchema
+
+if TYPE_CHECKING:
+    from matplotlib.axes import Axes
 
 __all__ = ("LinkTable",)
 
+# The vertices of a caret marker pointing up, 5 points high, in inches
+CARET = 2.5 / 72 * np.array([[0.0, 1.0], [-0.866, -0.5], [0.866, -0.5]])
+
+LINK_TYPES = ("flow", "control")
+
 SPATIALCONTROLNODETYPES = {
     "ContinuousControl",
     "DiscreteControl",
@@ -48,7 +54,9 @@ class LinkSchema(_GeoBaseSchema):
     name: Series[str] = pa.Field(default="")
     from_node_id: Series[Int32] = pa.Field(default=0)
     to_node_id: Series[Int32] = pa.Field(default=0)
-    link_type: Series[str] = pa.Field(default="flow")
+    link_type: Series[Annotated[pd.CategoricalDtype, LINK_TYPES, False]] = pa.Field(
+        default="flow"
+    )
     geometry: GeoSeries[LineString] = pa.Field(default=None, nullable=True)
 
     @classmethod
@@ -61,6 +69,11 @@ class LinkTable(SpatialTableModel[LinkSchema]):
 
     _used_link_ids: UsedIDs = PrivateAttr(default_factory=UsedIDs)
 
+    @field_validator("df", mode="before")
+    @classmethod
+    def _check_link_types(cls, v):
+        return _check_categories(v, "link_type", LINK_TYPES)
+
     @model_validator(mode="after")
     def _update_used_ids(self) -> "LinkTable":
         if self.df is not None and len(self.df.index) > 0:
@@ -185,19 +198,25 @@ class LinkTable(SpatialTableModel[LinkSchema]):
         assert self.df is not None
         return (self.df.link_type == link_type).to_numpy()
 
-    def plot(self, **kwargs) -> Axes:
+    def plot(self, **kwargs) -> "Axes":
         """Plot the links of the model.
 
         Parameters
         ----------
         **kwargs : Dict
-            Supported: 'ax', 'color_flow', 'color_control'
+            Supported: 'ax', 'color_flow', 'color_control', 'level_of_detail'
+            With 'level_of_detail' only a single caret per pixel is drawn,
+            if the carets outnumber the pixels of the axis.
         """
+        import matplotlib.pyplot as plt
+        from matplotlib.collections import PolyCollection
+
         assert self.df is not None
         kwargs = kwargs.copy()  # Avoid side-effects
         ax = kwargs.get("ax", None)
         color_flow = kwargs.pop("color_flow", None)
         color_control = kwargs.pop("color_control", None)
+        level_of_detail = kwargs.pop("level_of_detail", False)
 
         if ax is None:
             _, ax = plt.subplots()
@@ -239,17 +258,32 @@ class LinkTable(SpatialTableModel[LinkSchema]):
         color = np.where(where_flow[color_index], color_flow, "k")
         color = np.where(where_control[color_index], color_control, color)
 
-        # A faster alternative may be ax.quiver(). However, getting the scaling
-        # right is tedious.
-        for m_x, m_y, m_angle, c in zip(x, y, angle, color):
-            ax.plot(
-                m_x,
-                m_y,
-                marker=(3, 0, m_angle),
-                markersize=5,
-                linestyle="None",
-                c=c,
-            )
+        if level_of_detail:
+            keep = _one_per_pixel(ax, x, y)
+            x, y, angle, color = x[keep], y[keep], angle[keep], color[keep]
+
+        # Draw all carets as one collection of triangles, rotated along the link.
+        # The triangles are sized in inches, and placed at the data coordinates.
+        radians = np.radians(angle)[:, np.newaxis]
+        cos = np.cos(radians)
+        sin = np.sin(radians)
+        verts = np.stack(
+            (
+                cos * CARET[:, 0] - sin * CARET[:, 1],
+                sin * CARET[:, 0] + cos * CARET[:, 1],
+            ),
+            axis=-1,
+        )
+        carets = PolyCollection(
+            verts,
+            offsets=np.column_stack((x, y)),
+            offset_transform=ax.transData,
+            transform=ax.figure.dpi_scale_trans,
+            facecolors=color,
+            edgecolors=color,
+            zorder=kwargs.get("zorder", 2),
+        )
+        ax.add_collection(carets, autolim=False)
 
         return ax
 
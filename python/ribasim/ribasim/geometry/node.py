@@ -1,27 +1,36 @@
-from typing import Any
+from typing import Annotated, Any
 
 import geopandas as gpd
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import pandera as pa
-from matplotlib.patches import Patch
 from pandera.dtypes import Int32
 from pandera.typing import Index, Series
 from pandera.typing.geopandas import GeoSeries
+from pydantic import field_validator
 from shapely.geometry import Point
 
 from ribasim.input_base import SpatialTableModel
+from ribasim.utils import _one_per_pixel
+from ribasim.validation import flow_link_neighbor_amount
 
-from .base import _GeoBaseSchema
+from .base import _check_categories, _GeoBaseSchema
 
 __all__ = ("NodeTable",)
 
+# Above this number of nodes, the nodes are not labeled by default.
+MAX_LABELS = 500
+
+# The categories of the node_type column, including the empty default
+NODE_TYPES = ("", *sorted(flow_link_neighbor_amount))
+
 
 class NodeSchema(_GeoBaseSchema):
     node_id: Index[Int32] = pa.Field(default=0, ge=0, check_name=True)
     name: Series[str] = pa.Field(default="")
-    node_type: Series[str] = pa.Field(default="")
+    node_type: Series[Annotated[pd.CategoricalDtype, NODE_TYPES, False]] = pa.Field(
+        default=""
+    )
     subnetwork_id: Series[pd.Int32Dtype] = pa.Field(
         default=pd.NA, nullable=True, coerce=True
     )
@@ -39,6 +48,11 @@ class NodeSchema(_GeoBaseSchema):
 class NodeTable(SpatialTableModel[NodeSchema]):
     """The Ribasim nodes as Point geometries."""
 
+    @field_validator("df", mode="before")
+    @classmethod
+    def _check_node_types(cls, v):
+        return _check_categories(v, "node_type", NODE_TYPES)
+
     def filter(self, nodetype: str):
         """Filter the node table based on the node type."""
         if self.df is not None:
@@ -46,6 +60,9 @@ class NodeTable(SpatialTableModel[NodeSchema]):
             self.df.drop(mask, inplace=True)
 
     def plot_allocation_networks(self, ax=None, zorder=None) -> Any:
+        import matplotlib.pyplot as plt
+        from matplotlib.patches import Patch
+
         if ax is None:
             _, ax = plt.subplots()
             ax.axis("off")
@@ -85,7 +102,13 @@ class NodeTable(SpatialTableModel[NodeSchema]):
 
         return handles, labels
 
-    def plot(self, ax=None, zorder=None) -> Any:
+    def plot(
+        self,
+        ax=None,
+        zorder=None,
+        labels: bool | None = None,
+        level_of_detail: bool = False,
+    ) -> Any:
         """
         Plot the nodes. Each node type is given a separate marker.
 
@@ -93,11 +116,19 @@ class NodeTable(SpatialTableModel[NodeSchema]):
         ----------
         ax : Optional
             The axis on which the nodes will be plotted.
+        labels : Optional, bool
+            Whether to label the nodes with their node ID.
+            By default only up to MAX_LABELS nodes are labeled.
+        level_of_detail : bool
+            Plot only a single node of each type per pixel,
+            if the nodes outnumber the pixels of the axis.
 
         Returns
         -------
         None
         """
+        import matplotlib.pyplot as plt
+
         if ax is None:
             _, ax = plt.subplots()
             ax.axis("off")
@@ -142,22 +173,36 @@ class NodeTable(SpatialTableModel[NodeSchema]):
         if self.df is None:
             return
 
-        for nodetype, df in self.df.groupby("node_type"):
+        plotted = []
+        for nodetype, df in self.df.groupby("node_type", observed=True):
             assert isinstance(nodetype, str)
             marker = MARKERS[nodetype]
             color = COLORS[nodetype]
+            x = df.geometry.x.to_numpy()
+            y = df.geometry.y.to_numpy()
+            if level_of_detail:
+                keep = _one_per_pixel(ax, x, y)
+                df, x, y = df[keep], x[keep], y[keep]
             ax.scatter(
-                df.geometry.x,
-                df.geometry.y,
+                x,
+                y,
                 marker=marker,
                 color=color,
                 zorder=zorder,
                 label=nodetype,
             )
-
-        assert self.df is not None
-        geometry = self.df["geometry"]
-        for text, xy in zip(self.df.index, np.column_stack((geometry.x, geometry.y))):
-            ax.annotate(text=text, xy=xy, xytext=(2.0, 2.0), textcoords="offset points")
+            plotted.append(df)
+
+        if labels is None:
+            labels = len(self.df) <= MAX_LABELS
+        if labels:
+            for df in plotted:
+                geometry = df["geometry"]
+                for text, xy in zip(
+                    df.index, np.column_stack((geometry.x, geometry.y))
+                ):
+                    ax.annotate(
+                        text=text, xy=xy, xytext=(2.0, 2.0), textcoords="offset points"
+                    )
 
         return ax
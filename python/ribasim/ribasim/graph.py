@@ -0,0 +1,126 @@
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from numpy.typing import ArrayLike, NDArray
+
+from ribasim.utils import LazyModule
+
+sparse = LazyModule("scipy.sparse", "graph")
+csgraph = LazyModule("scipy.sparse.csgraph", "graph")
+
+__all__ = ("Graph",)
+
+
+class Graph:
+    """The directed graph of the flow links of a model.
+
+    The nodes are numbered by their position in the sorted ``node_id`` array,
+    and the links are stored as a compressed sparse row (CSR) adjacency matrix,
+    such that traversals take linear time in the number of links.
+    Parallel links between the same nodes are stored once.
+    This class requires the optional dependency `scipy`.
+
+    Parameters
+    ----------
+    node_id : ArrayLike
+        The IDs of all nodes, including nodes without flow links.
+    from_node_id : ArrayLike
+        The ID of the upstream node of every flow link.
+    to_node_id : ArrayLike
+        The ID of the downstream node of every flow link.
+    """
+
+    def __init__(
+        self, node_id: ArrayLike, from_node_id: ArrayLike, to_node_id: ArrayLike
+    ):
+        self.node_id: NDArray[np.int32] = np.unique(np.asarray(node_id, dtype=np.int32))
+        n = len(self.node_id)
+        from_index = self.index(from_node_id)
+        to_index = self.index(to_node_id)
+        self.adjacency = sparse.csr_array(
+            (np.ones(len(from_index), dtype=np.int8), (from_index, to_index)),
+            shape=(n, n),
+        )
+        # Parallel links are summed, store them once
+        self.adjacency.data[:] = 1
+        self._reverse: Any = None
+
+    @property
+    def reverse_adjacency(self) -> Any:
+        """The CSR adjacency matrix with all links reversed."""
+        if self._reverse is None:
+            self._reverse = self.adjacency.transpose().tocsr()
+        return self._reverse
+
+    def __len__(self) -> int:
+        return len(self.node_id)
+
+    def index(self, node_ids: ArrayLike) -> NDArray[np.intp]:
+        """Return the graph index of every node ID."""
+        node_ids = np.atleast_1d(np.asarray(node_ids, dtype=np.int32))
+        index = np.searchsorted(self.node_id, node_ids)
+        found = index < len(self.node_id)
+        found[found] = self.node_id[index[found]] == node_ids[found]
+        if not found.all():
+            raise ValueError(f"Node IDs not in the graph: {node_ids[~found]}")
+        return index
+
+    def _reachable(self, adjacency: Any, node_ids: ArrayLike) -> NDArray[np.int32]:
+        start = np.unique(self.index(node_ids))
+        n = len(self.node_id)
+        # Start a single breadth first search from an extra node linked to all starts
+        extended = sparse.csr_array(
+            (
+                np.ones(adjacency.nnz + len(start), dtype=np.int8),
+                np.concatenate([adjacency.indices, start]),
+                np.append(adjacency.indptr, adjacency.nnz + len(start)),
+            ),
+            shape=(n + 1, n + 1),
+        )
+        order = csgraph.breadth_first_order(
+            extended, n, directed=True, return_predecessors=False
+        )
+        return np.sort(self.node_id[order[1:]])
+
+    def upstream(self, node_ids: ArrayLike) -> NDArray[np.int32]:
+        """Return the sorted IDs of all nodes upstream of the given nodes, including them."""
+        return self._reachable(self.reverse_adjacency, node_ids)
+
+    def downstream(self, node_ids: ArrayLike) -> NDArray[np.int32]:
+        """Return the sorted IDs of all nodes downstream of the given nodes, including them."""
+        return self._reachable(self.adjacency, node_ids)
+
+    def connected_components(self) -> pd.Series:
+        """Return the label of the weakly connected component of every node."""
+        _, labels = csgraph.connected_components(
+            self.adjacency, directed=True, connection="weak"
+        )
+        return pd.Series(
+            labels.astype(np.int32),
+            index=pd.Index(self.node_id, name="node_id"),
+            name="component",
+        )
+
+    def topological_order(self) -> NDArray[np.int32]:
+        """Return the node IDs such that every node comes before its downstream nodes.
+
+        Raises a ValueError if the flow links contain a cycle.
+        """
+        # Kahn's algorithm, in plain Python on the CSR arrays, to stay linear
+        # also for long chains of nodes.
+        indptr = self.adjacency.indptr.tolist()
+        indices = self.adjacency.indices.tolist()
+        in_degree = np.bincount(
+            self.adjacency.indices, minlength=len(self.node_id)
+        ).tolist()
+        order = [i for i, degree in enumerate(in_degree) if degree == 0]
+        for i in order:
+            for j in indices[indptr[i] : indptr[i + 1]]:
+                in_degree[j] -= 1
+                if in_degree[j] == 0:
+                    order.append(j)
+
+        if len(order) < len(self.node_id):
+            raise ValueError("The flow links contain a cycle.")
+        return self.node_id[np.array(order, dtype=np.intp)]
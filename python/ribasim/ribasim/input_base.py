@@ -5,6 +5,7 @@ from abc import ABC, abstractmethod
 from collections.abc import Callable, Generator
 from contextlib import closing
 from contextvars import ContextVar
+from functools import cache
 from pathlib import Path
 from sqlite3 import connect
 from typing import (
@@ -14,13 +15,10 @@ from typing import (
     cast,
 )
 
-with warnings.catch_warnings():
-    warnings.simplefilter("ignore")
-    import datacompy
-
 import geopandas as gpd
 import numpy as np
 import pandas as pd
+import pandera as pa
 import pydantic
 from pandera.typing import DataFrame
 from pandera.typing.geopandas import GeoDataFrame
@@ -38,6 +36,7 @@ from pydantic import (
 )
 
 import ribasim
+from ribasim import profiling
 from ribasim.db_utils import (
     _get_db_schema_version,
     _set_gpkg_attribute_table,
@@ -87,6 +86,7 @@ class BaseModel(PydanticBaseModel):
         populate_by_name=True,
         use_enum_values=True,
         extra="allow",
+        defer_build=True,
     )
 
     @classmethod
@@ -261,6 +261,16 @@ class FileModel(BaseModel, ABC):
         raise NotImplementedError()
 
 
+@cache
+def _build_schema(T: type[_BaseSchema]) -> pa.DataFrameSchema:
+    """Build the DataFrameSchema of a DataFrameModel once, on first use.
+
+    The schemas are not built on import, to keep `import ribasim` fast.
+    """
+    with profiling.span("build_schema", T.__name__):
+        return T.to_schema()
+
+
 class TableModel(FileModel, Generic[TableT]):
     df: DataFrame[TableT] | None = Field(default=None, exclude=True, repr=False)
     _sort_keys: list[str] = PrivateAttr(default=[])
@@ -296,6 +306,10 @@ class TableModel(FileModel, Generic[TableT]):
                 a = self.df
                 b = other.df
 
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                import datacompy
+
             comp = datacompy.Compare(
                 a, b, on_index=True, df1_name="self", df2_name="other"
             )
@@ -309,19 +323,30 @@ class TableModel(FileModel, Generic[TableT]):
     def _check_schema(cls, v: DataFrame[TableT]):
         """Allow only extra columns with `meta_` prefix."""
         if isinstance(v, pd.DataFrame | gpd.GeoDataFrame):
-            # On reading from geopackage, migrate the tables when necessary
-            db_path = context_file_loading.get().get("database")
-            if db_path is not None:
-                version = _get_db_schema_version(db_path)
-                if version < ribasim.__schema_version__:
-                    v = cls.tableschema().migrate(v, version)
-            for colname in v.columns:
-                if colname not in cls.columns() and not colname.startswith("meta_"):
-                    raise ValueError(
-                        f"Unrecognized column '{colname}'. Extra columns need a 'meta_' prefix."
-                    )
+            with profiling.span("TableModel._check_schema"):
+                # On reading from geopackage, migrate the tables when necessary
+                db_path = context_file_loading.get().get("database")
+                if db_path is not None:
+                    version = _get_db_schema_version(db_path)
+                    if version < ribasim.__schema_version__:
+                        with profiling.span("migrate"):
+                            v = cls.tableschema().migrate(v, version)
+                columns = cls.columns()
+                for colname in v.columns:
+                    if colname not in columns and not colname.startswith("meta_"):
+                        raise ValueError(
+                            f"Unrecognized column '{colname}'. Extra columns need a 'meta_' prefix."
+                        )
         return v
 
+    @model_validator(mode="wrap")
+    @classmethod
+    def _profile_validation(cls, data: Any, handler: Callable[[Any], Any]) -> Any:
+        if not profiling.enabled():
+            return handler(data)
+        with profiling.span("TableModel.validate", cls.tablename()):
+            return handler(data)
+
     @model_serializer
     def _set_model(self) -> "str | None":
         return str(self.filepath.name) if self.filepath is not None else None
@@ -383,11 +408,13 @@ class TableModel(FileModel, Generic[TableT]):
     def _save(self, directory: DirectoryPath, input_dir: DirectoryPath) -> None:
         # TODO directory could be used to save an arrow file
         db_path = context_file_writing.get().get("database")
-        self.sort()
-        if self.filepath is not None:
-            self._write_arrow(self.filepath, directory, input_dir)
-        elif db_path is not None:
-            self._write_geopackage(db_path)
+        with profiling.span("TableModel._save", self.tablename()):
+            with profiling.span("sort"):
+                self.sort()
+            if self.filepath is not None:
+                self._write_arrow(self.filepath, directory, input_dir)
+            elif db_path is not None:
+                self._write_geopackage(db_path)
 
     def _write_geopackage(self, temp_path: Path) -> None:
         """
@@ -401,7 +428,7 @@ class TableModel(FileModel, Generic[TableT]):
         assert self.df is not None
         table = self.tablename()
 
-        with closing(connect(temp_path)) as connection:
+        with closing(connect(temp_path)) as connection, profiling.span("to_sql"):
             self.df.to_sql(
                 table,
                 connection,
@@ -418,15 +445,19 @@ class TableModel(FileModel, Generic[TableT]):
         assert self.df is not None
         path = directory / input_dir / filepath
         path.parent.mkdir(parents=True, exist_ok=True)
-        self.df.to_feather(
-            path,
-            compression="zstd",
-            compression_level=6,
-        )
+        with profiling.span("to_feather"):
+            self.df.to_feather(
+                path,
+                compression="zstd",
+                compression_level=6,
+            )
 
     @classmethod
     def _from_db(cls, path: Path, table: str) -> pd.DataFrame | None:
-        with closing(connect(path)) as connection:
+        with (
+            closing(connect(path)) as connection,
+            profiling.span("TableModel._from_db", table),
+        ):
             if exists(connection, table):
                 query = f"select * from {esc_id(table)}"
                 df = pd.read_sql_query(
@@ -446,7 +477,8 @@ class TableModel(FileModel, Generic[TableT]):
     @classmethod
     def _from_arrow(cls, path: Path) -> pd.DataFrame:
         directory = context_file_loading.get().get("directory", Path("."))
-        return pd.read_feather(directory / path, dtype_backend="pyarrow")
+        with profiling.span("TableModel._from_arrow", str(path)):
+            return pd.read_feather(directory / path, dtype_backend="pyarrow")
 
     def sort(self):
         """Sort the table as required.
@@ -469,11 +501,15 @@ class TableModel(FileModel, Generic[TableT]):
         T: TableT = fieldtype.__args__[0]
         return T
 
+    @classmethod
+    def _pandera_schema(cls) -> pa.DataFrameSchema:
+        """Retrieve the Pandera DataFrameSchema, which is built on first use."""
+        return _build_schema(cls.tableschema())
+
     @classmethod
     def columns(cls) -> list[str]:
         """Retrieve column names."""
-        T = cls.tableschema()
-        return list(T.to_schema().columns.keys())
+        return list(cls._pandera_schema().columns.keys())
 
     def __repr__(self) -> str:
         # Make sure not to return just "None", because it gets extremely confusing
@@ -512,7 +548,10 @@ class SpatialTableModel(TableModel[TableT], Generic[TableT]):
 
     @classmethod
     def _from_db(cls, path: Path, table: str):
-        with closing(connect(path)) as connection:
+        with (
+            closing(connect(path)) as connection,
+            profiling.span("SpatialTableModel._from_db", table),
+        ):
             if exists(connection, table):
                 # pyogrio hardcodes fid name on reading
                 df = gpd.read_file(
@@ -538,15 +577,17 @@ class SpatialTableModel(TableModel[TableT], Generic[TableT]):
         path : Path
         """
         assert self.df is not None
-        self.df.to_file(
-            path,
-            layer=self.tablename(),
-            driver="GPKG",
-            index=True,
-            fid=self.df.index.name,
-            engine="pyogrio",
-        )
-        _add_styles_to_geopackage(path, self.tablename())
+        with profiling.span("pyogrio"):
+            self.df.to_file(
+                path,
+                layer=self.tablename(),
+                driver="GPKG",
+                index=True,
+                fid=self.df.index.name,
+                engine="pyogrio",
+            )
+        with profiling.span("styles"):
+            _add_styles_to_geopackage(path, self.tablename())
 
 
 class ChildModel(BaseModel):
@@ -1,16 +1,17 @@
 import datetime
 import logging
 import shutil
-from collections.abc import Generator
+from collections.abc import Generator, Sequence
 from os import PathLike
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 
 import numpy as np
 import pandas as pd
+import shapely
 import tomli
 import tomli_w
-from matplotlib import pyplot as plt
+from numpy.typing import ArrayLike, NDArray
 from pandera.typing.geopandas import GeoDataFrame
 from pydantic import (
     DirectoryPath,
@@ -19,8 +20,10 @@ from pydantic import (
     field_serializer,
     model_validator,
 )
+from shapely.geometry.base import BaseGeometry
 
 import ribasim
+from ribasim import profiling
 from ribasim.config import (
     Allocation,
     Basin,
@@ -45,17 +48,19 @@ from ribasim.config import (
     UserDemand,
 )
 from ribasim.db_utils import _set_db_schema_version
-from ribasim.geometry.link import LinkSchema, LinkTable
+from ribasim.geometry.link import SPATIALCONTROLNODETYPES, LinkSchema, LinkTable
 from ribasim.geometry.node import NodeTable
+from ribasim.graph import Graph
 from ribasim.input_base import (
     ChildModel,
     FileModel,
     SpatialTableModel,
+    TableModel,
     context_file_loading,
     context_file_writing,
 )
 from ribasim.utils import (
-    MissingOptionalModule,
+    LazyModule,
     UsedIDs,
     _concat,
     _link_lookup,
@@ -63,12 +68,45 @@ from ribasim.utils import (
     _node_lookup_numpy,
     _time_in_ns,
 )
-from ribasim.validation import control_link_neighbor_amount, flow_link_neighbor_amount
+from ribasim.validation import (
+    can_connect,
+    control_link_neighbor_amount,
+    flow_link_neighbor_amount,
+)
 
-try:
-    import xugrid
-except ImportError:
-    xugrid = MissingOptionalModule("xugrid")
+xugrid = LazyModule("xugrid")
+
+
+def _id_offsets(
+    ids: list[NDArray[np.int64]], strategy: Literal["max", "round", "keep"]
+) -> list[int]:
+    """Compute the offset to add to the IDs of every model, such that they don't overlap."""
+    if strategy == "keep":
+        offsets = [0] * len(ids)
+        merged = np.concatenate([np.empty(0, dtype=np.int64), *ids])
+        unique, counts = np.unique(merged, return_counts=True)
+        if (counts > 1).any():
+            raise ValueError(
+                f"IDs are not unique across the models: {unique[counts > 1]}, "
+                "use another offset_strategy."
+            )
+    elif strategy == "round":
+        # Start the IDs of every model at a multiple of a power of ten
+        max_id = max((int(a.max()) for a in ids if len(a) > 0), default=0)
+        step = 10 ** len(str(max_id))
+        offsets = [i * step for i in range(len(ids))]
+    else:
+        # Continue the IDs of every model after the highest ID so far
+        offsets = []
+        highest = -1
+        for a in ids:
+            if len(a) == 0:
+                offsets.append(0)
+                continue
+            offset = max(highest + 1 - int(a.min()), 0)
+            offsets.append(offset)
+            highest = max(highest, int(a.max()) + offset)
+    return offsets
 
 
 class Model(FileModel):
@@ -111,6 +149,7 @@ class Model(FileModel):
     use_validation: bool = Field(default=True, exclude=True)
 
     _used_node_ids: UsedIDs = PrivateAttr(default_factory=UsedIDs)
+    _graph: tuple[tuple[NDArray[Any], ...], Graph] | None = PrivateAttr(default=None)
 
     @model_validator(mode="after")
     def _set_node_parent(self) -> "Model":
@@ -196,6 +235,7 @@ class Model(FileModel):
             tomli_w.dump(content, f)
         return fn
 
+    @profiling.profiled("Model._save")
     def _save(self, directory: DirectoryPath, input_dir: DirectoryPath):
         # We write all tables to a temporary GeoPackage with a dot prefix,
         # and at the end move this over the target file.
@@ -247,6 +287,7 @@ class Model(FileModel):
                     getattr(table.df, function_name)(crs, inplace=True)
         self.crs = crs
 
+    @profiling.profiled("Model.node_table")
     def node_table(self) -> NodeTable:
         """Compute the full sorted NodeTable from all node types."""
         df_chunks = [node.node.df for node in self._nodes()]
@@ -261,6 +302,606 @@ class Model(FileModel):
         assert node_table.df.index.is_unique, "node_id must be unique"
         return node_table
 
+    def graph(self) -> Graph:
+        """Return the directed graph of the flow links, for network queries.
+
+        The graph is cached, and only built again when the nodes or flow links change.
+        This method will throw `ImportError` if the optional dependency `scipy` isn't installed.
+        """
+        node_ids = [np.empty(0, dtype=np.int32)]
+        for _, node in self._node_models():
+            assert node.node.df is not None
+            node_ids.append(node.node.df.index.to_numpy())
+        node_id = np.concatenate(node_ids)
+        link_df = self.link.df
+        assert link_df is not None
+        flow = link_df[link_df["link_type"] == "flow"]
+        # Boolean indexing copies, so later edits of the links don't change the key
+        key = (
+            node_id,
+            flow["from_node_id"].to_numpy(),
+            flow["to_node_id"].to_numpy(),
+        )
+        if self._graph is None or not all(
+            np.array_equal(a, b) for a, b in zip(self._graph[0], key)
+        ):
+            self._graph = (key, Graph(*key))
+        return self._graph[1]
+
+    def _node_models(self) -> Generator[tuple[str, MultiNodeModel], Any, None]:
+        """Return the field names and instances of all non-empty MultiNodeModels."""
+        for key in self.model_fields.keys():
+            attr = getattr(self, key)
+            if (
+                isinstance(attr, MultiNodeModel)
+                and attr.node.df is not None
+                and not attr.node.df.empty
+            ):
+                yield key, attr
+
+    def _copy_settings(self) -> "Model":
+        """Return a new model without nodes, with a copy of the settings of this model."""
+        return Model(
+            starttime=self.starttime,
+            endtime=self.endtime,
+            crs=self.crs,
+            input_dir=self.input_dir,
+            results_dir=self.results_dir,
+            logging=self.logging.model_copy(deep=True),
+            solver=self.solver.model_copy(deep=True),
+            results=self.results.model_copy(deep=True),
+            allocation=self.allocation.model_copy(deep=True),
+            experimental=self.experimental.model_copy(deep=True),
+            use_validation=self.use_validation,
+        )
+
+    def _set_used_ids(self) -> None:
+        """Register the IDs of all nodes and links as used."""
+        node_df = self.node_table().df
+        link_df = self.link.df
+        assert node_df is not None
+        assert link_df is not None
+        if not node_df.empty:
+            self._used_node_ids.node_ids.update(node_df.index)
+            self._used_node_ids.max_node_id = node_df.index.max()
+        if not link_df.empty:
+            self.link._used_link_ids.node_ids.update(link_df.index)
+            self.link._used_link_ids.max_node_id = link_df.index.max()
+
+    def _select(
+        self, node_ids: ArrayLike, link_node_ids: ArrayLike | None = None
+    ) -> "Model":
+        """Return a new model with the given nodes, and the links between them.
+
+        Links are kept if both nodes are in ``link_node_ids``, which defaults to ``node_ids``.
+        The other settings of the model are copied.
+        """
+        node_ids = np.asarray(node_ids)
+        link_node_ids = node_ids if link_node_ids is None else np.asarray(link_node_ids)
+        model = self._copy_settings()
+
+        for key, node_model in self._node_models():
+            new_node_model = getattr(model, key)
+            for field in node_model._fields():
+                table = getattr(node_model, field)
+                if not isinstance(table, TableModel) or table.df is None:
+                    continue
+                df = table.df
+                if isinstance(table, NodeTable):
+                    df = df[df.index.isin(node_ids)]
+                else:
+                    df = df[df["node_id"].isin(node_ids)]
+                if not df.empty:
+                    setattr(new_node_model, field, df)
+
+        link_df = self.link.df
+        assert link_df is not None
+        model.link.df = link_df[
+            link_df["from_node_id"].isin(link_node_ids)
+            & link_df["to_node_id"].isin(link_node_ids)
+        ]
+        model._set_used_ids()
+        return model
+
+    def subset(
+        self,
+        node_ids: ArrayLike | None = None,
+        *,
+        geometry: BaseGeometry | None = None,
+        subnetwork_id: int | ArrayLike | None = None,
+        add_boundaries: bool = False,
+    ) -> "Model":
+        """Cut out a smaller model with the selected nodes.
+
+        Select the nodes by ID, by a geometry that covers them, or by subnetwork ID.
+        To keep the model valid, the nodes the selection depends on are included too:
+        the flow neighbors of nodes that need them, such as Pumps and Outlets,
+        the control and demand nodes of the selected nodes,
+        and the nodes these control nodes listen to.
+        The tables of all nodes and the links between them are copied.
+
+        Parameters
+        ----------
+        node_ids : ArrayLike, optional
+            The IDs of the nodes to select.
+        geometry : shapely.Geometry, optional
+            Select the nodes covered by this geometry.
+        subnetwork_id : int or ArrayLike, optional
+            Select the nodes of these allocation subnetworks.
+        add_boundaries : bool
+            Replace the Basins that are only included as a flow neighbor by
+            LevelBoundary nodes at the initial Basin level,
+            where the connectivity rules allow it.
+
+        Returns
+        -------
+        model : Model
+        """
+        if (node_ids is None) + (geometry is None) + (subnetwork_id is None) != 2:
+            raise ValueError(
+                "Select nodes with exactly one of node_ids, geometry or subnetwork_id."
+            )
+
+        node_df = self.node_table().df
+        link_df = self.link.df
+        assert node_df is not None
+        assert link_df is not None
+        node_type = node_df["node_type"]
+
+        if geometry is not None:
+            selected = set(node_df.index[node_df.geometry.covered_by(geometry)])
+        elif subnetwork_id is not None:
+            subnetwork = node_df["subnetwork_id"].isin(np.atleast_1d(subnetwork_id))
+            selected = set(node_df.index[subnetwork.fillna(False).astype(bool)])
+        else:
+            assert node_ids is not None
+            selected = set(np.atleast_1d(np.asarray(node_ids)).tolist())
+            missing = selected.difference(node_df.index)
+            if missing:
+                raise ValueError(f"Node IDs not in the model: {sorted(missing)}")
+
+        needs_neighbors = {
+            node_type
+            for node_type, amount in flow_link_neighbor_amount.items()
+            if amount[0] > 0 or amount[2] > 0
+        }
+        requiring = set(node_df.index[node_type.isin(needs_neighbors)])
+        basins = set(node_df.index[node_type == "Basin"])
+
+        is_flow = link_df["link_type"] == "flow"
+        flow_from = link_df["from_node_id"].to_numpy()[is_flow]
+        flow_to = link_df["to_node_id"].to_numpy()[is_flow]
+        control_from = link_df["from_node_id"].to_numpy()[~is_flow]
+        control_to = link_df["to_node_id"].to_numpy()[~is_flow]
+        listen = self._listen_links()
+        listen_from = listen["control_node_id"].to_numpy()
+        listen_to = listen["listen_node_id"].to_numpy()
+        controlling = set(control_from.tolist())
+
+        def neighbors(nodes: set[int], a, b) -> set[int]:
+            ids = np.fromiter(nodes, dtype=np.int64, count=len(nodes))
+            return set(b[np.isin(a, ids)].tolist())
+
+        # Whether a Basin can connect to a node as a LevelBoundary, per flow link
+        from_type = node_type.reindex(flow_from).to_numpy()
+        to_type = node_type.reindex(flow_to).to_numpy()
+        can_replace_from = np.array(
+            [can_connect("LevelBoundary", t) for t in to_type], dtype=bool
+        )
+        can_replace_to = np.array(
+            [can_connect(t, "LevelBoundary") for t in from_type], dtype=bool
+        )
+
+        def replaceable(candidates: set[int]) -> set[int]:
+            """Select the Basins that can connect to the selected nodes as a LevelBoundary."""
+            ids = np.fromiter(selected, dtype=np.int64, count=len(selected))
+            from_selected = np.isin(flow_from, ids)
+            to_selected = np.isin(flow_to, ids)
+            blocked = set(flow_from[to_selected & ~can_replace_from].tolist()) | set(
+                flow_to[from_selected & ~can_replace_to].tolist()
+            )
+            return candidates - blocked
+
+        boundaries: set[int] = set()
+        while True:
+            required = selected & requiring
+            flow_neighbors = neighbors(required, flow_from, flow_to) | neighbors(
+                required, flow_to, flow_from
+            )
+            # Control nodes of the selected nodes, and control nodes that would
+            # otherwise control nothing keep all their targets
+            controllers = neighbors(selected, control_to, control_from)
+            lonely = (selected & controlling) - controllers
+            new = (
+                controllers
+                | neighbors(lonely, control_from, control_to)
+                | neighbors(selected, listen_from, listen_to)
+            )
+            if add_boundaries:
+                candidates = (flow_neighbors & basins) - selected
+                boundaries = replaceable(candidates)
+                new |= flow_neighbors - boundaries
+            else:
+                new |= flow_neighbors
+            new -= selected
+            if not new:
+                break
+            selected |= new
+
+        model = self._select(list(selected), list(selected | boundaries))
+        if boundaries:
+            model._add_level_boundaries(self, sorted(boundaries))
+        return model
+
+    def connected_components(self) -> pd.Series:
+        """Label the independent parts of the model.
+
+        Two nodes are in the same component if they are connected by a flow or
+        control link, or if one is a control node that listens to the other.
+        The components are numbered in the order of their lowest node ID.
+        This method will throw `ImportError` if the optional dependency `scipy` isn't installed.
+
+        Returns
+        -------
+        component : pd.Series
+            The component of every node, indexed by node ID.
+        """
+        node_df = self.node_table().df
+        link_df = self.link.df
+        assert node_df is not None
+        assert link_df is not None
+        listen = self._listen_links()
+        graph = Graph(
+            node_df.index,
+            np.concatenate(
+                [
+                    link_df["from_node_id"].to_numpy(dtype=np.int32),
+                    listen["control_node_id"].to_numpy(dtype=np.int32),
+                ]
+            ),
+            np.concatenate(
+                [
+                    link_df["to_node_id"].to_numpy(dtype=np.int32),
+                    listen["listen_node_id"].to_numpy(dtype=np.int32),
+                ]
+            ),
+        )
+        return graph.connected_components()
+
+    def split_components(self) -> list["Model"]:
+        """Split the model into one model per connected component.
+
+        The components do not exchange water or control information,
+        so they can be run separately, for instance as parallel processes.
+        The node and link IDs are kept, such that results map back to this model,
+        and can be combined with `Model.merge_results`.
+        See `Model.connected_components` for the component of every node.
+        This method will throw `ImportError` if the optional dependency `scipy` isn't installed.
+
+        Returns
+        -------
+        models : list[Model]
+            One model per component, in the order of their lowest node ID.
+        """
+        component = self.connected_components()
+        n_component = int(component.max()) + 1 if len(component) > 0 else 0
+        models = [self._copy_settings() for _ in range(n_component)]
+
+        # Distribute every table over the components in a single pass
+        for key, node_model in self._node_models():
+            for field in node_model._fields():
+                table = getattr(node_model, field)
+                if not isinstance(table, TableModel) or table.df is None:
+                    continue
+                df = table.df
+                node_id = df.index if isinstance(table, NodeTable) else df["node_id"]
+                labels = component.reindex(node_id).to_numpy()
+                for label, group in df.groupby(labels, sort=False):
+                    setattr(getattr(models[int(label)], key), field, group)
+
+        link_df = self.link.df
+        assert link_df is not None
+        labels = component.reindex(link_df["from_node_id"]).to_numpy()
+        link_groups = dict(list(link_df.groupby(labels, sort=False)))
+        for label, model in enumerate(models):
+            if label in link_groups:
+                model.link.df = link_groups[label]
+            model._set_used_ids()
+        return models
+
+    def merge_results(self, models: "list[Model]") -> Path:
+        """Combine the results of models split with `Model.split_components`.
+
+        The Arrow result files of the models are concatenated and sorted by time
+        and by link, node or subgrid ID, and written to the results directory of this model.
+        The solver statistics are summed over the models.
+
+        Parameters
+        ----------
+        models : list[Model]
+            The component models, written to disk and run.
+
+        Returns
+        -------
+        results_path : Path
+            The results directory of this model.
+        """
+        toml_path = self._checked_toml_path()
+        results_path = toml_path.parent / self.results_dir
+
+        files: dict[str, list[Path]] = {}
+        for model in models:
+            model_results = model._checked_toml_path().parent / model.results_dir
+            if not model_results.is_dir():
+                raise FileNotFoundError(
+                    f"Cannot find results in '{model_results}', "
+                    "perhaps the model needs to be run first."
+                )
+            for path in sorted(model_results.glob("*.arrow")):
+                files.setdefault(path.name, []).append(path)
+
+        results_path.mkdir(parents=True, exist_ok=True)
+        for name, paths in files.items():
+            df = _concat(
+                [pd.read_feather(path, dtype_backend="pyarrow") for path in paths],
+                ignore_index=True,
+            )
+            if name == "solver_stats.arrow":
+                df = df.groupby("time", sort=True).sum().reset_index()
+            else:
+                key = ["time" if "time" in df.columns else df.columns[0]]
+                # Order every time step by ID, as the results of a single model,
+                # a stable sort keeps the order within an ID, such as by substance
+                key += [c for c in ("link_id", "node_id", "subgrid_id") if c in df][:1]
+                df = df.sort_values(key, kind="stable", ignore_index=True)
+            df.to_feather(results_path / name)
+        return results_path
+
+    @classmethod
+    def merge(
+        cls,
+        models: Sequence["Model"],
+        offset_strategy: Literal["max", "round", "keep"] = "max",
+        links: pd.DataFrame | None = None,
+    ) -> "Model":
+        """Merge several models into one, renumbering their IDs.
+
+        The node, link, subgrid and allocation subnetwork IDs of every model are
+        shifted by an offset, which is also applied to the columns that refer to them,
+        such as ``from_node_id``, ``to_node_id`` and ``listen_node_id``.
+        The allocation networks of the models therefore stay separate.
+        Only the first model can keep a primary network with subnetwork ID 1,
+        that of a later model becomes a secondary network with a new ID.
+        The settings, such as the start and end time, are taken from the first model.
+
+        Parameters
+        ----------
+        models : Sequence[Model]
+            The models to merge, in the same CRS.
+        offset_strategy : str
+            How the IDs are made unique. Either "max", to continue the IDs of every model
+            after the highest ID of the models before it; "round", to start the IDs of
+            model ``i`` at ``i`` times a power of ten larger than all IDs;
+            or "keep", to keep all IDs, which must then already be unique.
+            With "keep" the subnetwork IDs are still renumbered as with "max",
+            since models commonly reuse the same subnetwork IDs.
+        links : pd.DataFrame, optional
+            Links to add between the merged models, with the columns ``from_model``
+            and ``to_model``, the positions of the models in ``models``, and
+            ``from_node_id`` and ``to_node_id``, the node IDs before merging.
+            An optional ``name`` column names the links.
+            The links are drawn as straight lines, and the link type is
+            inferred from the type of the upstream node.
+
+        Returns
+        -------
+        model : Model
+        """
+        if offset_strategy not in ("max", "round", "keep"):
+            raise ValueError(
+                f"offset_strategy must be 'max', 'round' or 'keep', got '{offset_strategy}'."
+            )
+        if len(models) == 0:
+            raise ValueError("Expected at least one model to merge.")
+        crs = {model.crs for model in models}
+        if len(crs) > 1:
+            raise ValueError(
+                f"Cannot merge models with different CRS: {sorted(crs)}, use Model.to_crs first."
+            )
+
+        node_ids = []
+        subnetwork_ids = []
+        for model in models:
+            node_df = model.node_table().df
+            assert node_df is not None
+            node_ids.append(node_df.index.to_numpy(dtype=np.int64))
+            subnetwork_ids.append(
+                node_df["subnetwork_id"].dropna().unique().to_numpy(np.int64)
+            )
+        link_dfs = [model.link.df for model in models]
+        link_ids = [
+            np.empty(0, dtype=np.int64) if df is None else df.index.to_numpy(np.int64)
+            for df in link_dfs
+        ]
+        subgrid_ids = []
+        for model in models:
+            subgrid_tables = (model.basin.subgrid.df, model.basin.subgrid_time.df)
+            subgrid_ids.append(
+                np.concatenate(
+                    [np.empty(0, dtype=np.int64)]
+                    + [
+                        df["subgrid_id"].to_numpy(np.int64)
+                        for df in subgrid_tables
+                        if df is not None
+                    ]
+                )
+            )
+        node_offsets = _id_offsets(node_ids, offset_strategy)
+        link_offsets = _id_offsets(link_ids, offset_strategy)
+        subgrid_offsets = _id_offsets(subgrid_ids, offset_strategy)
+        # Models usually number their subnetworks the same way, so "keep" renumbers
+        # them as "max" does, to keep the allocation networks of the models separate
+        subnetwork_offsets = _id_offsets(
+            subnetwork_ids, "max" if offset_strategy == "keep" else offset_strategy
+        )
+
+        def shift_node_ids(df: pd.DataFrame, columns: list[str], i: int) -> None:
+            for column in columns:
+                values = df[column].to_numpy(np.int64)
+                unknown = ~np.isin(values, node_ids[i])
+                if unknown.any():
+                    raise ValueError(
+                        f"Model {i} refers to nodes that don't exist in {column}: {np.unique(values[unknown])}"
+                    )
+                df[column] = values + node_offsets[i]
+
+        # Collect the shifted tables of all models, and concatenate each table once
+        tables: dict[tuple[str, str], list[pd.DataFrame]] = {}
+        for i, model in enumerate(models):
+            for key, node_model in model._node_models():
+                for field in node_model._fields():
+                    table = getattr(node_model, field)
+                    if not isinstance(table, TableModel) or table.df is None:
+                        continue
+                    df = table.df.copy()
+                    if isinstance(table, NodeTable):
+                        df.index = df.index + node_offsets[i]
+                        df["subnetwork_id"] += subnetwork_offsets[i]
+                    else:
+                        shift_node_ids(
+                            df, [c for c in df.columns if c.endswith("node_id")], i
+                        )
+                    if "subgrid_id" in df.columns:
+                        df["subgrid_id"] = (
+                            df["subgrid_id"].to_numpy(np.int64) + subgrid_offsets[i]
+                        )
+                    tables.setdefault((key, field), []).append(df)
+
+        merged = models[0]._copy_settings()
+        for (key, field), dfs in tables.items():
+            node_model = getattr(merged, key)
+            is_node_table = isinstance(getattr(node_model, field), NodeTable)
+            setattr(node_model, field, _concat(dfs, ignore_index=not is_node_table))
+
+        shifted_links = []
+        for i, df in enumerate(link_dfs):
+            if df is None or df.empty:
+                continue
+            df = df.copy()
+            df.index = df.index + link_offsets[i]
+            shift_node_ids(df, ["from_node_id", "to_node_id"], i)
+            shifted_links.append(df)
+        if shifted_links:
+            merged.link.df = _concat(shifted_links)
+        if links is not None and not links.empty:
+            merged.link.df = _concat(
+                [merged.link.df, merged._connecting_links(links, node_offsets)]
+            )
+        merged._set_used_ids()
+        return merged
+
+    def _connecting_links(
+        self, links: pd.DataFrame, node_offsets: list[int]
+    ) -> pd.DataFrame:
+        """Create the links between merged models, see `Model.merge`."""
+        offsets = np.asarray(node_offsets)
+        from_node_id = (
+            links["from_node_id"].to_numpy(np.int64)
+            + offsets[links["from_model"].to_numpy()]
+        )
+        to_node_id = (
+            links["to_node_id"].to_numpy(np.int64)
+            + offsets[links["to_model"].to_numpy()]
+        )
+
+        node_df = self.node_table().df
+        assert node_df is not None
+        unknown = ~(
+            np.isin(from_node_id, node_df.index) & np.isin(to_node_id, node_df.index)
+        )
+        if unknown.any():
+            raise ValueError(
+                f"Links refer to nodes that don't exist: {links[unknown].to_dict('records')}"
+            )
+        from_type = node_df["node_type"].loc[from_node_id].to_numpy()
+        to_type = node_df["node_type"].loc[to_node_id].to_numpy()
+        for from_id, to_id, a, b in zip(from_node_id, to_node_id, from_type, to_type):
+            if not can_connect(a, b):
+                raise ValueError(
+                    f"Node #{to_id} of type {b} cannot be downstream of node #{from_id} of type {a}."
+                )
+
+        link_df = self.link.df
+        assert link_df is not None
+        start = 0 if link_df.empty else int(link_df.index.max())
+        geometry = shapely.linestrings(
+            np.stack(
+                [
+                    shapely.get_coordinates(node_df.geometry.loc[from_node_id]),
+                    shapely.get_coordinates(node_df.geometry.loc[to_node_id]),
+                ],
+                axis=1,
+            )
+        )
+        return GeoDataFrame[LinkSchema](
+            data={
+                "from_node_id": from_node_id,
+                "to_node_id": to_node_id,
+                "link_type": np.where(
+                    np.isin(from_type, list(SPATIALCONTROLNODETYPES)), "control", "flow"
+                ),
+                "name": links["name"].to_numpy() if "name" in links else "",
+            },
+            geometry=geometry,
+            crs=self.crs,
+            index=pd.Index(
+                np.arange(start + 1, start + 1 + len(links), dtype=np.int32),
+                name="link_id",
+            ),
+        )
+
+    def _add_level_boundaries(self, source: "Model", basin_ids: list[int]) -> None:
+        """Add LevelBoundary nodes in place of the given Basins of the source model."""
+        basin_node = source.basin.node.df
+        assert basin_node is not None
+        node_df = basin_node.loc[basin_ids].assign(node_type="LevelBoundary")
+
+        # Use the initial level, or else the bottom of the profile
+        level = pd.Series(np.nan, index=pd.Index(basin_ids, name="node_id"))
+        if source.basin.profile.df is not None:
+            bottom = source.basin.profile.df.groupby("node_id")["level"].min()
+            level = level.fillna(bottom.reindex(level.index).astype(float))
+        if source.basin.state.df is not None:
+            state = source.basin.state.df.groupby("node_id")["level"].first()
+            level = state.reindex(level.index).astype(float).fillna(level)
+        static_df = pd.DataFrame(
+            {"node_id": basin_ids, "level": level.fillna(0.0).to_numpy()}
+        )
+
+        level_boundary = self.level_boundary
+        if level_boundary.node.df is not None:
+            node_df = _concat([level_boundary.node.df, node_df])
+        if level_boundary.static.df is not None:
+            static_df = _concat(
+                [level_boundary.static.df, static_df], ignore_index=True
+            )
+        level_boundary.node.df = node_df
+        level_boundary.static = static_df
+
+        # A LevelBoundary cannot be controlled
+        link_df = self.link.df
+        assert link_df is not None
+        self.link.df = link_df[
+            ~(
+                (link_df["link_type"] == "control")
+                & link_df["to_node_id"].isin(basin_ids)
+            )
+        ]
+        self._used_node_ids.node_ids.update(basin_ids)
+        self._used_node_ids.max_node_id = max(
+            self._used_node_ids.max_node_id, max(basin_ids)
+        )
+
     def _nodes(self) -> Generator[MultiNodeModel, Any, None]:
         """Return all non-empty MultiNodeModel instances."""
         for key in self.model_fields.keys():
@@ -281,6 +922,7 @@ class Model(FileModel):
         }
 
     @classmethod
+    @profiling.profiled("Model.read")
     def read(cls, filepath: str | PathLike[str]) -> "Model":
         """Read a model from a TOML file.
 
@@ -293,6 +935,7 @@ class Model(FileModel):
             raise FileNotFoundError(f"File '{filepath}' does not exist.")
         return cls(filepath=filepath)  # type: ignore
 
+    @profiling.profiled("Model.write")
     def write(self, filepath: str | PathLike[str]) -> Path:
         """Write the contents of the model to disk and save it as a TOML configuration file.
 
@@ -319,6 +962,81 @@ class Model(FileModel):
         context_file_writing.set({})
         return fn
 
+    def set_basin_state(
+        self,
+        level: ArrayLike,
+        time: float | datetime.datetime,
+        endtime: datetime.datetime | None = None,
+    ) -> None:
+        """Set the Basin / state table and starttime, to restart from a previous run.
+
+        Parameters
+        ----------
+        level : ArrayLike
+            The level per Basin, sorted by Basin node_id,
+            like the "basin.level" BMI variable.
+        time : float | datetime.datetime
+            The new starttime, either as a datetime, or as seconds since the current starttime,
+            like the time returned by the BMI.
+        endtime : datetime.datetime | None
+            The new endtime, if it changes as well.
+        """
+        assert self.basin.node.df is not None
+        node_id = np.sort(self.basin.node.df.index.to_numpy())
+        level = np.asarray(level, dtype=np.float64)
+        if level.shape != node_id.shape:
+            raise ValueError(
+                f"Expected a level for each of the {node_id.size} Basins, got {level.shape}."
+            )
+        if not isinstance(time, datetime.datetime):
+            time = self.starttime + datetime.timedelta(seconds=float(time))
+
+        self.basin.state = pd.DataFrame({"node_id": node_id, "level": level})
+        self.starttime = time
+        if endtime is not None:
+            self.endtime = endtime
+
+    def write_restart(self, filepath: str | PathLike[str]) -> Path:
+        """Write the model, only rewriting the Basin / state table and the TOML file.
+
+        This is a fast alternative to `write` after `set_basin_state`,
+        since the other tables are not validated, sorted and written again.
+        If `filepath` is in another directory than the current model file,
+        the input files are copied over first.
+
+        Parameters
+        ----------
+        filepath : str | PathLike[str]
+            A file path with .toml extension.
+        """
+        source = self.filepath
+        if source is None:
+            raise FileNotFoundError("Model must be written to disk to write a restart.")
+        filepath = Path(filepath)
+        if not filepath.suffix == ".toml":
+            raise ValueError(f"Filepath '{filepath}' is not a .toml file.")
+
+        source_input_dir = source.parent / self.input_dir
+        input_dir = filepath.parent / self.input_dir
+        input_dir.mkdir(parents=True, exist_ok=True)
+        if source_input_dir.resolve() != input_dir.resolve():
+            # Copy the database and Arrow input files that are not rewritten.
+            shutil.copy2(source_input_dir / "database.gpkg", input_dir)
+            for sub in self._nodes():
+                for table in sub._tables():
+                    if table.filepath is not None and table is not self.basin.state:
+                        target = input_dir / table.filepath
+                        target.parent.mkdir(parents=True, exist_ok=True)
+                        shutil.copy2(source_input_dir / table.filepath, target)
+
+        context_file_writing.set({"database": input_dir / "database.gpkg"})
+        self.basin.state._save(filepath.parent, self.input_dir)
+        self.filepath = filepath
+        fn = self._write_toml(filepath)
+        context_file_writing.set({})
+        return fn
+
+    @profiling.profiled("Model._validate_model")
     def _validate_model(self):
         df_link = self.link.df
         df_chunks = [node.node.df for node in self._nodes()]
@@ -461,8 +1179,8 @@ class Model(FileModel):
         context_file_loading.set({})
         return self
 
-    def plot_control_listen(self, ax):
-        """Plot the implicit listen links of the model."""
+    def _listen_links(self) -> pd.DataFrame:
+        """Collect the implicit listen links of the control nodes."""
         df_listen_link = pd.DataFrame(
             data={
                 "control_node_id": pd.Series([], dtype="int32[pyarrow]"),
@@ -470,8 +1188,13 @@ class Model(FileModel):
             }
         )
 
-        # Listen links from PidControl
-        for table in (self.pid_control.static.df, self.pid_control.time.df):
+        # Listen links from PidControl, ContinuousControl and DiscreteControl
+        for table in (
+            self.pid_control.static.df,
+            self.pid_control.time.df,
+            self.continuous_control.variable.df,
+            self.discrete_control.variable.df,
+        ):
             if table is None:
                 continue
 
@@ -479,48 +1202,33 @@ class Model(FileModel):
             to_add.columns = ["control_node_id", "listen_node_id"]
             df_listen_link = _concat([df_listen_link, to_add])
 
-        # Listen links from ContinuousControl and DiscreteControl
-        for table, name in (
-            (self.continuous_control.variable.df, "ContinuousControl"),
-            (self.discrete_control.variable.df, "DiscreteControl"),
-        ):
-            if table is None:
-                continue
+        return df_listen_link.drop_duplicates()
 
-            to_add = table[["node_id", "listen_node_id"]].drop_duplicates()
-            to_add.columns = [
-                "control_node_id",
-                "listen_node_id",
-            ]
-            df_listen_link = _concat([df_listen_link, to_add])
+    def plot_control_listen(self, ax):
+        """Plot the implicit listen links of the model."""
+        from matplotlib.collections import LineCollection
+
+        df_listen_link = self._listen_links()
+        if df_listen_link.empty:
+            return
 
         # Collect geometry data
         node = self.node_table().df
-        control_nodes_geometry = df_listen_link.merge(
-            node,
-            left_on=["control_node_id"],
-            right_on=["node_id"],
-            how="left",
-        )["geometry"]
-
-        listen_nodes_geometry = df_listen_link.merge(
-            node,
-            left_on=["listen_node_id"],
-            right_on=["node_id"],
-            how="left",
-        )["geometry"]
-
-        # Plot listen links
-        for i, (point_listen, point_control) in enumerate(
-            zip(listen_nodes_geometry, control_nodes_geometry)
-        ):
-            ax.plot(
-                [point_listen.x, point_control.x],
-                [point_listen.y, point_control.y],
-                color="gray",
-                ls="--",
-                label="Listen link" if i == 0 else None,
+        assert node is not None
+        xy = pd.DataFrame({"x": node.geometry.x, "y": node.geometry.y})
+        listen_xy = xy.loc[df_listen_link["listen_node_id"]].to_numpy()
+        control_xy = xy.loc[df_listen_link["control_node_id"]].to_numpy()
+
+        # Plot all listen links at once
+        ax.add_collection(
+            LineCollection(
+                np.stack((listen_xy, control_xy), axis=1),
+                colors="gray",
+                linestyles="--",
+                label="Listen link",
             )
+        )
+        ax.autoscale_view()
         return
 
     def plot(
@@ -528,6 +1236,8 @@ class Model(FileModel):
         ax=None,
         indicate_subnetworks: bool = True,
         aspect_ratio_bound: float = 0.33,
+        labels: bool | None = None,
+        level_of_detail: bool = False,
     ) -> Any:
         """Plot the nodes, links and allocation networks of the model.
 
@@ -540,22 +1250,30 @@ class Model(FileModel):
         aspect_ratio_bound : float
             The maximal aspect ratio in (0,1). The smaller this number, the further the figure
             shape is allowed to be from a square
+        labels : Optional, bool
+            Whether to label the nodes with their node ID.
+            By default only small models are labeled.
+        level_of_detail : bool
+            Plot only a single node of each type and link direction marker per pixel,
+            if they outnumber the pixels of the axis.
 
         Returns
         -------
         ax : matplotlib.pyplot.Artist
             Axis on which the plot is drawn.
         """
+        import matplotlib.pyplot as plt
+
         if ax is None:
             _, ax = plt.subplots()
             ax.axis("off")
 
         node = self.node_table()
-        self.link.plot(ax=ax, zorder=2)
+        self.link.plot(ax=ax, zorder=2, level_of_detail=level_of_detail)
         self.plot_control_listen(ax)
-        node.plot(ax=ax, zorder=3)
+        node.plot(ax=ax, zorder=3, labels=labels, level_of_detail=level_of_detail)
 
-        handles, labels = ax.get_legend_handles_labels()
+        handles, legend_labels = ax.get_legend_handles_labels()
 
         if indicate_subnetworks:
             (
@@ -563,9 +1281,9 @@ class Model(FileModel):
                 labels_subnetworks,
             ) = node.plot_allocation_networks(ax=ax, zorder=1)
             handles += handles_subnetworks
-            labels += labels_subnetworks
+            legend_labels += labels_subnetworks
 
-        ax.legend(handles, labels, loc="lower left", bbox_to_anchor=(1, 0.5))
+        ax.legend(handles, legend_labels, loc="lower left", bbox_to_anchor=(1, 0.5))
 
         # Enforce aspect ratio bound
         xlim = ax.get_xlim()
@@ -584,6 +1302,7 @@ class Model(FileModel):
 
         return ax
 
+    @profiling.profiled("Model.to_xugrid")
     def to_xugrid(self, add_flow: bool = False, add_allocation: bool = False):
         """Convert the network to a `xugrid.UgridDataset`.
 
@@ -0,0 +1,281 @@
+"""Opt-in timing and memory profiling of the ribasim Python package.
+
+The slow parts of reading, validating and writing models are wrapped in named spans.
+When profiling is enabled, every span records how often it ran and how long it took,
+nested in the spans it ran in. When profiling is disabled, a span costs a single check.
+
+Enable profiling for a block of code with `profile`:
+
+>>> from ribasim import profiling
+>>> with profiling.profile() as report:
+...     model.write("model/ribasim.toml")
+>>> print(report)
+
+Or for a whole process, by setting the environment variable ``RIBASIM_PROFILE``.
+With the value ``1`` the report is printed to stderr at exit,
+with a path ending in ``.json`` or ``.arrow`` the report is written to that file.
+Set ``RIBASIM_PROFILE_MEMORY=1`` to also count allocations.
+"""
+
+import atexit
+import json
+import os
+import sys
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import dataclass, field
+from functools import wraps
+from pathlib import Path
+from time import perf_counter
+from typing import Any, TypeVar
+
+import pandas as pd
+
+__all__ = ("Report", "Span", "enabled", "profile", "profiled", "span")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_DISABLED = nullcontext()
+
+
+@dataclass
+class Span:
+    """The aggregated measurements of all runs of a span at the same place in the tree.
+
+    ``allocated`` is the net number of bytes allocated, and ``peak`` the largest
+    number of bytes allocated at once, over the start of a run.
+    Both are only measured when profiling with ``memory=True``.
+    """
+
+    name: str
+    count: int = 0
+    time: float = 0.0
+    allocated: int = 0
+    peak: int = 0
+    children: dict[str, "Span"] = field(default_factory=dict)
+
+    @property
+    def self_time(self) -> float:
+        """The time spent in this span, outside of its child spans."""
+        return self.time - sum(child.time for child in self.children.values())
+
+    def _child(self, name: str) -> "Span":
+        child = self.children.get(name)
+        if child is None:
+            child = self.children[name] = Span(name)
+        return child
+
+
+class Report:
+    """The nested measurements of a profiling session."""
+
+    def __init__(self, memory: bool = False):
+        self.root = Span("total")
+        self.memory = memory
+
+    def _walk(self) -> Iterator[tuple[tuple[str, ...], Span]]:
+        stack: list[tuple[tuple[str, ...], Span]] = [
+            ((child.name,), child) for child in self.root.children.values()
+        ]
+        stack.reverse()
+        while stack:
+            path, node = stack.pop()
+            yield path, node
+            stack.extend(
+                ((*path, child.name), child)
+                for child in reversed(node.children.values())
+            )
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Return one row per span, in the order they first ran, children after their parent."""
+        rows = [
+            {
+                "path": " > ".join(path),
+                "name": node.name,
+                "depth": len(path) - 1,
+                "count": node.count,
+                "time": node.time,
+                "self_time": node.self_time,
+                "allocated": node.allocated,
+                "peak": node.peak,
+            }
+            for path, node in self._walk()
+        ]
+        columns = [
+            "path",
+            "name",
+            "depth",
+            "count",
+            "time",
+            "self_time",
+            "allocated",
+            "peak",
+        ]
+        return pd.DataFrame(rows, columns=columns)
+
+    def to_text(self) -> str:
+        """Format the report as an indented table."""
+        header = f"{'span':<60} {'count':>7} {'time [s]':>10} {'self [s]':>10}"
+        if self.memory:
+            header += f" {'alloc [MiB]':>12} {'peak [MiB]':>11}"
+        lines = [header]
+        for path, node in self._walk():
+            name = "  " * (len(path) - 1) + node.name
+            line = (
+                f"{name:<60} {node.count:>7} {node.time:>10.4f} {node.self_time:>10.4f}"
+            )
+            if self.memory:
+                line += f" {node.allocated / 2**20:>12.2f} {node.peak / 2**20:>11.2f}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def to_json(self, path: str | os.PathLike[str] | None = None) -> str:
+        """Return the report as JSON, and write it to ``path`` if given."""
+        text = json.dumps(
+            {"memory": self.memory, "spans": self.to_dataframe().to_dict("records")},
+            indent=2,
+        )
+        if path is not None:
+            Path(path).write_text(text)
+        return text
+
+    def to_arrow(self, path: str | os.PathLike[str]) -> None:
+        """Write the spans of the report to an Arrow file."""
+        self.to_dataframe().to_feather(path)
+
+    def __str__(self) -> str:
+        return self.to_text()
+
+
+class _Profiler:
+    def __init__(self, report: Report):
+        self.report = report
+        # Every frame holds the span, its start time and memory, and highest memory
+        self.stack: list[list[Any]] = [[report.root, 0.0, 0, 0]]
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        node = self.stack[-1][0]._child(name)
+        memory = self.report.memory and tracemalloc.is_tracing()
+        current = 0
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            parent = self.stack[-1]
+            parent[3] = max(parent[3], peak)
+            tracemalloc.reset_peak()
+        frame = [node, perf_counter(), current, current]
+        self.stack.append(frame)
+        try:
+            yield
+        finally:
+            self.stack.pop()
+            node.count += 1
+            node.time += perf_counter() - frame[1]
+            if memory and tracemalloc.is_tracing():
+                end, peak = tracemalloc.get_traced_memory()
+                highest = max(frame[3], peak)
+                node.allocated += end - frame[2]
+                node.peak = max(node.peak, highest - frame[2])
+                parent = self.stack[-1]
+                parent[3] = max(parent[3], highest)
+
+
+_profiler: _Profiler | None = None
+
+
+def enabled() -> bool:
+    """Return whether profiling is enabled."""
+    return _profiler is not None
+
+
+def span(name: str, detail: str | None = None) -> AbstractContextManager[Any]:
+    """Measure a block of code as a span named ``name``, or ``"name: detail"``.
+
+    Spans that run inside another span are reported as its children.
+    If profiling is disabled this does nothing.
+    """
+    if _profiler is None:
+        return _DISABLED
+    return _profiler.span(name if detail is None else f"{name}: {detail}")
+
+
+def profiled(name: str) -> Callable[[F], F]:
+    """Measure every call of the decorated function as a span, see `span`."""
+
+    def decorator(f: F) -> F:
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return f(*args, **kwargs)
+            with _profiler.span(name):
+                return f(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def _start(memory: bool) -> Report:
+    global _profiler
+    if _profiler is not None:
+        raise ValueError("Profiling is already enabled.")
+    report = Report(memory=memory)
+    _profiler = _Profiler(report)
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return report
+
+
+def _stop(started_tracing: bool) -> None:
+    global _profiler
+    _profiler = None
+    if started_tracing:
+        tracemalloc.stop()
+
+
+@contextmanager
+def profile(memory: bool = False) -> Iterator[Report]:
+    """Enable profiling in a block of code, and return the report.
+
+    The report is complete at the end of the block.
+
+    Parameters
+    ----------
+    memory : bool
+        Also measure the allocated memory with `tracemalloc`, which slows down the code.
+    """
+    started_tracing = memory and not tracemalloc.is_tracing()
+    report = _start(memory)
+    start = perf_counter()
+    try:
+        yield report
+    finally:
+        report.root.count = 1
+        report.root.time = perf_counter() - start
+        _stop(started_tracing)
+
+
+def _profile_process(destination: str, memory: bool) -> None:
+    """Profile until the process exits, then print or write the report."""
+    started_tracing = memory and not tracemalloc.is_tracing()
+    report = _start(memory)
+    start = perf_counter()
+
+    def finish() -> None:
+        report.root.count = 1
+        report.root.time = perf_counter() - start
+        _stop(started_tracing)
+        if destination.endswith(".json"):
+            report.to_json(destination)
+        elif destination.endswith(".arrow"):
+            report.to_arrow(destination)
+        else:
+            print(report.to_text(), file=sys.stderr)
+
+    atexit.register(finish)
+
+
+_destination = os.environ.get("RIBASIM_PROFILE", "")
+if _destination not in ("", "0"):
+    _profile_process(_destination, os.environ.get("RIBASIM_PROFILE_MEMORY") == "1")
@@ -26,6 +26,16 @@ class _BaseSchema(pa.DataFrameModel):
         df.index.name = cls._index_name()
         return df
 
+    @pa.dataframe_parser
+    @classmethod
+    def _object_categories(cls, df):
+        # Categories read from Arrow are strings, keep them equal to those created in Python
+        for column in df.select_dtypes("category"):
+            categories = df[column].cat.categories
+            if categories.dtype != object:
+                df[column] = df[column].cat.rename_categories(categories.astype(object))
+        return df
+
     @classmethod
     def migrate(cls, df: Any, schema_version: int) -> Any:
         f: Callable[[Any, Any], Any] = getattr(
@@ -42,9 +52,7 @@ class BasinConcentrationExternalSchema(_BaseSchema):
     time: Series[Annotated[pd.ArrowDtype, pyarrow.timestamp("ms")]] = pa.Field(
         nullable=False
     )
-    substance: Series[Annotated[pd.ArrowDtype, pyarrow.string()]] = pa.Field(
-        nullable=False
-    )
+    substance: Series[pd.CategoricalDtype] = pa.Field(nullable=False)
     concentration: Series[Annotated[pd.ArrowDtype, pyarrow.float64()]] = pa.Field(
         nullable=True
     )
@@ -55,9 +63,7 @@ class BasinConcentrationStateSchema(_BaseSchema):
     node_id: Series[Annotated[pd.ArrowDtype, pyarrow.int32()]] = pa.Field(
         nullable=False, default=0
     )
-    substance: Series[Annotated[pd.ArrowDtype, pyarrow.string()]] = pa.Field(
-        nullable=False
-    )
+    substance: Series[pd.CategoricalDtype] = pa.Field(nullable=False)
     concentration: Series[Annotated[pd.ArrowDtype, pyarrow.float64()]] = pa.Field(
         nullable=True
     )
@@ -71,9 +77,7 @@ class BasinConcentrationSchema(_BaseSchema):
     time: Series[Annotated[pd.ArrowDtype, pyarrow.timestamp("ms")]] = pa.Field(
         nullable=False
     )
-    substance: Series[Annotated[pd.ArrowDtype, pyarrow.string()]] = pa.Field(
-        nullable=False
-    )
+    substance: Series[pd.CategoricalDtype] = pa.Field(nullable=False)
     drainage: Series[Annotated[pd.ArrowDtype, pyarrow.float64()]] = pa.Field(
         nullable=True
     )
@@ -241,9 +245,7 @@ class DiscreteControlLogicSchema(_BaseSchema):
     truth_state: Series[Annotated[pd.ArrowDtype, pyarrow.string()]] = pa.Field(
         nullable=False
     )
-    control_state: Series[Annotated[pd.ArrowDtype, pyarrow.string()]] = pa.Field(
-        nullable=False
-    )
+    control_state: Series[pd.CategoricalDtype] = pa.Field(nullable=False)
 
 
 class DiscreteControlVariableSchema(_BaseSchema):
@@ -276,9 +278,7 @@ class FlowBoundaryConcentrationSchema(_BaseSchema):
     time: Series[Annotated[pd.ArrowDtype, pyarrow.timestamp("ms")]] = pa.Field(
         nullable=False
     )
-    substance: Series[Annotated[pd.ArrowDtype, pyarrow.string()]] = pa.Field(
-        nullable=False
-    )
+    substance: Series[pd.CategoricalDtype] = pa.Field(nullable=False)
     concentration: Series[Annotated[pd.ArrowDtype, pyarrow.float64()]] = pa.Field(
         nullable=False
     )
@@ -345,9 +345,7 @@ class LevelBoundaryConcentrationSchema(_BaseSchema):
     time: Series[Annotated[pd.ArrowDtype, pyarrow.timestamp("ms")]] = pa.Field(
         nullable=False
     )
-    substance: Series[Annotated[pd.ArrowDtype, pyarrow.string()]] = pa.Field(
-        nullable=False
-    )
+    substance: Series[pd.CategoricalDtype] = pa.Field(nullable=False)
     concentration: Series[Annotated[pd.ArrowDtype, pyarrow.float64()]] = pa.Field(
         nullable=False
     )
@@ -424,9 +422,7 @@ class LinearResistanceStaticSchema(_BaseSchema):
     max_flow_rate: Series[Annotated[pd.ArrowDtype, pyarrow.float64()]] = pa.Field(
         nullable=True
     )
-    control_state: Series[Annotated[pd.ArrowDtype, pyarrow.string()]] = pa.Field(
-        nullable=True
-    )
+    control_state: Series[pd.CategoricalDtype] = pa.Field(nullable=True)
 
 
 class ManningResistanceStaticSchema(_BaseSchema):
@@ -447,9 +443,7 @@ class ManningResistanceStaticSchema(_BaseSchema):
     profile_slope: Series[Annotated[pd.ArrowDtype, pyarrow.float64()]] = pa.Field(
         nullable=False
     )
-    control_state: Series[Annotated[pd.ArrowDtype, pyarrow.string()]] = pa.Field(
-        nullable=True
-    )
+    control_state: Series[pd.CategoricalDtype] = pa.Field(nullable=True)
 
 
 class OutletStaticSchema(_BaseSchema):
@@ -473,9 +467,7 @@ class OutletStaticSchema(_BaseSchema):
     max_downstream_level: Series[Annotated[pd.ArrowDtype, pyarrow.float64()]] = (
         pa.Field(nullable=True)
     )
-    control_state: Series[Annotated[pd.ArrowDtype, pyarrow.string()]] = pa.Field(
-        nullable=True
-    )
+    control_state: Series[pd.CategoricalDtype] = pa.Field(nullable=True)
 
 
 class PidControlStaticSchema(_BaseSchema):
@@ -499,9 +491,7 @@ class PidControlStaticSchema(_BaseSchema):
     derivative: Series[Annotated[pd.ArrowDtype, pyarrow.float64()]] = pa.Field(
         nullable=False
     )
-    control_state: Series[Annotated[pd.ArrowDtype, pyarrow.string()]] = pa.Field(
-        nullable=True
-    )
+    control_state: Series[pd.CategoricalDtype] = pa.Field(nullable=True)
 
 
 class PidControlTimeSchema(_BaseSchema):
@@ -527,9 +517,7 @@ class PidControlTimeSchema(_BaseSchema):
     derivative: Series[Annotated[pd.ArrowDtype, pyarrow.float64()]] = pa.Field(
         nullable=False
     )
-    control_state: Series[Annotated[pd.ArrowDtype, pyarrow.string()]] = pa.Field(
-        nullable=True
-    )
+    control_state: Series[pd.CategoricalDtype] = pa.Field(nullable=True)
 
 
 class PumpStaticSchema(_BaseSchema):
@@ -553,9 +541,7 @@ class PumpStaticSchema(_BaseSchema):
     max_downstream_level: Series[Annotated[pd.ArrowDtype, pyarrow.float64()]] = (
         pa.Field(nullable=True)
     )
-    control_state: Series[Annotated[pd.ArrowDtype, pyarrow.string()]] = pa.Field(
-        nullable=True
-    )
+    control_state: Series[pd.CategoricalDtype] = pa.Field(nullable=True)
 
 
 class TabulatedRatingCurveStaticSchema(_BaseSchema):
@@ -573,9 +559,7 @@ class TabulatedRatingCurveStaticSchema(_BaseSchema):
     max_downstream_level: Series[Annotated[pd.ArrowDtype, pyarrow.float64()]] = (
         pa.Field(nullable=True)
     )
-    control_state: Series[Annotated[pd.ArrowDtype, pyarrow.string()]] = pa.Field(
-        nullable=True
-    )
+    control_state: Series[pd.CategoricalDtype] = pa.Field(nullable=True)
 
 
 class TabulatedRatingCurveTimeSchema(_BaseSchema):
@@ -605,9 +589,7 @@ class UserDemandConcentrationSchema(_BaseSchema):
     time: Series[Annotated[pd.ArrowDtype, pyarrow.timestamp("ms")]] = pa.Field(
         nullable=False
     )
-    substance: Series[Annotated[pd.ArrowDtype, pyarrow.string()]] = pa.Field(
-        nullable=False
-    )
+    substance: Series[pd.CategoricalDtype] = pa.Field(nullable=False)
     concentration: Series[Annotated[pd.ArrowDtype, pyarrow.float64()]] = pa.Field(
         nullable=False
     )
@@ -1,8 +1,10 @@
 import re
+from importlib import import_module
 from warnings import catch_warnings, filterwarnings
 
 import numpy as np
 import pandas as pd
+from numpy.typing import NDArray
 from pandera.dtypes import Int32
 from pandera.typing import Series
 from pydantic import BaseModel, NonNegativeInt
@@ -30,6 +32,28 @@ class MissingOptionalModule:
         )
 
 
+class LazyModule:
+    """Imports an optional module on first use, to keep `import ribasim` fast.
+
+    If the module isn't installed, using it raises the error of `MissingOptionalModule`.
+    """
+
+    def __init__(self, name, suggestion="all"):
+        self.name = name
+        self.suggestion = suggestion
+        self.module = None
+
+    def __getattr__(self, attr):
+        if self.module is None:
+            try:
+                self.module = import_module(self.name)
+            except ImportError:
+                self.module = MissingOptionalModule(
+                    self.name.partition(".")[0], self.suggestion
+                )
+        return getattr(self.module, attr)
+
+
 def _node_lookup_numpy(node_id) -> Series[Int32]:
     """Create a lookup table from from node_id to the node dimension index.
 
@@ -86,6 +110,32 @@ def _concat(dfs, **kwargs):
         return pd.concat(dfs, **kwargs)
 
 
+def _one_per_pixel(ax, x, y) -> NDArray[np.bool_]:
+    """Select a single point per pixel of the axes, if the points outnumber the pixels.
+
+    Used as the level of detail of plots, since only one point per pixel is visible.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    width = max(int(ax.bbox.width), 1)
+    height = max(int(ax.bbox.height), 1)
+    keep = np.ones(len(x), dtype=bool)
+    if len(x) <= width * height:
+        return keep
+
+    def pixel(v, n):
+        span = np.ptp(v)
+        if span == 0:
+            return np.zeros(len(v), dtype=np.int64)
+        return ((v - v.min()) / span * (n - 1)).astype(np.int64)
+
+    key = pixel(x, width) * height + pixel(y, height)
+    _, first = np.unique(key, return_index=True)
+    keep[:] = False
+    keep[first] = True
+    return keep
+
+
 class UsedIDs(BaseModel):
     """A helper class to manage globally unique node IDs.
 
@@ -1,9 +1,12 @@
 import os
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
 import pytest
 from ribasim import Model
 from ribasim.delwaq import add_tracer, generate, parse, run_delwaq
+from ribasim.delwaq.generate import _initial_concentrations
 
 delwaq_dir = Path(__file__).parent
 
@@ -48,3 +51,32 @@ def test_offline_delwaq_coupling():
         "Tracer",
         "UserDemand",
     ]
+
+
+def test_initial_concentrations():
+    initial = pd.DataFrame(
+        {
+            "node_id": [1, 1, 3, 3, 9],
+            "substance": pd.Categorical(["Cl", "Initial", "Cl", "Cl", "Cl"]),
+            "concentration": [35.0, np.nan, 1.0, 2.0, 5.0],
+        }
+    )
+    # Basin 9 is not part of the Delwaq network
+    icdf = _initial_concentrations(
+        initial, {1: 1, 3: 2}, {"Cl", "Initial", "Tracer"}, {"Initial": 1.0}
+    )
+    assert icdf.columns.tolist() == ["Cl", "Initial", "Tracer"]
+    assert icdf.index.tolist() == [1, 2]
+    # NaN overrides the default, and the last duplicate wins
+    np.testing.assert_array_equal(
+        icdf.to_numpy(), [[35.0, np.nan, 0.0], [2.0, 1.0, 0.0]]
+    )
+
+    # A substance that is not in the model would overwrite the last column
+    with pytest.raises(ValueError, match=r"unknown substances: \['Unknown'\]"):
+        _initial_concentrations(
+            initial.assign(substance=["Cl", "Initial", "Cl", "Unknown", "Cl"]),
+            {1: 1, 3: 2},
+            {"Cl", "Initial", "Tracer"},
+            {},
+        )
@@ -0,0 +1,108 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+import xarray as xr
+from ribasim.forcing import ZonalWeights, basin_time, iter_basin_time
+from ribasim.nodes import basin
+
+
+@pytest.fixture()
+def grid():
+    # Three by four cells of 10 m, with y decreasing like most rasters
+    time = pd.date_range("2020-01-01", periods=5, freq="D")
+    x = np.array([5.0, 15.0, 25.0, 35.0])
+    y = np.array([25.0, 15.0, 5.0])
+    precipitation = np.arange(5 * 3 * 4, dtype=float).reshape(5, 3, 4)
+    precipitation[:, 0, 0] = np.nan
+    return xr.Dataset(
+        {"pr": (("time", "y", "x"), precipitation)},
+        coords={"time": time, "y": y, "x": x},
+    )
+
+
+@pytest.fixture()
+def area():
+    return gpd.GeoDataFrame(
+        {"node_id": [2, 1, 1, 3]},
+        geometry=[
+            # Exactly cell (y=5, x=35)
+            shapely.box(30.0, 0.0, 40.0, 10.0),
+            # Half of cell (y=15, x=5) and half of (y=15, x=15), in two parts
+            shapely.box(5.0, 10.0, 10.0, 20.0),
+            shapely.box(10.0, 10.0, 15.0, 20.0),
+            # The NaN cell (y=25, x=5), and outside of the grid
+            shapely.box(-10.0, 20.0, 10.0, 30.0),
+        ],
+    )
+
+
+def test_zonal_weights(area, grid):
+    weights = ZonalWeights(area, grid["x"], grid["y"])
+    np.testing.assert_array_equal(weights.node_id, [1, 2, 3])
+    assert weights.shape == (3, 4)
+    assert weights.matrix.shape == (3, 12)
+    assert weights.matrix.nnz == 4
+    np.testing.assert_allclose(weights.matrix.sum(axis=1), [100.0, 100.0, 100.0])
+
+    values = grid["pr"].isel(time=0).to_numpy()
+    mean = weights.aggregate(values)
+    np.testing.assert_allclose(
+        mean[:2], [(values[1, 0] + values[1, 1]) / 2, values[2, 3]]
+    )
+    assert np.isnan(mean[2])
+    assert weights.aggregate(grid["pr"].to_numpy()).shape == (5, 3)
+
+    with pytest.raises(ValueError, match="grid is"):
+        weights.aggregate(values[:2])
+
+
+def test_zonal_weights_save(area, grid, tmp_path):
+    weights = ZonalWeights(area, grid["x"], grid["y"])
+    weights.save(tmp_path / "weights.npz")
+    loaded = ZonalWeights.load(tmp_path / "weights.npz")
+    np.testing.assert_array_equal(loaded.node_id, weights.node_id)
+    assert (loaded.matrix != weights.matrix).nnz == 0
+
+    values = grid["pr"].to_numpy()
+    np.testing.assert_array_equal(loaded.aggregate(values), weights.aggregate(values))
+
+
+def test_basin_time(area, grid):
+    df = basin_time(area, grid, {"precipitation": "pr"}, chunk_size=2)
+    assert len(df) == 15
+    assert df["time"].nunique() == 5
+    assert list(df.columns) == ["node_id", "time", "precipitation"]
+    node_2 = df[df["node_id"] == 2]
+    np.testing.assert_allclose(node_2["precipitation"], grid["pr"][:, 2, 3])
+
+    chunks = list(iter_basin_time(area, grid, {"precipitation": "pr"}, chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [6, 6, 3]
+
+    # The table fits in Basin / time
+    basin.Time(df=df)
+
+    # Without time steps the table is empty, with the same columns and types
+    empty = basin_time(area, grid.isel(time=slice(0, 0)), {"precipitation": "pr"})
+    assert len(empty) == 0
+    assert (empty.dtypes == df.dtypes).all()
+
+    other = grid.assign_coords(x=grid["x"] + 1.0)
+    weights = ZonalWeights(area, grid["x"], grid["y"])
+    with pytest.raises(ValueError, match="different grid"):
+        basin_time(area, other, {"precipitation": "pr"}, weights=weights)
+
+
+def test_basin_time_model(basic, grid):
+    node = basic.basin.node.df
+    basic.basin.area.df = gpd.GeoDataFrame(
+        {"node_id": node.index}, geometry=node.buffer(5.0), crs=node.crs
+    )
+    weights = ZonalWeights(basic.basin.area, grid["x"], grid["y"])
+    np.testing.assert_array_equal(weights.node_id, node.index)
+
+    basic.basin.time = basin.Time(
+        df=basin_time(basic.basin.area, grid, {"drainage": "pr"})
+    )
+    assert len(basic.basin.time.df) == 5 * len(node)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from ribasim.graph import Graph
+from ribasim_testmodels import synthetic_network_model
+
+
+def test_graph(basic):
+    graph = basic.graph()
+    assert graph is basic.graph()
+    assert len(graph) == len(basic.node_table().df)
+
+    np.testing.assert_array_equal(graph.downstream(6), [6, 7, 9, 10, 17])
+    np.testing.assert_array_equal(graph.upstream([11, 15]), [11, 15])
+    upstream = graph.upstream(17)
+    assert 4 not in upstream and 14 not in upstream
+    assert graph.connected_components().nunique() == 1
+
+    order = graph.topological_order()
+    position = dict(zip(order, range(len(order))))
+    link = basic.link.df
+    for from_node_id, to_node_id in zip(link["from_node_id"], link["to_node_id"]):
+        assert position[from_node_id] < position[to_node_id]
+
+    with pytest.raises(ValueError, match="not in the graph"):
+        graph.upstream(100)
+
+
+def test_graph_update(basic):
+    graph = basic.graph()
+    basic.link.df = basic.link.df.drop(index=16)
+    assert basic.graph() is not graph
+    np.testing.assert_array_equal(basic.graph().downstream(10), [10])
+    assert basic.graph().connected_components().nunique() == 2
+
+
+def test_graph_rewire(basic):
+    graph = basic.graph()
+    # Swap the targets of two links, which keeps the set of IDs the same
+    link = basic.link.df
+    link.loc[[1, 4], "to_node_id"] = link.loc[[4, 1], "to_node_id"].to_numpy()
+    assert basic.graph() is not graph
+    np.testing.assert_array_equal(basic.graph().downstream(1), [1, 5, 6, 7, 9, 10, 17])
+    assert basic.graph() is basic.graph()
+
+
+def test_graph_cycle():
+    graph = Graph([1, 2, 3], [1, 2, 3], [2, 3, 1])
+    np.testing.assert_array_equal(graph.downstream(2), [1, 2, 3])
+    with pytest.raises(ValueError, match="cycle"):
+        graph.topological_order()
+
+
+def test_graph_synthetic():
+    model = synthetic_network_model(1000, control_fraction=0.0, demand_fraction=0.0)
+    graph = model.graph()
+    terminal_id = model.terminal.node.df.index
+    # Every node without control drains to a Terminal
+    assert len(graph.upstream(terminal_id)) == len(graph)
+    assert graph.connected_components().nunique() == len(terminal_id)
@@ -0,0 +1,50 @@
+import subprocess
+import sys
+
+import pytest
+from ribasim.utils import LazyModule
+
+# Modules that are only needed for plotting, diffing, xugrid, graphs or Delwaq
+LAZY_MODULES = ("matplotlib", "datacompy", "xugrid", "scipy", "jinja2", "networkx")
+
+
+def test_import_time():
+    """Check with `python -X importtime` that `import ribasim` skips heavy modules."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import ribasim"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Lines look like "import time: self [us] | cumulative | imported package"
+    imported = {
+        line.rpartition("|")[2].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+
+    assert "ribasim.model" in imported
+    assert not [m for m in imported if m.partition(".")[0] in LAZY_MODULES]
+
+
+def test_schemas_built_on_demand():
+    """Check that the pandera schemas are built on first validation, not on import."""
+    code = """
+import ribasim
+from ribasim.input_base import _build_schema
+from ribasim.nodes import basin
+
+assert _build_schema.cache_info().currsize == 0
+basin.Static(precipitation=[0.0])
+assert _build_schema.cache_info().currsize == 1
+basin.Static(precipitation=[1.0])
+assert _build_schema.cache_info().hits > 0
+"""
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_lazy_module():
+    assert LazyModule("json").dumps([]) == "[]"
+    missing = LazyModule("ribasim_not_installed", "netcdf")
+    with pytest.raises(ImportError, match=r"pip install ribasim\[netcdf\]"):
+        missing.anything
@@ -1,17 +1,25 @@
+import shutil
+import sqlite3
+from contextlib import closing
 from datetime import datetime
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
 import pytest
 import ribasim
 import tomli
 from pandas import DataFrame
 from pandas.testing import assert_frame_equal
+from pyarrow import feather
 from pydantic import ValidationError
 from ribasim import Model, Node, Solver
+from ribasim.geometry.link import LINK_TYPES
+from ribasim.geometry.node import NODE_TYPES
 from ribasim.nodes import basin, flow_boundary, flow_demand, pump, user_demand
 from ribasim.utils import UsedIDs
+from ribasim_testmodels import synthetic_network_model
 from shapely.geometry import Point
 
 
@@ -324,10 +332,13 @@ def test_datetime_timezone():
     assert model.endtime.tzinfo is None
 
 
-def test_minimal_toml():
+def test_minimal_toml(tmp_path):
     # Check if the TOML used in QGIS tests is still valid.
-    toml_path = Path(__file__).parents[3] / "ribasim_qgis/tests/data/simple_valid.toml"
-    (toml_path.parent / "database.gpkg").touch()  # database file must exist for `read`
+    source = Path(__file__).parents[3] / "ribasim_qgis/tests/data/simple_valid.toml"
+    # Copy it, to not leave a database file in the source tree
+    toml_path = tmp_path / "ribasim.toml"
+    shutil.copy(source, toml_path)
+    (tmp_path / "database.gpkg").touch()  # database file must exist for `read`
     model = ribasim.Model.read(toml_path)
     assert model.crs == "EPSG:28992"
 
@@ -374,7 +385,8 @@ def test_arrow_dtype():
         active=[None, False],
     ).df
 
-    assert df["control_state"].dtype == "string[pyarrow]"
+    assert df["control_state"].dtype == "category"
+    assert df["control_state"].isna().iloc[1]
     assert df["active"].dtype == "bool[pyarrow]"
     assert df["active"].isna().iloc[0]
 
@@ -394,3 +406,74 @@ def test_arrow_dtype():
 
     assert df["demand_priority"].dtype == "int32[pyarrow]"
     assert df["demand_priority"].isna().all()
+
+
+@pytest.mark.parametrize("topology", ["tree", "grid", "looped"])
+def test_synthetic_network(topology, tmp_path):
+    kwargs = {"topology": topology, "allocation_subnetworks": 2, "forcing_years": 1}
+    model = synthetic_network_model(200, **kwargs)
+    # The same arguments give the same model
+    assert model.link.df.equals(synthetic_network_model(200, **kwargs).link.df)
+
+    node_df = model.node_table().df
+    assert (node_df["node_type"] == "Basin").sum() == 200
+    assert node_df.index.is_unique
+    assert model.link.df["from_node_id"].isin(node_df.index).all()
+    assert model.link.df["to_node_id"].isin(node_df.index).all()
+    assert set(node_df["subnetwork_id"].dropna()) == {1, 2, 3}
+
+    model.write(tmp_path / "ribasim.toml")
+    model_loaded = Model.read(tmp_path / "ribasim.toml")
+    __assert_equal(model.link.df, model_loaded.link.df)
+    __assert_equal(model.basin.time.df, model_loaded.basin.time.df)
+
+    # Nodes can still be added after the bulk generation
+    assert model.terminal.add(Node(geometry=Point(0, 0))).node_id == len(node_df) + 1
+
+
+def test_categorical_roundtrip(basic, tmp_path):
+    model = basic
+    model.basin.concentration.set_filepath(Path("concentration.arrow"))
+    toml_path = tmp_path / "ribasim.toml"
+    model.write(toml_path)
+
+    # On disk the GeoPackage holds plain text, and Arrow a dictionary of strings
+    with closing(sqlite3.connect(tmp_path / "database.gpkg")) as connection:
+        for table, column in [("Node", "node_type"), ("Link", "link_type")]:
+            (dtype,) = connection.execute(
+                f"SELECT type FROM pragma_table_info('{table}') WHERE name = ?",
+                (column,),
+            ).fetchone()
+            assert dtype == "TEXT"
+            (n_text,) = connection.execute(
+                f"SELECT count(*) FROM {table} WHERE typeof({column}) = 'text'"
+            ).fetchone()
+            assert n_text > 0
+    substance = feather.read_table(tmp_path / "concentration.arrow")["substance"]
+    assert pa.types.is_dictionary(substance.type)
+    assert pa.types.is_string(substance.type.value_type)
+
+    model_loaded = Model.read(toml_path)
+    node_type = model_loaded.node_table().df["node_type"]
+    assert list(node_type.cat.categories) == list(NODE_TYPES)
+    assert list(model_loaded.link.df["link_type"].cat.categories) == list(LINK_TYPES)
+    __assert_equal(model.node_table().df, model_loaded.node_table().df)
+    __assert_equal(model.link.df, model_loaded.link.df)
+    __assert_equal(model.basin.concentration.df, model_loaded.basin.concentration.df)
+
+
+def test_unknown_node_type(basic, tmp_path):
+    toml_path = tmp_path / "ribasim.toml"
+    basic.write(toml_path)
+    with closing(sqlite3.connect(tmp_path / "database.gpkg")) as connection:
+        # The spatial index triggers need SpatiaLite
+        triggers = connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'Node'"
+        ).fetchall()
+        for (trigger,) in triggers:
+            connection.execute(f'DROP TRIGGER "{trigger}"')
+        connection.execute("UPDATE Node SET node_type = 'NewNode' WHERE node_id = 1")
+        connection.commit()
+
+    with pytest.raises(ValidationError, match="Unknown node_type 'NewNode'"):
+        Model.read(toml_path)
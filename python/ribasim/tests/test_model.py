@@ -19,6 +19,7 @@ from ribasim_testmodels import (
     basic_model,
     outlet_model,
     pid_control_equation_model,
+    subnetwork_model,
     trivial_model,
 )
 from shapely import Point
@@ -100,7 +101,14 @@ def test_tabulated_rating_curve_model(tabulated_rating_curve, tmp_path):
 
 
 def test_plot(discrete_control_of_pid_control):
-    discrete_control_of_pid_control.plot()
+    ax = discrete_control_of_pid_control.plot()
+    n_node = len(discrete_control_of_pid_control.node_table().df)
+    assert len(ax.texts) == n_node
+
+    ax = discrete_control_of_pid_control.plot(labels=False, level_of_detail=True)
+    assert len(ax.texts) == 0
+    _, labels = ax.get_legend_handles_labels()
+    assert "Listen link" in labels
 
 
 def test_write_adds_fid_in_tables(basic, tmp_path):
@@ -143,6 +151,7 @@ def test_node_table(basic):
     assert df.geometry.is_unique
     assert df.index.dtype == np.int32
     assert df.subnetwork_id.dtype == pd.Int32Dtype()
+    assert df.node_type.dtype == "category"
     assert df.node_type.iloc[0] == "Basin"
     assert df.node_type.iloc[-1] == "LevelBoundary"
     assert df.crs == CRS.from_epsg(28992)
@@ -153,6 +162,7 @@ def test_link_table(basic):
     df = model.link.df
     assert df.geometry.is_unique
     assert df.from_node_id.dtype == np.int32
+    assert list(df.link_type.cat.categories) == ["flow", "control"]
     assert df.crs == CRS.from_epsg(28992)
 
 
@@ -329,3 +339,210 @@ def test_model_diff(basic):
     assert "static" in x["basin"]
     assert "diff" in x["basin"]["static"]
     assert isinstance(x["basin"]["static"]["diff"], datacompy.Compare)
+
+
+def test_write_restart(basic, tmp_path):
+    toml_path = tmp_path / "basic" / "ribasim.toml"
+    basic.write(toml_path)
+
+    # Levels as obtained from the "basin.level" BMI variable after a day
+    node_id = np.sort(basic.basin.node.df.index.to_numpy())
+    level = np.linspace(1.0, 2.0, node_id.size)
+    starttime = basic.starttime
+    basic.set_basin_state(level, 86400.0)
+    assert basic.starttime == starttime + pd.Timedelta(days=1)
+
+    with pytest.raises(ValueError, match="Expected a level for each"):
+        basic.set_basin_state(level[:-1], 86400.0)
+
+    restart_path = tmp_path / "restart" / "ribasim.toml"
+    basic.write_restart(restart_path)
+    assert basic.filepath == restart_path
+
+    restarted = Model.read(restart_path)
+    assert restarted.starttime == starttime + pd.Timedelta(days=1)
+    assert restarted.endtime == basic.endtime
+    np.testing.assert_array_equal(restarted.basin.state.df["node_id"], node_id)
+    np.testing.assert_allclose(restarted.basin.state.df["level"], level)
+    assert restarted.basin.static.df.equals(basic.basin.static.df)
+    assert restarted.link.df.equals(Model.read(toml_path).link.df)
+
+
+def test_subset(basic, tmp_path):
+    # A ManningResistance keeps its neighboring Basins
+    subset = basic.subset([2])
+    assert subset.node_table().df.index.tolist() == [1, 2, 3]
+    assert subset.link.df[["from_node_id", "to_node_id"]].to_numpy().tolist() == [
+        [1, 2],
+        [2, 3],
+    ]
+    assert subset.basin.profile.df["node_id"].isin([1, 3]).all()
+    assert subset.pump.node.df is None
+
+    # Which may be replaced by LevelBoundary nodes, if they can connect
+    subset = basic.subset([5], add_boundaries=True)
+    assert subset.node_table().df["node_type"].to_dict() == {
+        3: "LevelBoundary",
+        5: "TabulatedRatingCurve",
+        6: "LevelBoundary",
+    }
+    assert subset.basin.node.df is None
+    assert subset.level_boundary.static.df["node_id"].tolist() == [3, 6]
+    subset.write(tmp_path / "subset" / "ribasim.toml")
+    Model.read(tmp_path / "subset" / "ribasim.toml")._validate_model()
+
+    with pytest.raises(ValueError, match="exactly one"):
+        basic.subset([2], subnetwork_id=1)
+    with pytest.raises(ValueError, match="not in the model"):
+        basic.subset([100])
+
+
+def test_subset_control(discrete_control_of_pid_control):
+    model = discrete_control_of_pid_control
+    # The Outlet brings its PidControl, which brings its DiscreteControl
+    subset = model.subset(geometry=model.outlet.node.df.geometry.iloc[0].buffer(0.1))
+    assert subset.node_table().df["node_type"].to_dict() == {
+        1: "LevelBoundary",
+        2: "Outlet",
+        3: "Basin",
+        6: "PidControl",
+        7: "DiscreteControl",
+    }
+    subset._validate_model()
+
+
+def test_split_components(basic, discrete_control_of_pid_control):
+    model = basic
+    model.link.df = model.link.df.drop(index=16)
+    components = model.connected_components()
+    assert components.nunique() == 2
+
+    models = model.split_components()
+    assert len(models) == 2
+    node_ids = [m.node_table().df.index.tolist() for m in models]
+    assert node_ids[1] == [17]
+    assert sorted(node_ids[0] + node_ids[1]) == model.node_table().df.index.tolist()
+    assert models[1].level_boundary.static.df["node_id"].tolist() == [17]
+    assert models[1].link.df.empty
+    assert models[0].link.df.index.equals(model.link.df.index)
+    assert models[0].basin.node.df.index.equals(model.basin.node.df.index)
+
+    # A control node is connected to the nodes it listens to
+    model = discrete_control_of_pid_control
+    model.link.df = model.link.df.drop(index=[1, 6])
+    assert model.connected_components().to_dict() == {
+        1: 0,
+        2: 1,
+        3: 1,
+        4: 1,
+        5: 1,
+        6: 1,
+        7: 0,
+    }
+
+
+def test_merge_results(basic, tmp_path):
+    model = basic
+    # The LinearResistance loses its downstream neighbor
+    model.use_validation = False
+    model.link.df = model.link.df.drop(index=16)
+    model.write(tmp_path / "model/ribasim.toml")
+    time = pd.to_datetime(["2020-01-01", "2020-01-02"])
+
+    models = model.split_components()
+    for i, component in enumerate(models):
+        component.write(tmp_path / f"component_{i}/ribasim.toml")
+        node_ids = component.node_table().df.index.to_numpy()
+        results_path = tmp_path / f"component_{i}/results"
+        results_path.mkdir()
+        pd.DataFrame(
+            {
+                "time": np.repeat(time, len(node_ids)),
+                "node_id": np.tile(node_ids, len(time)),
+                "level": float(i),
+            }
+        ).to_feather(results_path / "basin.arrow")
+        pd.DataFrame({"time": time, "rhs_calls": [1, 2]}).to_feather(
+            results_path / "solver_stats.arrow"
+        )
+
+    # In reverse, such that concatenating by model would not order by node ID
+    results_path = model.merge_results(models[::-1])
+    assert results_path == tmp_path / "model/results"
+    df = pd.read_feather(results_path / "basin.arrow")
+    n_node = len(model.node_table().df)
+    assert len(df) == 2 * n_node
+    assert (df["time"].iloc[:n_node] == time[0]).all()
+    # Ordered by time and node ID, as the results of a single model
+    assert df["node_id"].iloc[:n_node].tolist() == sorted(model.node_table().df.index)
+    assert df.equals(df.sort_values(["time", "node_id"], ignore_index=True))
+    df = pd.read_feather(results_path / "solver_stats.arrow")
+    assert df["rhs_calls"].tolist() == [2, 4]
+
+    model.write(tmp_path / "not_run/ribasim.toml")
+    with pytest.raises(FileNotFoundError, match="Cannot find results"):
+        model.merge_results([model])
+
+
+def test_merge(basic, discrete_control_of_pid_control, tmp_path):
+    first, second = basic, discrete_control_of_pid_control
+    model = Model.merge([first, second])
+    n_first = len(first.node_table().df)
+    node_df = model.node_table().df
+    assert len(node_df) == n_first + len(second.node_table().df)
+    assert node_df.index.is_unique
+    # The IDs of the second model continue after the highest ID of the first
+    assert node_df.index[n_first:].tolist() == list(range(18, 25))
+    assert model.link.df.index.tolist() == list(range(1, 23))
+    link_df = model.link.df.loc[17:]
+    assert link_df["from_node_id"].tolist() == [18, 19, 20, 21, 23, 24]
+    assert link_df["to_node_id"].tolist() == [19, 20, 21, 22, 19, 23]
+    assert set(model.pid_control.static.df["listen_node_id"]) == {20}
+    assert set(model.discrete_control.variable.df["listen_node_id"]) == {18}
+    model.write(tmp_path / "merged/ribasim.toml")
+
+    links = pd.DataFrame(
+        {"from_model": [1], "from_node_id": [4], "to_model": [0], "to_node_id": [1]}
+    )
+    model = Model.merge([first, second], offset_strategy="round", links=links)
+    assert model.node_table().df.index[n_first:].tolist() == list(range(101, 108))
+    link = model.link.df.iloc[-1]
+    assert (link["from_node_id"], link["to_node_id"]) == (104, 1)
+    assert link["link_type"] == "flow"
+
+    model = Model.merge([first, first])
+    assert set(model.basin.subgrid.df["subgrid_id"]) == {1, 3, 6, 9, 10, 12, 15, 18}
+    with pytest.raises(ValueError, match="not unique across the models"):
+        Model.merge([first, first], offset_strategy="keep")
+    with pytest.raises(ValueError, match="cannot be downstream"):
+        Model.merge([first, second], links=links.assign(to_model=1, to_node_id=6))
+    with pytest.raises(ValueError, match="offset_strategy"):
+        Model.merge([first, second], offset_strategy="min")
+
+
+def test_merge_subnetworks():
+    subnetwork = subnetwork_model()
+    model = Model.merge([subnetwork, subnetwork])
+    subnetwork_id = model.node_table().df["subnetwork_id"]
+    n = len(subnetwork.node_table().df)
+    assert set(subnetwork_id.iloc[:n]) == {2}
+    assert set(subnetwork_id.iloc[n:]) == {3}
+
+    model = Model.merge([subnetwork, subnetwork], offset_strategy="round")
+    assert set(model.node_table().df["subnetwork_id"].iloc[n:]) == {12}
+    with pytest.raises(ValueError, match="not unique across the models"):
+        Model.merge([subnetwork, subnetwork], offset_strategy="keep")
+
+    # Models with unique node IDs that both use subnetwork 2
+    first, second = model.split_components()
+    for _, node_model in second._node_models():
+        df = node_model.node.df
+        if df is not None:
+            df["subnetwork_id"] = df["subnetwork_id"].replace(12, 2)
+    model = Model.merge([first, second], offset_strategy="keep")
+    node_df = model.node_table().df
+    assert node_df.index.tolist() == sorted(
+        [*first.node_table().df.index, *second.node_table().df.index]
+    )
+    assert set(node_df.loc[second.node_table().df.index, "subnetwork_id"]) == {3}
+    assert set(node_df.loc[first.node_table().df.index, "subnetwork_id"]) == {2}
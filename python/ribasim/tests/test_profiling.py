@@ -0,0 +1,62 @@
+import json
+
+import pandas as pd
+import pytest
+from ribasim import Model, profiling
+
+
+def test_profile(basic, tmp_path):
+    toml_path = tmp_path / "basic/ribasim.toml"
+    with profiling.profile() as report:
+        assert profiling.enabled()
+        basic.write(toml_path)
+        Model.read(toml_path)
+    assert not profiling.enabled()
+
+    df = report.to_dataframe()
+    write = df[df["name"] == "Model.write"].iloc[0]
+    assert write["depth"] == 0
+    assert write["count"] == 1
+    assert 0.0 < write["time"] <= report.root.time
+    paths = set(df["path"])
+    assert "Model.write > Model._validate_model" in paths
+    assert (
+        "Model.write > Model._save > TableModel._save: Basin / profile > to_sql"
+        in paths
+    )
+    assert "Model.write > Model._save > TableModel._save: Node > pyogrio" in paths
+    assert (
+        "Model.read > TableModel.validate: Basin / profile"
+        " > TableModel._from_db: Basin / profile"
+    ) in paths
+    assert (df["self_time"] >= -1e-6).all()
+
+    text = report.to_text()
+    assert "TableModel._save: Basin / profile" in text
+    assert "alloc" not in text
+
+    assert json.loads(report.to_json(tmp_path / "report.json"))["spans"][0]["name"] == (
+        "Model.write"
+    )
+    report.to_arrow(tmp_path / "report.arrow")
+    pd.testing.assert_frame_equal(pd.read_feather(tmp_path / "report.arrow"), df)
+
+
+def test_profile_memory(basic):
+    with profiling.profile(memory=True) as report:
+        basic.node_table()
+    node_table = report.root.children["Model.node_table"]
+    assert node_table.count == 1
+    assert node_table.peak > 0
+    assert "peak [MiB]" in report.to_text()
+
+
+def test_disabled(basic):
+    assert not profiling.enabled()
+    with profiling.span("unused"):
+        basic.node_table()
+
+    with profiling.profile():
+        with pytest.raises(ValueError, match="already enabled"):
+            with profiling.profile():
+                pass
@@ -184,5 +184,9 @@ def test_geometry_validation():
     basinarea = basin.Area(geometry=[basinarea.df.geometry[0]])
     assert isinstance(basinarea.df.geometry[0], MultiPolygon)
 
+    basinarea = basin.Area(geometry=[poly, MultiPolygon([poly]), poly])
+    assert (basinarea.df.geometry.geom_type == "MultiPolygon").all()
+    assert basinarea.df.geometry[2].equals(MultiPolygon([poly]))
+
     with pytest.raises(ValueError):
         basin.Area(geometry=[point])
@@ -1,5 +1,22 @@
 __version__ = "2025.1.0"
 
-from ribasim_api.ribasim_api import RibasimApi
+from ribasim_api.async_api import AsyncRibasimApi
+from ribasim_api.driver import CoupledDriver, TimingProfile
+from ribasim_api.ensemble import EnsembleRunner, MemberResult
+from ribasim_api.ribasim_api import BasinState, RibasimApi
+from ribasim_api.server import RibasimClient, RibasimServer, RunResult
+from ribasim_api.variables import BoundVariables
 
-__all__ = ["RibasimApi"]
+__all__ = [
+    "AsyncRibasimApi",
+    "BasinState",
+    "BoundVariables",
+    "CoupledDriver",
+    "EnsembleRunner",
+    "MemberResult",
+    "RibasimApi",
+    "RibasimClient",
+    "RibasimServer",
+    "RunResult",
+    "TimingProfile",
+]
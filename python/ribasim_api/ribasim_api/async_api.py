@@ -0,0 +1,120 @@
+import asyncio
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, TypeVar
+
+import numpy as np
+from numpy.typing import NDArray
+
+from ribasim_api.ribasim_api import RibasimApi
+
+T = TypeVar("T")
+
+
+class AsyncRibasimApi:
+    """Run the BMI calls of a RibasimApi on a dedicated thread, for use with asyncio.
+
+    Calls into libribasim block until they return, so awaiting them directly
+    would stall the event loop. Here every call runs on a single executor thread,
+    which also keeps all calls into the Julia runtime on one thread, in order.
+    Do not call the wrapped RibasimApi directly while it is in use here.
+
+    Parameters
+    ----------
+    api : RibasimApi
+        The RibasimApi to wrap.
+
+    Examples
+    --------
+    >>> async with AsyncRibasimApi(RibasimApi(lib_path, lib_folder)) as api:
+    ...     await api.init_julia()
+    ...     await api.initialize("ribasim.toml")
+    ...     async for time in api.progress(await api.get_end_time(), 3600.0):
+    ...         print(time)
+    ...     await api.finalize()
+    """
+
+    def __init__(self, api: RibasimApi) -> None:
+        self.api = api
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ribasim")
+
+    async def run(self, function: Callable[..., T], *args: Any) -> T:
+        """Run any function on the Ribasim thread, like a method of the RibasimApi."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(function, *args))
+
+    async def init_julia(self) -> None:
+        await self.run(self.api.init_julia)
+
+    async def initialize(self, config_file: str) -> None:
+        await self.run(self.api.initialize, config_file)
+
+    async def finalize(self) -> None:
+        await self.run(self.api.finalize)
+
+    async def execute(self, config_file: str) -> None:
+        await self.run(self.api.execute, config_file)
+
+    async def get_current_time(self) -> float:
+        return await self.run(self.api.get_current_time)
+
+    async def get_end_time(self) -> float:
+        return await self.run(self.api.get_end_time)
+
+    async def get_value_ptr(self, name: str) -> NDArray[np.float64]:
+        return await self.run(self.api.get_value_ptr, name)
+
+    async def update_subgrid_level(self) -> None:
+        await self.run(self.api.update_subgrid_level)
+
+    async def update_until(
+        self, time: float, exchange_interval: float | None = None
+    ) -> None:
+        """Update until the given time.
+
+        With an ``exchange_interval``, the update is split into steps of at most
+        that length. Cancelling the task then takes effect after the running step.
+        """
+        if exchange_interval is None:
+            await self.run(self.api.update_until, time)
+        else:
+            async for _ in self.progress(time, exchange_interval):
+                pass
+
+    async def progress(
+        self, time: float, exchange_interval: float
+    ) -> AsyncIterator[float]:
+        """Update until the given time in steps, yielding the current time after each step.
+
+        Cancellation takes effect between steps: a running step always completes.
+        """
+        if not exchange_interval > 0.0:
+            raise ValueError(
+                f"exchange_interval must be positive, got {exchange_interval}."
+            )
+        current_time = await self.get_current_time()
+        while current_time < time:
+            step = self.run(
+                self.api.update_until, min(current_time + exchange_interval, time)
+            )
+            # Shield the step, such that on cancellation we wait for the step to
+            # finish before the cancellation propagates.
+            task = asyncio.ensure_future(step)
+            try:
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                await task
+                raise
+            current_time = await self.get_current_time()
+            yield current_time
+
+    def close(self) -> None:
+        """Shut down the Ribasim thread, after the pending calls finished."""
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self) -> "AsyncRibasimApi":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
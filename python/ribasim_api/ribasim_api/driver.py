@@ -0,0 +1,186 @@
+import tomllib
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from os import PathLike
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+from ribasim_api.ribasim_api import RibasimApi
+
+PreStep = Callable[[RibasimApi, float], Mapping[str, ArrayLike] | None]
+PostStep = Callable[[RibasimApi, float, dict[str, NDArray[np.float64]]], None]
+
+
+@dataclass
+class TimingProfile:
+    """Wall clock time in seconds spent in the parts of a coupled run.
+
+    There is one entry per exchange step in the per-step lists,
+    ``time`` holds the model time at the end of each exchange step.
+    """
+
+    starttime: datetime
+    initialize: float = 0.0
+    finalize: float = 0.0
+    time: list[float] = field(default_factory=list)
+    update_until: list[float] = field(default_factory=list)
+    callback: list[float] = field(default_factory=list)
+    value_transfer: list[float] = field(default_factory=list)
+
+    def totals(self) -> dict[str, float]:
+        """Sum the wall clock time per BMI call or driver phase."""
+        return {
+            "initialize": self.initialize,
+            "update_until": sum(self.update_until),
+            "callback": sum(self.callback),
+            "value_transfer": sum(self.value_transfer),
+            "finalize": self.finalize,
+        }
+
+    def to_arrow(self) -> Any:
+        """Convert the per-step timings to a ``pyarrow.Table``.
+
+        The table is shaped like ``results/solver_stats.arrow``, with one row per exchange step.
+        """
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError(
+                "pyarrow is required for this functionality. You can get it using `pip install ribasim_api[arrow]`."
+            ) from e
+
+        time = [self.starttime + timedelta(seconds=t) for t in self.time]
+        table = pa.table(
+            {
+                "time": pa.array(time, type=pa.timestamp("ms")),
+                "update_until": pa.array(self.update_until, type=pa.float64()),
+                "callback": pa.array(self.callback, type=pa.float64()),
+                "value_transfer": pa.array(self.value_transfer, type=pa.float64()),
+            }
+        )
+        metadata = {
+            "initialize": str(self.initialize),
+            "finalize": str(self.finalize),
+        }
+        return table.replace_schema_metadata(metadata)
+
+    def write(self, path: str | PathLike[str]) -> Path:
+        """Write the per-step timings to an Arrow IPC file."""
+        import pyarrow.feather as feather
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        feather.write_feather(self.to_arrow(), path, compression="zstd")
+        return path
+
+
+class CoupledDriver:
+    """Run a Ribasim model through the BMI, exchanging data at fixed intervals.
+
+    Every exchange step consists of:
+
+    1. ``pre_step(api, time)``, which may return values to write into BMI variables.
+    2. Writing those values in place.
+    3. ``update_until(time + exchange_interval)``, clipped to the end time.
+    4. Copying the values of ``variables``.
+    5. ``post_step(api, time, values)`` with the copied values.
+
+    The wall clock time of each part is recorded in a `TimingProfile`.
+
+    Parameters
+    ----------
+    api : RibasimApi
+        A RibasimApi, with Julia initialized.
+    exchange_interval : float
+        The time between exchanges in seconds.
+    variables : Iterable[str]
+        The BMI variables to pass to ``post_step``, and that ``pre_step`` may set.
+    pre_step : PreStep | None
+        Called before every ``update_until``.
+    post_step : PostStep | None
+        Called after every ``update_until``.
+    """
+
+    def __init__(
+        self,
+        api: RibasimApi,
+        exchange_interval: float,
+        variables: Iterable[str] = (),
+        pre_step: PreStep | None = None,
+        post_step: PostStep | None = None,
+    ) -> None:
+        if not exchange_interval > 0.0:
+            raise ValueError(
+                f"exchange_interval must be positive, got {exchange_interval}."
+            )
+        self.api = api
+        self.exchange_interval = exchange_interval
+        self.variables = tuple(variables)
+        self.pre_step = pre_step
+        self.post_step = post_step
+
+    def run(self, config_file: str | PathLike[str]) -> TimingProfile:
+        """Initialize, run and finalize the model, returning the timing profile."""
+        with open(config_file, "rb") as f:
+            starttime = tomllib.load(f)["starttime"]
+        profile = TimingProfile(starttime=starttime)
+        api = self.api
+
+        start = perf_counter()
+        api.initialize(str(config_file))
+        profile.initialize = perf_counter() - start
+
+        try:
+            bound = api.bind(self.variables) if self.variables else None
+            end_time = api.get_end_time()
+            time = api.get_current_time()
+            while time < end_time:
+                callback = 0.0
+                value_transfer = 0.0
+
+                if self.pre_step is not None:
+                    start = perf_counter()
+                    new_values = self.pre_step(api, time)
+                    callback += perf_counter() - start
+                    if new_values:
+                        if bound is None:
+                            raise ValueError(
+                                "pre_step returned values, but no variables are bound."
+                            )
+                        start = perf_counter()
+                        bound.set_many(new_values)
+                        value_transfer += perf_counter() - start
+
+                start = perf_counter()
+                api.update_until(min(time + self.exchange_interval, end_time))
+                profile.update_until.append(perf_counter() - start)
+                time = api.get_current_time()
+
+                if bound is not None:
+                    start = perf_counter()
+                    values = {
+                        name: view.copy() for name, view in bound.get_many().items()
+                    }
+                    value_transfer += perf_counter() - start
+                else:
+                    values = {}
+
+                if self.post_step is not None:
+                    start = perf_counter()
+                    self.post_step(api, time, values)
+                    callback += perf_counter() - start
+
+                profile.time.append(time)
+                profile.callback.append(callback)
+                profile.value_transfer.append(value_transfer)
+        finally:
+            # Always finalize, such that the api can initialize the next model.
+            start = perf_counter()
+            api.finalize()
+            profile.finalize = perf_counter() - start
+        return profile
@@ -0,0 +1,161 @@
+import multiprocessing
+import os
+import tomllib
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from os import PathLike
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Literal
+
+from ribasim_api.ribasim_api import RibasimApi
+
+# The warm RibasimApi of a worker process, set by _init_worker.
+_api: RibasimApi | None = None
+
+
+@dataclass
+class MemberResult:
+    """The outcome of running one ensemble member."""
+
+    index: int
+    toml_path: Path
+    results_dir: Path
+    success: bool
+    wall_time: float
+    error: str | None = None
+
+
+def _init_worker(lib_path: str, lib_dependency: str | None) -> None:
+    global _api
+    _api = RibasimApi(lib_path, lib_dependency)
+    _api.init_julia()
+
+
+def _results_dir(toml_path: Path) -> Path:
+    with open(toml_path, "rb") as f:
+        config = tomllib.load(f)
+    return toml_path.parent / config.get("results_dir", "results")
+
+
+def _run_member(index: int, toml_path: Path, mode: str) -> MemberResult:
+    assert _api is not None, "Worker process is not initialized."
+    start = perf_counter()
+
+    results_dir = toml_path.parent / "results"
+    error = None
+    try:
+        # An unreadable TOML fails this member, not the whole ensemble.
+        results_dir = _results_dir(toml_path)
+        if mode == "execute":
+            _api.execute(str(toml_path))
+        else:
+            _api.initialize(str(toml_path))
+            try:
+                _api.update_until(_api.get_end_time())
+            finally:
+                # Always finalize, to leave the worker ready for the next member.
+                _api.finalize()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+
+    return MemberResult(
+        index=index,
+        toml_path=toml_path,
+        results_dir=results_dir,
+        success=error is None,
+        wall_time=perf_counter() - start,
+        error=error,
+    )
+
+
+class EnsembleRunner:
+    """Run many Ribasim models on a fixed pool of warm worker processes.
+
+    Every worker loads libribasim and calls ``init_julia`` once,
+    such that the Julia start-up and compilation latency is paid once per worker,
+    instead of once per model.
+    Worker processes are spawned rather than forked, since an initialized
+    Julia runtime cannot be forked.
+
+    Parameters
+    ----------
+    lib_path : str | PathLike[str]
+        Path to the libribasim shared library.
+    lib_dependency : str | PathLike[str] | None
+        Path to the dependencies of the shared library.
+    n_workers : int | None
+        The number of worker processes, defaults to the number of CPUs.
+    mode : "execute" | "bmi"
+        Run each model with ``execute``, or with ``initialize``, ``update_until``
+        and ``finalize``.
+
+    Examples
+    --------
+    >>> with EnsembleRunner(lib_path, lib_folder, n_workers=4) as runner:
+    ...     results = runner.run(variants, directory=Path("ensemble"))
+    """
+
+    def __init__(
+        self,
+        lib_path: str | PathLike[str],
+        lib_dependency: str | PathLike[str] | None = None,
+        n_workers: int | None = None,
+        mode: Literal["execute", "bmi"] = "execute",
+    ) -> None:
+        if mode not in ("execute", "bmi"):
+            raise ValueError(f"mode must be 'execute' or 'bmi', got '{mode}'.")
+        self.mode = mode
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(
+                str(lib_path),
+                None if lib_dependency is None else str(lib_dependency),
+            ),
+        )
+
+    def run(
+        self,
+        members: Iterable[Any],
+        directory: str | PathLike[str] | None = None,
+    ) -> list[MemberResult]:
+        """Run all ensemble members, and return their results in input order.
+
+        Parameters
+        ----------
+        members : Iterable[str | PathLike[str] | ribasim.Model]
+            Paths to model TOML files, or in-memory models.
+        directory : str | PathLike[str] | None
+            Directory to write in-memory models to, as ``member_<index>/ribasim.toml``.
+            Models cannot be pickled, so they are written by this process,
+            while the workers already run the members before them.
+        """
+        futures = []
+        for index, member in enumerate(members):
+            if isinstance(member, str | PathLike):
+                toml_path = Path(member).absolute()
+            else:
+                if directory is None:
+                    raise ValueError("A directory is required to run in-memory models.")
+                toml_path = (
+                    Path(directory).absolute() / f"member_{index:04d}" / "ribasim.toml"
+                )
+                member.write(toml_path)
+            futures.append(
+                self._executor.submit(_run_member, index, toml_path, self.mode)
+            )
+        return [future.result() for future in futures]
+
+    def close(self) -> None:
+        """Shut down the worker processes."""
+        self._executor.shutdown()
+
+    def __enter__(self) -> "EnsembleRunner":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
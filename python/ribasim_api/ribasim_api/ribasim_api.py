@@ -1,8 +1,22 @@
 # %%
+from collections.abc import Iterable
 from ctypes import byref, c_int, create_string_buffer
+from typing import NamedTuple
 
+import numpy as np
+from numpy.typing import NDArray
 from xmipy import XmiWrapper
 
+from ribasim_api.variables import BoundVariables
+
+
+class BasinState(NamedTuple):
+    """A copy of the Basin state, sorted by Basin node_id."""
+
+    time: float
+    storage: NDArray[np.float64]
+    level: NDArray[np.float64]
+
 
 class RibasimApi(XmiWrapper):
     def get_constant_int(self, name: str) -> int:
@@ -33,3 +47,18 @@ class RibasimApi(XmiWrapper):
 
     def execute(self, config_file: str) -> None:
         self._execute_function(self.lib.execute, config_file.encode())
+
+    def bind(self, names: Iterable[str], check_pointers: bool = True) -> BoundVariables:
+        """Bind BMI variables to cached NumPy views, for repeated access after initialize."""
+        return BoundVariables(self, names, check_pointers=check_pointers)
+
+    def get_basin_state(self) -> BasinState:
+        """Copy the current Basin storage and level, to restart a model from.
+
+        Pass the result to ``ribasim.Model.set_basin_state``.
+        """
+        return BasinState(
+            time=self.get_current_time(),
+            storage=self.get_value_ptr("basin.storage").copy(),
+            level=self.get_value_ptr("basin.level").copy(),
+        )
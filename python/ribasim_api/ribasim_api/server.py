@@ -0,0 +1,259 @@
+"""A long-lived local worker that runs Ribasim models on a warm libribasim.
+
+Start the server with::
+
+    python -m ribasim_api.server path/to/libribasim.so
+
+and submit models with `RibasimClient`.
+Requests and replies are JSON messages over a
+``multiprocessing.connection``, which uses a Unix domain socket,
+or a named pipe on Windows.
+The socket is only accessible to the user that started the server,
+set ``RIBASIM_SERVER_AUTHKEY`` to also require a key.
+"""
+
+import argparse
+import json
+import os
+import platform
+import queue
+import tempfile
+import threading
+from dataclasses import asdict, dataclass
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from os import PathLike
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+from ribasim_api.ensemble import _results_dir
+from ribasim_api.ribasim_api import RibasimApi
+
+
+def default_address() -> str:
+    """Return the address the server listens on if none is given.
+
+    On Unix this is a socket in a directory that only the current user can access.
+    """
+    if platform.system() == "Windows":
+        return r"\\.\pipe\ribasim"
+    else:
+        directory = Path(tempfile.gettempdir()) / f"ribasim-{os.getuid()}"
+        return str(directory / "ribasim.sock")
+
+
+def _private_directory(directory: Path) -> None:
+    """Create a directory that only the current user can access, or check an existing one."""
+    directory.mkdir(mode=0o700, exist_ok=True)
+    stat = directory.stat()
+    if stat.st_uid != os.getuid() or stat.st_mode & 0o077:
+        raise ValueError(
+            f"The socket directory {directory} must be owned by and only accessible to the current user."
+        )
+
+
+@dataclass
+class RunResult:
+    """The outcome of running a model on the server."""
+
+    toml_path: str
+    exit_code: int
+    log_path: str
+    results_dir: str
+    wall_time: float
+    error: str | None = None
+
+
+class RibasimServer:
+    """Run model requests back to back on one initialized libribasim.
+
+    Requests are accepted concurrently and queued,
+    and executed one by one by the thread that calls `serve_forever`.
+
+    Parameters
+    ----------
+    api : RibasimApi
+        A RibasimApi, with Julia initialized.
+    address : str | None
+        The socket path, or pipe name on Windows, defaults to `default_address()`.
+        The socket is created with permissions for the current user only.
+    authkey : bytes | None
+        If given, clients need the same key to connect.
+    """
+
+    def __init__(
+        self, api: RibasimApi, address: str | None = None, authkey: bytes | None = None
+    ) -> None:
+        self.api = api
+        self.address = address or default_address()
+        if platform.system() == "Windows":
+            self._listener = Listener(self.address, authkey=authkey)
+        else:
+            if address is None:
+                _private_directory(Path(self.address).parent)
+            # Remove a stale socket of a previous server.
+            Path(self.address).unlink(missing_ok=True)
+            # Create the socket with permissions for the current user only,
+            # rather than changing them after it accepts connections
+            umask = os.umask(0o177)
+            try:
+                self._listener = Listener(self.address, authkey=authkey)
+            finally:
+                os.umask(umask)
+        self._jobs: queue.Queue[tuple[str, queue.Queue[RunResult]] | None] = (
+            queue.Queue()
+        )
+        # Guards that no job is queued after the shutdown request
+        self._lock = threading.Lock()
+        self._shutting_down = False
+
+    def serve_forever(self) -> None:
+        """Accept requests and run the queued models until a shutdown request."""
+        accept_thread = threading.Thread(target=self._accept, daemon=True)
+        accept_thread.start()
+        try:
+            while (job := self._jobs.get()) is not None:
+                toml_path, reply = job
+                reply.put(self._run(toml_path))
+        finally:
+            self._listener.close()
+
+    def _run(self, toml_path: str) -> RunResult:
+        start = perf_counter()
+        error = None
+        try:
+            self.api.execute(toml_path)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+        try:
+            results_dir = _results_dir(Path(toml_path))
+        except OSError:
+            results_dir = Path(toml_path).parent / "results"
+        return RunResult(
+            toml_path=toml_path,
+            exit_code=0 if error is None else 1,
+            log_path=str(results_dir / "ribasim.log"),
+            results_dir=str(results_dir),
+            wall_time=perf_counter() - start,
+            error=error,
+        )
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                connection = self._listener.accept()
+            except AuthenticationError:
+                # A client with the wrong key
+                continue
+            except OSError:
+                # The listener was closed
+                return
+            threading.Thread(
+                target=self._handle, args=(connection,), daemon=True
+            ).start()
+
+    def _handle(self, connection: Connection) -> None:
+        with connection:
+            try:
+                request = connection.recv_bytes()
+            except (EOFError, OSError):
+                # The client went away
+                return
+            try:
+                reply = self._reply(json.loads(request))
+            except Exception as e:
+                reply = {"error": f"Invalid request: {type(e).__name__}: {e}"}
+            try:
+                connection.send_bytes(json.dumps(reply).encode())
+            except (EOFError, OSError):
+                pass
+
+    def _reply(self, request: dict[str, Any]) -> dict[str, Any]:
+        command = request.get("command")
+        if command == "run":
+            toml_path = request["toml_path"]
+            if not isinstance(toml_path, str):
+                raise TypeError("toml_path must be a string")
+            result: queue.Queue[RunResult] = queue.Queue(maxsize=1)
+            with self._lock:
+                if self._shutting_down:
+                    return {"error": "The server is shutting down."}
+                self._jobs.put((toml_path, result))
+            return asdict(result.get())
+        elif command == "status":
+            return {"queued": self._jobs.qsize()}
+        elif command == "shutdown":
+            with self._lock:
+                if not self._shutting_down:
+                    self._shutting_down = True
+                    self._jobs.put(None)
+            return {}
+        else:
+            return {"error": f"Unknown command {command}"}
+
+
+class RibasimClient:
+    """Submit models to a running `RibasimServer`.
+
+    Parameters
+    ----------
+    address : str | None
+        The address of the server, defaults to `default_address()`.
+    authkey : bytes | None
+        The key of the server, if it has one.
+    """
+
+    def __init__(self, address: str | None = None, authkey: bytes | None = None):
+        self.address = address or default_address()
+        self.authkey = authkey
+
+    def _request(self, **request: Any) -> dict[str, Any]:
+        with Client(self.address, authkey=self.authkey) as connection:
+            connection.send_bytes(json.dumps(request).encode())
+            reply: dict[str, Any] = json.loads(connection.recv_bytes())
+        # A finished run reports its own errors in the RunResult
+        if "error" in reply and "exit_code" not in reply:
+            raise ValueError(reply["error"])
+        return reply
+
+    def run(self, toml_path: str | PathLike[str]) -> RunResult:
+        """Run a model, and wait for it to finish."""
+        toml_path = Path(toml_path).absolute()
+        return RunResult(**self._request(command="run", toml_path=str(toml_path)))
+
+    def queued(self) -> int:
+        """Return the number of models waiting to run."""
+        return int(self._request(command="status")["queued"])
+
+    def shutdown(self) -> None:
+        """Stop the server after the queued models finished."""
+        self._request(command="shutdown")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Run Ribasim models on a warm libribasim."
+    )
+    parser.add_argument("lib_path", type=Path, help="The path to libribasim.")
+    parser.add_argument(
+        "--lib-dependency", type=Path, help="The path to the libribasim dependencies."
+    )
+    parser.add_argument("--address", help="The socket path or pipe name to listen on.")
+    args = parser.parse_args()
+
+    authkey = os.environ.get("RIBASIM_SERVER_AUTHKEY")
+    api = RibasimApi(args.lib_path, args.lib_dependency)
+    api.init_julia()
+    server = RibasimServer(
+        api,
+        address=args.address,
+        authkey=None if authkey is None else authkey.encode(),
+    )
+    print(f"Ribasim server listening on {server.address}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+from ctypes import byref, c_char_p, c_void_p
+from typing import TYPE_CHECKING
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+if TYPE_CHECKING:
+    from ribasim_api.ribasim_api import RibasimApi
+
+
+class BoundVariables:
+    """Cached zero-copy NumPy views on a fixed set of BMI variables.
+
+    The views are resolved once with ``get_value_ptr``, after which reading and
+    writing values only costs a single pointer lookup per variable,
+    instead of the rank, type and shape queries done by ``get_value_ptr``.
+    If the core reallocates the memory of a variable, its pointer changes,
+    and the view of that variable is resolved again.
+
+    Create instances with ``RibasimApi.bind``, after ``initialize``.
+
+    Parameters
+    ----------
+    api : RibasimApi
+        An initialized RibasimApi.
+    names : Iterable[str]
+        The BMI variable names, like "basin.storage".
+    check_pointers : bool
+        Check whether the core reallocated the variables on every access.
+        If False, call ``refresh`` after the core reallocated. Defaults to True.
+    """
+
+    def __init__(
+        self, api: RibasimApi, names: Iterable[str], check_pointers: bool = True
+    ) -> None:
+        self._api = api
+        self.names: tuple[str, ...] = tuple(dict.fromkeys(names))
+        self.check_pointers = check_pointers
+        self._encoded = {name: c_char_p(name.encode()) for name in self.names}
+        self._views: dict[str, NDArray[np.float64]] = {}
+        self._addresses: dict[str, int | None] = {}
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Resolve the views of all variables again."""
+        for name in self.names:
+            self._resolve(name)
+
+    def _resolve(self, name: str) -> None:
+        self._views[name] = self._api.get_value_ptr(name)
+        self._addresses[name] = self._address(name)
+
+    def _address(self, name: str) -> int | None:
+        ptr = c_void_p()
+        self._api._execute_function(
+            self._api.lib.get_value_ptr_double,
+            self._encoded[name],
+            byref(ptr),
+            detail="for variable " + name,
+        )
+        return ptr.value
+
+    def _view(self, name: str) -> NDArray[np.float64]:
+        if name not in self._views:
+            raise KeyError(f"Variable {name} is not bound, bound are: {self.names}")
+        if self.check_pointers and self._address(name) != self._addresses[name]:
+            self._resolve(name)
+        return self._views[name]
+
+    def __getitem__(self, name: str) -> NDArray[np.float64]:
+        return self._view(name)
+
+    def __setitem__(self, name: str, values: ArrayLike) -> None:
+        self._view(name)[:] = values
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._views
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def get_many(
+        self, names: Iterable[str] | None = None
+    ) -> dict[str, NDArray[np.float64]]:
+        """Get the views of several variables, by default all bound variables.
+
+        The returned arrays share memory with the core, copy them to keep the values.
+        """
+        if names is None:
+            names = self.names
+        return {name: self._view(name) for name in names}
+
+    def set_many(self, values: Mapping[str, ArrayLike]) -> None:
+        """Write values into the memory of several variables in place."""
+        for name, value in values.items():
+            self[name] = value
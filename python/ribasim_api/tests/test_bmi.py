@@ -1,10 +1,21 @@
+import asyncio
+import json
 import re
+import threading
+from multiprocessing.connection import Client
 from pathlib import Path
 
 import numpy as np
 import pytest
 import tomli
 from numpy.testing import assert_array_almost_equal
+from ribasim_api import (
+    AsyncRibasimApi,
+    CoupledDriver,
+    EnsembleRunner,
+    RibasimClient,
+    RibasimServer,
+)
 from xmipy.errors import XMIError
 
 
@@ -209,3 +220,237 @@ def test_execute(libribasim, basic, tmp_path):
     basic.write(tmp_path / "ribasim.toml")
     config_file = str(tmp_path / "ribasim.toml")
     libribasim.execute(config_file)
+
+
+def test_bind(libribasim, leaky_bucket, tmp_path):
+    leaky_bucket.write(tmp_path / "ribasim.toml")
+    config_file = str(tmp_path / "ribasim.toml")
+    libribasim.initialize(config_file)
+
+    names = ["basin.storage", "basin.level", "basin.drainage", "basin.infiltration"]
+    variables = libribasim.bind(names)
+    assert variables.names == tuple(names)
+
+    values = variables.get_many()
+    for name in names:
+        assert_array_almost_equal(values[name], libribasim.get_value_ptr(name))
+        # The views share memory with the core
+        assert np.shares_memory(values[name], libribasim.get_value_ptr(name))
+
+    variables.set_many({"basin.drainage": [0.005], "basin.infiltration": [0.001]})
+    assert_array_almost_equal(libribasim.get_value_ptr("basin.drainage"), [0.005])
+    assert_array_almost_equal(libribasim.get_value_ptr("basin.infiltration"), [0.001])
+
+    libribasim.update_until(60.0)
+    assert_array_almost_equal(
+        variables["basin.storage"], libribasim.get_value_ptr("basin.storage")
+    )
+
+    with pytest.raises(KeyError, match="is not bound"):
+        variables["user_demand.demand"]
+
+
+def test_bind_get_many(libribasim, basic, tmp_path):
+    """The bound views give the same values as get_value_ptr, also after updates."""
+    basic.write(tmp_path / "ribasim.toml")
+    config_file = str(tmp_path / "ribasim.toml")
+    libribasim.initialize(config_file)
+
+    names = ["basin.storage", "basin.level", "basin.drainage", "basin.infiltration"]
+    variables = libribasim.bind(names)
+    for time in (0.0, 60.0, 120.0):
+        if time > 0.0:
+            libribasim.update_until(time)
+        bound = variables.get_many()
+        for name in names:
+            np.testing.assert_array_equal(bound[name], libribasim.get_value_ptr(name))
+
+
+def test_coupled_driver(libribasim, leaky_bucket, tmp_path):
+    leaky_bucket.write(tmp_path / "ribasim.toml")
+    config_file = tmp_path / "ribasim.toml"
+
+    times = []
+
+    def pre_step(api, time):
+        return {"basin.drainage": [0.002]}
+
+    def post_step(api, time, values):
+        times.append(time)
+        assert values["basin.drainage"] == pytest.approx([0.002])
+
+    driver = CoupledDriver(
+        libribasim,
+        exchange_interval=86400.0,
+        variables=["basin.storage", "basin.drainage"],
+        pre_step=pre_step,
+        post_step=post_step,
+    )
+    profile = driver.run(config_file)
+
+    end_time = (leaky_bucket.endtime - leaky_bucket.starttime).total_seconds()
+    assert times[-1] == pytest.approx(end_time)
+    assert profile.time == times
+    assert len(profile.update_until) == len(times)
+    assert profile.totals()["update_until"] > 0.0
+
+    table = profile.to_arrow()
+    assert table.column_names == ["time", "update_until", "callback", "value_transfer"]
+    assert table.num_rows == len(times)
+    path = profile.write(tmp_path / "results" / "coupling_stats.arrow")
+    assert path.is_file()
+
+
+def test_coupled_driver_finalizes_on_error(libribasim, leaky_bucket, tmp_path):
+    leaky_bucket.write(tmp_path / "ribasim.toml")
+    config_file = tmp_path / "ribasim.toml"
+
+    def post_step(api, time, values):
+        raise RuntimeError("coupling failed")
+
+    driver = CoupledDriver(libribasim, exchange_interval=86400.0, post_step=post_step)
+    with pytest.raises(RuntimeError, match="coupling failed"):
+        driver.run(config_file)
+
+    # The model was finalized, so the api can run the next one
+    profile = CoupledDriver(libribasim, exchange_interval=86400.0).run(config_file)
+    assert len(profile.time) > 0
+
+
+def test_ensemble_runner(libribasim_paths, basic, tmp_path):
+    lib_path, lib_folder = libribasim_paths
+    toml_path = tmp_path / "basic" / "ribasim.toml"
+    basic.write(toml_path)
+
+    variants = []
+    for factor in (0.5, 2.0):
+        model = basic.model_copy(deep=True)
+        model.basin.static.df.loc[:, "potential_evaporation"] *= factor
+        variants.append(model)
+
+    with EnsembleRunner(lib_path, lib_folder, n_workers=2) as runner:
+        results = runner.run(
+            [toml_path, *variants, tmp_path / "missing.toml"],
+            directory=tmp_path / "ensemble",
+        )
+
+    assert [result.index for result in results] == [0, 1, 2, 3]
+    assert all(result.success for result in results[:3])
+    assert results[0].results_dir == tmp_path / "basic" / "results"
+    for result in results[:3]:
+        assert (result.results_dir / "basin.arrow").is_file()
+
+    # A member without a readable TOML fails on its own
+    missing = results[3]
+    assert not missing.success
+    assert missing.error is not None and "FileNotFoundError" in missing.error
+    assert missing.results_dir == tmp_path / "results"
+
+
+def test_async_update_until(libribasim, basic, tmp_path):
+    basic.write(tmp_path / "ribasim.toml")
+    config_file = str(tmp_path / "ribasim.toml")
+
+    async def run():
+        async with AsyncRibasimApi(libribasim) as api:
+            await api.initialize(config_file)
+            times = [time async for time in api.progress(3600.0, 600.0)]
+            await api.update_until(7200.0)
+            return times, await api.get_current_time()
+
+    times, current_time = asyncio.run(run())
+    assert times == pytest.approx([600.0, 1200.0, 1800.0, 2400.0, 3000.0, 3600.0])
+    assert current_time == pytest.approx(7200.0)
+
+
+def test_async_cancel(libribasim, basic, tmp_path):
+    basic.write(tmp_path / "ribasim.toml")
+    config_file = str(tmp_path / "ribasim.toml")
+
+    async def run():
+        async with AsyncRibasimApi(libribasim) as api:
+            await api.initialize(config_file)
+            end_time = await api.get_end_time()
+            task = asyncio.create_task(api.update_until(end_time, 60.0))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return end_time, await api.get_current_time()
+
+    end_time, current_time = asyncio.run(run())
+    assert current_time < end_time
+    # Cancellation happens between exchange steps
+    assert current_time % 60.0 == pytest.approx(0.0)
+
+
+def test_hot_restart(libribasim, basic, tmp_path):
+    # Don't change the session-scoped model for the other tests
+    model = basic.model_copy(deep=True)
+    model.write(tmp_path / "ribasim.toml")
+    config_file = str(tmp_path / "ribasim.toml")
+    libribasim.initialize(config_file)
+    libribasim.update_until(86400.0)
+
+    state = libribasim.get_basin_state()
+    assert state.time == pytest.approx(86400.0)
+    assert_array_almost_equal(state.level, libribasim.get_value_ptr("basin.level"))
+    libribasim.finalize()
+
+    model.set_basin_state(state.level, state.time)
+    restart_path = tmp_path / "restart" / "ribasim.toml"
+    model.write_restart(restart_path)
+
+    libribasim.initialize(str(restart_path))
+    assert_array_almost_equal(libribasim.get_value_ptr("basin.level"), state.level)
+    assert_array_almost_equal(libribasim.get_value_ptr("basin.storage"), state.storage)
+
+
+def test_server(libribasim, basic, tmp_path):
+    basic.write(tmp_path / "ribasim.toml")
+    address = str(tmp_path / "ribasim.sock")
+    server = RibasimServer(libribasim, address=address)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    client = RibasimClient(address)
+    try:
+        result = client.run(tmp_path / "ribasim.toml")
+        assert result.exit_code == 0
+        assert Path(result.log_path).is_file()
+        assert (Path(result.results_dir) / "basin.arrow").is_file()
+
+        result = client.run(tmp_path / "missing.toml")
+        assert result.exit_code != 0
+        assert client.queued() == 0
+    finally:
+        client.shutdown()
+        thread.join()
+
+
+def test_server_invalid_requests(libribasim, basic, tmp_path):
+    basic.write(tmp_path / "ribasim.toml")
+    address = str(tmp_path / "ribasim.sock")
+    server = RibasimServer(libribasim, address=address)
+    assert Path(address).stat().st_mode & 0o077 == 0
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    client = RibasimClient(address)
+    try:
+        with Client(address) as connection:
+            connection.send_bytes(b"not json")
+            assert "Invalid request" in json.loads(connection.recv_bytes())["error"]
+        with pytest.raises(ValueError, match="Invalid request"):
+            client._request(command="run")
+        # The server still works after invalid requests
+        assert client.queued() == 0
+    finally:
+        client.shutdown()
+        thread.join()
+
+    # Jobs submitted after the shutdown request are rejected instead of queued
+    reply = server._reply(
+        {"command": "run", "toml_path": str(tmp_path / "ribasim.toml")}
+    )
+    assert reply == {"error": "The server is shutting down."}
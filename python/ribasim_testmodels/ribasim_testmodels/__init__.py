@@ -62,6 +62,7 @@ from ribasim_testmodels.pid_control import (
     discrete_control_of_pid_control_model,
     pid_control_model,
 )
+from ribasim_testmodels.synthetic import synthetic_network_model
 from ribasim_testmodels.time import flow_boundary_time_model
 from ribasim_testmodels.trivial import trivial_model
 from ribasim_testmodels.two_basin import two_basin_model
@@ -110,6 +111,7 @@ __all__ = [
     "rating_curve_model",
     "subnetwork_model",
     "subnetworks_with_sources_model",
+    "synthetic_network_model",
     "tabulated_rating_curve_control_model",
     "tabulated_rating_curve_model",
     "transient_condition_model",
@@ -120,7 +122,10 @@ __all__ = [
 
 # provide a mapping from model name to its constructor, so we can iterate over all models
 constructors: dict[str, Callable[[], Model]] = {}
+# synthetic_network_model is left out, it generates models of any size for benchmarks
 for model_name_model in __all__:
+    if model_name_model == "synthetic_network_model":
+        continue
     model_name = model_name_model.removesuffix("_model")
     model_constructor = getattr(ribasim_testmodels, model_name_model)
     constructors[model_name] = model_constructor
@@ -0,0 +1,555 @@
+from typing import Any, Literal
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from numpy.typing import NDArray
+from ribasim import Model
+from ribasim.config import Allocation
+from ribasim.utils import _pascal_to_snake
+
+SPACING = 1000.0
+STARTTIME = pd.Timestamp("2020-01-01")
+
+
+class _NetworkBuilder:
+    """Collect nodes, links and tables as arrays, to assemble them in bulk."""
+
+    def __init__(self) -> None:
+        self.n_nodes = 0
+        self.nodes: dict[str, list[dict[str, NDArray[Any]]]] = {}
+        self.links: list[tuple[NDArray[Any], NDArray[Any], str]] = []
+        self.tables: dict[tuple[str, str], list[pd.DataFrame]] = {}
+
+    def add_nodes(
+        self,
+        node_type: str,
+        x: NDArray[Any],
+        y: NDArray[Any],
+        subnetwork_id: NDArray[Any] | None = None,
+    ) -> NDArray[np.int32]:
+        node_id = np.arange(self.n_nodes + 1, self.n_nodes + len(x) + 1, dtype=np.int32)
+        self.n_nodes += len(x)
+        if len(x) == 0:
+            return node_id
+        self.nodes.setdefault(node_type, []).append(
+            {
+                "node_id": node_id,
+                "x": np.asarray(x, dtype=np.float64),
+                "y": np.asarray(y, dtype=np.float64),
+                "subnetwork_id": np.full(len(x), -1)
+                if subnetwork_id is None
+                else subnetwork_id,
+            }
+        )
+        return node_id
+
+    def add_links(
+        self,
+        from_node_id: NDArray[Any],
+        to_node_id: NDArray[Any],
+        link_type: str = "flow",
+    ) -> None:
+        self.links.append((from_node_id, to_node_id, link_type))
+
+    def add_table(self, node_type: str, table: str, df: pd.DataFrame) -> None:
+        if len(df) > 0:
+            self.tables.setdefault((node_type, table), []).append(df)
+
+    def build(self, model: Model) -> Model:
+        nodes = {
+            node_type: {
+                key: np.concatenate([part[key] for part in parts]) for key in parts[0]
+            }
+            for node_type, parts in self.nodes.items()
+        }
+        x = np.zeros(self.n_nodes + 1)
+        y = np.zeros(self.n_nodes + 1)
+
+        for node_type, node in nodes.items():
+            x[node["node_id"]] = node["x"]
+            y[node["node_id"]] = node["y"]
+            subnetwork_id = pd.array(node["subnetwork_id"], dtype=pd.Int32Dtype())
+            subnetwork_id[node["subnetwork_id"] < 0] = pd.NA
+            node_model = getattr(model, _pascal_to_snake(node_type))
+            node_model.node.df = gpd.GeoDataFrame(
+                data={
+                    "node_type": node_type,
+                    "name": "",
+                    "subnetwork_id": subnetwork_id,
+                    "source_priority": pd.array(
+                        [pd.NA] * len(node["node_id"]), dtype=pd.Int32Dtype()
+                    ),
+                    "cyclic_time": False,
+                },
+                geometry=gpd.points_from_xy(node["x"], node["y"]),
+                index=pd.Index(node["node_id"], name="node_id"),
+                crs=model.crs,
+            )
+
+        for (node_type, table), dfs in self.tables.items():
+            node_model = getattr(model, _pascal_to_snake(node_type))
+            setattr(node_model, table, pd.concat(dfs, ignore_index=True))
+
+        from_node_id = np.concatenate([link[0] for link in self.links])
+        to_node_id = np.concatenate([link[1] for link in self.links])
+        link_type = np.concatenate(
+            [np.full(len(link[0]), link[2]) for link in self.links]
+        )
+        coords = np.stack(
+            [
+                np.column_stack([x[from_node_id], y[from_node_id]]),
+                np.column_stack([x[to_node_id], y[to_node_id]]),
+            ],
+            axis=1,
+        )
+        model.link.df = gpd.GeoDataFrame(
+            data={
+                "from_node_id": from_node_id,
+                "to_node_id": to_node_id,
+                "link_type": link_type,
+                "name": "",
+            },
+            geometry=shapely.linestrings(coords),
+            index=pd.Index(np.arange(1, len(from_node_id) + 1), name="link_id"),
+            crs=model.crs,
+        )
+
+        # Register the IDs, such that nodes and links can still be added one by one.
+        node_ids = np.arange(1, self.n_nodes + 1)
+        model._used_node_ids.node_ids.update(node_ids.tolist())
+        model._used_node_ids.max_node_id = self.n_nodes
+        model.link._used_link_ids.node_ids.update(model.link.df.index.tolist())
+        model.link._used_link_ids.max_node_id = len(from_node_id)
+        return model
+
+
+def _block_edges(
+    topology: str, n: int, rng: np.random.Generator
+) -> tuple[NDArray[Any], NDArray[Any], NDArray[Any], NDArray[Any]]:
+    """Generate the basin to basin connections within a block of n basins.
+
+    Returns the directed connections and the bidirectional connections,
+    as local basin indices.
+    """
+    local = np.arange(1, n)
+    if topology == "grid":
+        width = int(np.ceil(np.sqrt(n)))
+        index = np.arange(n)
+        east = index[(index % width < width - 1) & (index + 1 < n)]
+        south = index[index + width < n]
+        upstream = np.concatenate([east, south])
+        downstream = np.concatenate([east + 1, south + width])
+        return upstream, downstream, np.empty(0, int), np.empty(0, int)
+
+    # A random recursive tree: every basin is fed by a random earlier basin.
+    parent = (rng.random(n - 1) * local).astype(int)
+    if topology == "tree":
+        return parent, local, np.empty(0, int), np.empty(0, int)
+
+    # Close loops by connecting a fifth of the basins to another earlier basin,
+    # through a resistance that allows flow in both directions.
+    other = (rng.random(n - 1) * local).astype(int)
+    is_loop = (rng.random(n - 1) < 0.2) & (other != parent)
+    return parent, local, other[is_loop], local[is_loop]
+
+
+def synthetic_network_model(
+    n_basins: int = 100,
+    topology: Literal["tree", "grid", "looped"] = "tree",
+    control_fraction: float = 0.1,
+    demand_fraction: float = 0.1,
+    allocation_subnetworks: int = 0,
+    forcing_years: int = 0,
+    seed: int = 0,
+) -> Model:
+    """Generate a large synthetic model, for benchmarking.
+
+    Water enters the network at a FlowBoundary and flows through Basins
+    connected by TabulatedRatingCurve, Pump and Outlet nodes,
+    to leave the network at a Terminal.
+    All tables are generated as arrays and assigned at once,
+    such that models with a hundred thousand nodes are generated in seconds.
+    The same arguments always generate the same model.
+
+    Parameters
+    ----------
+    n_basins : int
+        The number of Basins, the total number of nodes is about three times larger.
+    topology : str
+        The layout of the connections between Basins. Either "tree",
+        a random tree; "grid", a rectangular grid flowing east and south;
+        or "looped", a random tree with resistances that close loops.
+    control_fraction : float
+        The fraction of Pumps and Outlets that are controlled by a DiscreteControl.
+    demand_fraction : float
+        The fraction of Basins with a UserDemand.
+    allocation_subnetworks : int
+        The number of subnetworks supplied by a main network.
+        If nonzero, allocation is enabled and the Basins in subnetworks get a LevelDemand.
+    forcing_years : int
+        The number of years of daily Basin forcing and FlowBoundary inflow.
+        If zero, the forcing is static and the model runs for a year.
+    seed : int
+        The seed of the random number generator.
+    """
+    if topology not in ("tree", "grid", "looped"):
+        raise ValueError(
+            f"topology must be 'tree', 'grid' or 'looped', got '{topology}'."
+        )
+    n_blocks = allocation_subnetworks + 1
+    if n_basins < n_blocks:
+        raise ValueError(
+            f"Expected at least one Basin per subnetwork, got {n_basins} Basins for {n_blocks} networks."
+        )
+
+    rng = np.random.default_rng(seed)
+    use_allocation = allocation_subnetworks > 0
+    endtime = STARTTIME + pd.DateOffset(years=max(forcing_years, 1))
+    model = Model(
+        starttime=STARTTIME,
+        endtime=endtime,
+        crs="EPSG:28992",
+        allocation=Allocation(use_allocation=use_allocation, timestep=86400),
+    )
+    builder = _NetworkBuilder()
+
+    # Split the Basins into blocks, the first is the main network.
+    block_sizes = np.diff(np.linspace(0, n_basins, n_blocks + 1).astype(int))
+    block_start = np.concatenate([[0], np.cumsum(block_sizes)[:-1]])
+    block = np.repeat(np.arange(n_blocks), block_sizes)
+    local = np.arange(n_basins) - block_start[block]
+    subnetwork = block + 1 if use_allocation else np.full(n_basins, -1)
+
+    # Lay out every block as a square grid, with the blocks side by side.
+    block_width = np.ceil(np.sqrt(block_sizes)).astype(int)
+    block_x = np.concatenate([[0], np.cumsum(block_width + 1)[:-1]]) * SPACING
+    basin_x = block_x[block] + (local % block_width[block]) * SPACING
+    basin_y = -(local // block_width[block]) * SPACING
+    basin_id = builder.add_nodes("Basin", basin_x, basin_y, subnetwork)
+
+    upstream_parts, downstream_parts, loop_a_parts, loop_b_parts = [], [], [], []
+    for start, size in zip(block_start, block_sizes):
+        upstream, downstream, loop_a, loop_b = _block_edges(topology, size, rng)
+        upstream_parts.append(upstream + start)
+        downstream_parts.append(downstream + start)
+        loop_a_parts.append(loop_a + start)
+        loop_b_parts.append(loop_b + start)
+    upstream = np.concatenate(upstream_parts)
+    downstream = np.concatenate(downstream_parts)
+    loop_a = np.concatenate(loop_a_parts)
+    loop_b = np.concatenate(loop_b_parts)
+
+    # Connect the first Basin of every subnetwork to a random Basin of the main network.
+    inlet_to = block_start[1:]
+    inlet_from = (rng.random(allocation_subnetworks) * block_sizes[0]).astype(int)
+
+    # Drain every Basin without outflow into the Terminal of its block.
+    has_outflow = np.zeros(n_basins, dtype=bool)
+    has_outflow[upstream] = True
+    drain = np.flatnonzero(~has_outflow)
+
+    # Basins, with a profile that widens with depth
+    area = rng.lognormal(np.log(1e5), 0.5, n_basins)
+    builder.add_table(
+        "Basin",
+        "profile",
+        pd.DataFrame(
+            {
+                "node_id": np.repeat(basin_id, 2),
+                "area": np.column_stack([0.1 * area, area]).ravel(),
+                "level": np.tile([0.0, 5.0], n_basins),
+            }
+        ),
+    )
+    builder.add_table(
+        "Basin",
+        "state",
+        pd.DataFrame({"node_id": basin_id, "level": rng.uniform(1.0, 2.0, n_basins)}),
+    )
+    precipitation = 2e-3 / 86400
+    evaporation = 1e-3 / 86400
+    if forcing_years > 0:
+        time = pd.date_range(STARTTIME, endtime, freq="D", inclusive="left")
+        season = np.sin(2 * np.pi * time.dayofyear.to_numpy() / 365.25)
+        scale = rng.uniform(0.5, 1.5, n_basins)
+        n_time = len(time)
+        builder.add_table(
+            "Basin",
+            "time",
+            pd.DataFrame(
+                {
+                    "node_id": np.repeat(basin_id, n_time),
+                    "time": np.tile(time, n_basins),
+                    "drainage": 0.0,
+                    "potential_evaporation": np.outer(
+                        scale, evaporation * (1.0 + season)
+                    ).ravel(),
+                    "infiltration": 0.0,
+                    "precipitation": (
+                        precipitation * rng.exponential(1.0, (n_basins, n_time))
+                    ).ravel(),
+                }
+            ),
+        )
+    else:
+        builder.add_table(
+            "Basin",
+            "static",
+            pd.DataFrame(
+                {
+                    "node_id": basin_id,
+                    "drainage": 0.0,
+                    "potential_evaporation": evaporation,
+                    "infiltration": 0.0,
+                    "precipitation": precipitation,
+                }
+            ),
+        )
+
+    # The inflow into the first Basin of the main network
+    (inflow_id,) = builder.add_nodes(
+        "FlowBoundary",
+        basin_x[:1] - 0.5 * SPACING,
+        basin_y[:1],
+        subnetwork[:1],
+    )
+    inflow = 1e-4 * n_basins
+    if forcing_years > 0:
+        builder.add_table(
+            "FlowBoundary",
+            "time",
+            pd.DataFrame(
+                {
+                    "node_id": inflow_id,
+                    "time": time,
+                    "flow_rate": inflow * (1.0 - 0.5 * season),
+                }
+            ),
+        )
+    else:
+        builder.add_table(
+            "FlowBoundary",
+            "static",
+            pd.DataFrame({"node_id": [inflow_id], "flow_rate": [inflow]}),
+        )
+    builder.add_links(np.array([inflow_id]), basin_id[:1])
+
+    terminal_id = builder.add_nodes(
+        "Terminal",
+        block_x + (block_width - 0.5) * SPACING,
+        np.full(n_blocks, 0.5 * SPACING),
+        subnetwork[block_start],
+    )
+
+    # The connections between Basins, and from Basins to the Terminal.
+    # The inlets of subnetworks are Pumps, belonging to the subnetwork.
+    connection_from = np.concatenate([upstream, inlet_from, drain])
+    connection_to = np.concatenate([downstream, inlet_to, np.full(len(drain), -1)])
+    n_connections = len(connection_from)
+    connector_type = rng.choice(
+        np.array(["TabulatedRatingCurve", "Pump", "Outlet"]),
+        size=n_connections,
+        p=[0.6, 0.2, 0.2],
+    )
+    connector_type[len(upstream) : len(upstream) + len(inlet_to)] = "Pump"
+    connector_type[n_connections - len(drain) :] = "TabulatedRatingCurve"
+    is_drain = connection_to < 0
+    from_x = basin_x[connection_from]
+    from_y = basin_y[connection_from]
+    to_x = np.where(is_drain, from_x + 0.25 * SPACING, basin_x[connection_to])
+    to_y = np.where(is_drain, from_y - 0.25 * SPACING, basin_y[connection_to])
+    connector_subnetwork = subnetwork[
+        np.where(is_drain, connection_from, connection_to)
+    ]
+    downstream_id = np.where(
+        is_drain,
+        terminal_id[block[connection_from]],
+        basin_id[connection_to],
+    )
+
+    capacity = inflow / np.sqrt(n_basins) * rng.uniform(1.0, 3.0, n_connections)
+    for node_type in ("TabulatedRatingCurve", "Pump", "Outlet"):
+        selection = np.flatnonzero(connector_type == node_type)
+        node_id = builder.add_nodes(
+            node_type,
+            0.5 * (from_x[selection] + to_x[selection]),
+            0.5 * (from_y[selection] + to_y[selection]),
+            connector_subnetwork[selection],
+        )
+        builder.add_links(basin_id[connection_from[selection]], node_id)
+        builder.add_links(node_id, downstream_id[selection])
+        flow_rate = capacity[selection]
+
+        if node_type == "TabulatedRatingCurve":
+            builder.add_table(
+                node_type,
+                "static",
+                pd.DataFrame(
+                    {
+                        "node_id": np.repeat(node_id, 2),
+                        "level": np.tile([0.5, 3.0], len(node_id)),
+                        "flow_rate": np.column_stack(
+                            [np.zeros_like(flow_rate), flow_rate]
+                        ).ravel(),
+                    }
+                ),
+            )
+            continue
+
+        # Control a fraction of the Pumps and Outlets by the level of the upstream Basin.
+        controlled = rng.random(len(node_id)) < control_fraction
+        builder.add_table(
+            node_type,
+            "static",
+            pd.DataFrame(
+                {
+                    "node_id": node_id[~controlled],
+                    "flow_rate": flow_rate[~controlled],
+                    "max_flow_rate": flow_rate[~controlled],
+                    "min_upstream_level": 0.5,
+                }
+            ),
+        )
+        n_controlled = int(controlled.sum())
+        builder.add_table(
+            node_type,
+            "static",
+            pd.DataFrame(
+                {
+                    "node_id": np.repeat(node_id[controlled], 2),
+                    "flow_rate": np.column_stack(
+                        [np.zeros(n_controlled), flow_rate[controlled]]
+                    ).ravel(),
+                    "max_flow_rate": np.repeat(flow_rate[controlled], 2),
+                    "min_upstream_level": 0.5,
+                    "control_state": np.tile(["off", "on"], n_controlled),
+                }
+            ),
+        )
+        control_id = builder.add_nodes(
+            "DiscreteControl",
+            0.5 * (from_x[selection][controlled] + to_x[selection][controlled]),
+            0.5 * (from_y[selection][controlled] + to_y[selection][controlled])
+            + 0.25 * SPACING,
+            connector_subnetwork[selection][controlled],
+        )
+        builder.add_links(control_id, node_id[controlled], "control")
+        builder.add_table(
+            "DiscreteControl",
+            "variable",
+            pd.DataFrame(
+                {
+                    "node_id": control_id,
+                    "compound_variable_id": 1,
+                    "listen_node_id": basin_id[connection_from[selection][controlled]],
+                    "variable": "level",
+                }
+            ),
+        )
+        builder.add_table(
+            "DiscreteControl",
+            "condition",
+            pd.DataFrame(
+                {
+                    "node_id": control_id,
+                    "compound_variable_id": 1,
+                    "condition_id": 1,
+                    "greater_than": rng.uniform(1.0, 2.0, n_controlled),
+                }
+            ),
+        )
+        builder.add_table(
+            "DiscreteControl",
+            "logic",
+            pd.DataFrame(
+                {
+                    "node_id": np.repeat(control_id, 2),
+                    "truth_state": np.tile(["F", "T"], n_controlled),
+                    "control_state": np.tile(["off", "on"], n_controlled),
+                }
+            ),
+        )
+
+    # UserDemands take water from a Basin, and return it to the Terminal.
+    demand = np.flatnonzero(rng.random(n_basins) < demand_fraction)
+    user_demand_id = builder.add_nodes(
+        "UserDemand",
+        basin_x[demand] - 0.25 * SPACING,
+        basin_y[demand] + 0.25 * SPACING,
+        subnetwork[demand],
+    )
+    builder.add_links(basin_id[demand], user_demand_id)
+    builder.add_links(user_demand_id, terminal_id[block[demand]])
+    builder.add_table(
+        "UserDemand",
+        "static",
+        pd.DataFrame(
+            {
+                "node_id": user_demand_id,
+                "demand": inflow / n_basins * rng.uniform(0.5, 2.0, len(demand)),
+                "return_factor": 0.8,
+                "min_level": 0.5,
+                "demand_priority": rng.integers(1, 4, len(demand)),
+            }
+        ),
+    )
+
+    if use_allocation:
+        # Keep the Basins in subnetworks above a target level.
+        in_subnetwork = np.flatnonzero(block > 0)
+        level_demand_id = builder.add_nodes(
+            "LevelDemand",
+            basin_x[in_subnetwork] + 0.25 * SPACING,
+            basin_y[in_subnetwork] + 0.25 * SPACING,
+            subnetwork[in_subnetwork],
+        )
+        builder.add_links(level_demand_id, basin_id[in_subnetwork], "control")
+        builder.add_table(
+            "LevelDemand",
+            "static",
+            pd.DataFrame(
+                {
+                    "node_id": level_demand_id,
+                    "min_level": 1.0,
+                    "max_level": 1.5,
+                    "demand_priority": 1,
+                }
+            ),
+        )
+
+    # Resistances that close loops, these allow flow in both directions.
+    if len(loop_a) > 0:
+        is_manning = rng.random(len(loop_a)) < 0.5
+        for node_type, selection in (
+            ("LinearResistance", np.flatnonzero(~is_manning)),
+            ("ManningResistance", np.flatnonzero(is_manning)),
+        ):
+            a = loop_a[selection]
+            b = loop_b[selection]
+            node_id = builder.add_nodes(
+                node_type,
+                0.5 * (basin_x[a] + basin_x[b]) + 0.1 * SPACING,
+                0.5 * (basin_y[a] + basin_y[b]) + 0.1 * SPACING,
+                subnetwork[b],
+            )
+            builder.add_links(basin_id[a], node_id)
+            builder.add_links(node_id, basin_id[b])
+            static: dict[str, Any]
+            if node_type == "LinearResistance":
+                static = {"resistance": rng.uniform(1e3, 1e4, len(node_id))}
+            else:
+                static = {
+                    "length": np.hypot(
+                        basin_x[a] - basin_x[b], basin_y[a] - basin_y[b]
+                    ),
+                    "manning_n": 0.04,
+                    "profile_width": rng.uniform(2.0, 10.0, len(node_id)),
+                    "profile_slope": 2.0,
+                }
+            builder.add_table(
+                node_type, "static", pd.DataFrame({"node_id": node_id, **static})
+            )
+
+    return builder.build(model)
@@ -1,10 +1,21 @@
+import math
+import sqlite3
+from collections import defaultdict
 from collections.abc import Iterable
-from typing import TYPE_CHECKING, cast
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, cast
 
 import numpy as np
-from qgis.core import QgsFeature, QgsVectorLayer
-from qgis.core.additions.edit import edit
+from qgis.core import (
+    Qgis,
+    QgsFeature,
+    QgsFeatureRequest,
+    QgsProviderRegistry,
+    QgsUnitTypes,
+    QgsVectorLayer,
+)
 
+from ribasim_qgis.core.geopackage import sqlite3_cursor
 from ribasim_qgis.core.nodes import SPATIALCONTROLNODETYPES
 
 if TYPE_CHECKING:
@@ -14,54 +25,260 @@ else:
 
     NDArray: type = Sequence
 
+# The size in bytes of the GeoPackage geometry header envelope, by envelope indicator
+ENVELOPE_SIZE = np.array([0, 32, 48, 48, 64, 0, 0, 0])
+# The number of coordinates per vertex, by the thousands of the ISO WKB geometry type
+VERTEX_SIZE = np.array([2, 3, 3, 4])
+WKB_POINT = 1
+WKB_LINESTRING = 2
+# The distance in meters within which a link vertex is connected to a node
+SNAPPING_TOLERANCE = 1e-6
+
+
+def snapping_tolerance(layer: QgsVectorLayer) -> float:
+    """
+    Convert the SNAPPING_TOLERANCE to the map units of the layer CRS.
+
+    A tolerance of a micrometer in a geographic CRS is about 1e-11 degrees.
+    Without a CRS, the map units are assumed to be meters.
+    """
+    units = layer.crs().mapUnits()
+    if units == Qgis.DistanceUnit.Unknown:
+        return SNAPPING_TOLERANCE
+    factor = QgsUnitTypes.fromUnitToUnitFactor(Qgis.DistanceUnit.Meters, units)
+    return SNAPPING_TOLERANCE * factor
+
+
+def grid_cell_size(xy: NDArray[np.float64], tolerance: float) -> float:
+    """
+    Choose the cell size of a spatial hash of the points xy.
+
+    The cells are at least as large as the tolerance, such that a search only
+    needs to visit the neighbouring cells, and hold about one point on average.
+    """
+    if len(xy) == 0:
+        return max(tolerance, 1.0)
+    span = np.ptp(xy, axis=0)
+    cell_size = max(
+        tolerance,
+        math.sqrt(span[0] * span[1] / len(xy)),
+        span.max() / len(xy),
+    )
+    return cell_size if cell_size > 0 else 1.0
+
+
+def snapping_error(
+    unmatched_xy: NDArray[np.float64],
+    ambiguous_xy: NDArray[np.float64],
+    tolerance: float,
+) -> ValueError:
+    """Describe the link vertices that are not snapped to exactly one node."""
+    messages = []
+    if len(unmatched_xy) > 0:
+        x, y = unmatched_xy[0]
+        messages.append(
+            f"{len(unmatched_xy)} link vertices are not within {tolerance} of a node, "
+            f"for instance at ({x}, {y})."
+        )
+    if len(ambiguous_xy) > 0:
+        x, y = ambiguous_xy[0]
+        messages.append(
+            f"{len(ambiguous_xy)} link vertices are within {tolerance} of multiple "
+            f"nodes, for instance at ({x}, {y})."
+        )
+    messages.append("Please ensure all links are snapped to a single node.")
+    return ValueError(" ".join(messages))
+
 
 def derive_connectivity(
     node_index: NDArray[np.int_],
     node_xy: NDArray[np.float64],
     link_xy: NDArray[np.float64],
+    tolerance: float = SNAPPING_TOLERANCE,
 ) -> tuple[NDArray[np.int_], NDArray[np.int_]]:
     """
     Derive connectivity on the basis of xy locations.
 
-    If the first and last vertices of the links have been setup neatly through
-    snapping in QGIS, the points should be the same.
+    The first and last vertices of the links are connected to the node that lies
+    within ``tolerance``, in map units. To find it, the nodes are sorted by the cell of a grid
+    they fall in, and every vertex is only compared with the nodes in the
+    surrounding cells, for all vertices at once.
+    Raises a ValueError if a vertex is not within ``tolerance`` of exactly one node.
     """
-    # collect xy
-    # stack all into a single array
-    xy = np.vstack([node_xy, link_xy])
-    _, index, inverse = np.unique(xy, return_index=True, return_inverse=True, axis=0)
-    uniques_index = index[inverse]
+    n_vertex = len(link_xy)
+    if n_vertex == 0:
+        empty = np.empty(0, dtype=int)
+        return empty, empty
+    if len(node_xy) == 0:
+        raise snapping_error(link_xy, link_xy[:0], tolerance)
+    cell_size = grid_cell_size(node_xy, tolerance)
+    node_cell = np.floor(node_xy / cell_size).astype(np.int64)
+    link_cell = np.floor(link_xy / cell_size).astype(np.int64)
 
-    node_node_id, link_node_id = np.split(uniques_index, [len(node_xy)])
-    if not np.isin(link_node_id, node_node_id).all():
-        raise ValueError(
-            "Link layer contains coordinates that are not in the node layer. "
-            "Please ensure all links are snapped to nodes exactly."
-        )
+    # Number the cells column by column, with a margin for the neighbours,
+    # and store where the nodes of every cell start in the sorted nodes
+    lower = node_cell.min(axis=0) - 1
+    shape = node_cell.max(axis=0) - lower + 2
+    node_key = (node_cell[:, 0] - lower[0]) * shape[1] + node_cell[:, 1] - lower[1]
+    order = np.argsort(node_key, kind="stable")
+    cell_count = np.bincount(node_key, minlength=shape.prod())
+    cell_start = np.cumsum(cell_count) - cell_count
+
+    candidate_vertex = []
+    candidate_node = []
+    for offset in [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]:
+        cell = link_cell + offset - lower
+        inside = ((cell >= 0) & (cell < shape)).all(axis=1)
+        key = cell[inside, 0] * shape[1] + cell[inside, 1]
+        count = cell_count[key]
+        # Enumerate the nodes of every cell
+        first = np.repeat(np.cumsum(count) - count, count)
+        position = np.repeat(cell_start[key], count) + np.arange(count.sum()) - first
+        candidate_vertex.append(np.repeat(np.flatnonzero(inside), count))
+        candidate_node.append(order[position])
+
+    vertex = np.concatenate(candidate_vertex)
+    node = np.concatenate(candidate_node)
+    distance = np.hypot(*(link_xy[vertex] - node_xy[node]).T)
+    within = distance <= tolerance
+    vertex = vertex[within]
+    node = node[within]
 
-    link_node_id = link_node_id.reshape((-1, 2))
-    from_id = node_index[link_node_id[:, 0]]
-    to_id = node_index[link_node_id[:, 1]]
+    n_match = np.bincount(vertex, minlength=n_vertex)
+    if (n_match != 1).any():
+        raise snapping_error(link_xy[n_match == 0], link_xy[n_match > 1], tolerance)
+
+    link_node = np.empty(n_vertex, dtype=int)
+    link_node[vertex] = node
+    link_node = link_node.reshape((-1, 2))
+    from_id = node_index[link_node[:, 0]]
+    to_id = node_index[link_node[:, 1]]
     return from_id, to_id
 
 
+def _geopackage_table(layer: QgsVectorLayer) -> tuple[Path, str] | None:
+    """Return the GeoPackage and table of a layer, if it can be read directly.
+
+    That is the case when the layer is a GeoPackage table that is not being edited
+    and not filtered, since the table holds neither the edit buffer nor the subset.
+    """
+    if (
+        layer.providerType() != "ogr"
+        or layer.isEditable()
+        or layer.isModified()
+        or layer.subsetString()
+    ):
+        return None
+    registry = QgsProviderRegistry.instance()
+    assert registry is not None
+    parts = registry.decodeUri("ogr", layer.source())
+    path = parts.get("path")
+    table = parts.get("layerName")
+    if not path or not table or Path(path).suffix.lower() != ".gpkg":
+        return None
+    return Path(path), table
+
+
+def _read_table(
+    path: Path, table: str, columns: list[str]
+) -> tuple[NDArray[np.int_], list[tuple[Any, ...]], list[bytes]]:
+    """Read the feature ids, the given columns and geometries of a GeoPackage table."""
+    with sqlite3_cursor(path) as cursor:
+        cursor.execute(
+            "SELECT column_name FROM gpkg_geometry_columns WHERE table_name = ?",
+            (table,),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            raise ValueError(f"{table} is not a spatial table")
+        (geometry_column,) = row
+        cursor.execute(f'PRAGMA table_info("{table}")')
+        (fid_column,) = [row[1] for row in cursor.fetchall() if row[5] == 1]
+        selection = ", ".join(f'"{c}"' for c in [fid_column, geometry_column, *columns])
+        cursor.execute(f'SELECT {selection} FROM "{table}"')
+        rows = cursor.fetchall()
+
+    fid = np.fromiter((row[0] for row in rows), dtype=int, count=len(rows))
+    geometry = [row[1] for row in rows]
+    values = [row[2:] for row in rows]
+    return fid, values, geometry
+
+
+def _read_uint32(buffer: NDArray[np.uint8], offset: NDArray[np.int_]) -> NDArray[Any]:
+    return buffer[offset[:, None] + np.arange(4)].view("<u4").ravel()
+
+
+def _read_xy(buffer: NDArray[np.uint8], offset: NDArray[np.int_]) -> NDArray[Any]:
+    return buffer[offset[:, None] + np.arange(16)].view("<f8")
+
+
+def _parse_geometries(
+    blobs: list[bytes], geometry_type: int
+) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+    """Parse the first and last vertex of GeoPackage geometry blobs, all at once.
+
+    Raises a ValueError for any geometry that is not a little endian Point or
+    LineString, such that the caller can fall back on QGIS to read it.
+    """
+    if not blobs:
+        empty = np.empty((0, 2), dtype=np.float64)
+        return empty, empty
+    if any(blob is None for blob in blobs):
+        raise ValueError("Found features without geometry")
+    lengths = np.fromiter(map(len, blobs), dtype=int, count=len(blobs))
+    start = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(int)
+    buffer = np.frombuffer(b"".join(blobs), dtype=np.uint8)
+
+    # Skip the GeoPackage header, which contains an optional envelope
+    flags = buffer[start + 3]
+    wkb = start + 8 + ENVELOPE_SIZE[(flags >> 1) & 0b111]
+    if (buffer[wkb] != 1).any():
+        raise ValueError("Only little endian WKB geometries are supported")
+
+    wkb_type = _read_uint32(buffer, wkb + 1)
+    if (wkb_type % 1000 != geometry_type).any() or (wkb_type >= 4000).any():
+        raise ValueError(f"Only WKB geometries of type {geometry_type} are supported")
+    vertex_bytes = 8 * VERTEX_SIZE[wkb_type // 1000]
+
+    if geometry_type == WKB_POINT:
+        xy = _read_xy(buffer, wkb + 5)
+        return xy, xy
+
+    n_vertex = _read_uint32(buffer, wkb + 5).astype(int)
+    if (n_vertex < 2).any():
+        raise ValueError("Found lines with less than two vertices")
+    first = wkb + 9
+    last = first + (n_vertex - 1) * vertex_bytes
+    return _read_xy(buffer, first), _read_xy(buffer, last)
+
+
 def collect_node_properties(
     node: QgsVectorLayer,
-) -> tuple[NDArray[np.float64], NDArray[np.int_], dict[str, tuple[str, int]]]:
-    n_node = node.featureCount()
+) -> tuple[NDArray[np.float64], NDArray[np.int_], dict[int, tuple[str, int]]]:
+    table = _geopackage_table(node)
+    if table is not None:
+        try:
+            fid, values, geometry = _read_table(*table, ["node_type", "node_id"])
+            node_xy, _ = _parse_geometries(geometry, WKB_POINT)
+            return node_xy, fid, dict(zip(fid.tolist(), values))
+        except (ValueError, sqlite3.Error):
+            pass
+
     node_fields = node.fields()
     type_field = node_fields.indexFromName("node_type")
     id_field = node_fields.indexFromName("node_id")
+    request = QgsFeatureRequest().setSubsetOfAttributes([type_field, id_field])
 
+    n_node = node.featureCount()
     node_xy = np.empty((n_node, 2), dtype=float)
     node_index = np.empty(n_node, dtype=int)
-    node_iterator = cast(Iterable[QgsFeature], node.getFeatures())
+    node_iterator = cast(Iterable[QgsFeature], node.getFeatures(request))
     node_identifiers = {}
     for i, feature in enumerate(node_iterator):
         point = feature.geometry().asPoint()
         node_xy[i, 0] = point.x()
         node_xy[i, 1] = point.y()
-        feature_id = feature.attribute(0)
+        feature_id = feature.id()
         node_index[i] = feature_id
         node_type = feature.attribute(type_field)
         node_id = feature.attribute(id_field)
@@ -70,22 +287,47 @@ def collect_node_properties(
     return node_xy, node_index, node_identifiers
 
 
-def collect_link_coordinates(link: QgsVectorLayer) -> NDArray[np.float64]:
-    # Collect the coordinates of the first and last vertex of every link
-    # geometry.
+def collect_link_properties(
+    link: QgsVectorLayer,
+) -> tuple[NDArray[np.int_], NDArray[np.float64], list[tuple[Any, ...]]]:
+    """
+    Collect the feature ids, the first and last vertex and the current properties of the links.
+
+    The vertices are returned as one row per vertex,
+    the properties are (from_node_id, to_node_id, link_type) tuples.
+    """
+    columns = ["from_node_id", "to_node_id", "link_type"]
+    table = _geopackage_table(link)
+    if table is not None:
+        try:
+            fid, values, geometry = _read_table(*table, columns)
+            first, last = _parse_geometries(geometry, WKB_LINESTRING)
+            link_xy = np.stack([first, last], axis=1).reshape((-1, 2))
+            return fid, link_xy, values
+        except (ValueError, sqlite3.Error):
+            pass
+
+    link_fields = link.fields()
+    fields = [link_fields.indexFromName(column) for column in columns]
+    request = QgsFeatureRequest().setSubsetOfAttributes(fields)
+
     n_link = link.featureCount()
+    link_fid = np.empty(n_link, dtype=int)
     link_xy = np.empty((n_link, 2, 2), dtype=float)
-    link_iterator = cast(Iterable[QgsFeature], link.getFeatures())
+    link_values = []
+    link_iterator = cast(Iterable[QgsFeature], link.getFeatures(request))
     for i, feature in enumerate(link_iterator):
         geometry = feature.geometry().asPolyline()
         first = geometry[0]
         last = geometry[-1]
+        link_fid[i] = feature.id()
         link_xy[i, 0, 0] = first.x()
         link_xy[i, 0, 1] = first.y()
         link_xy[i, 1, 0] = last.x()
         link_xy[i, 1, 1] = last.y()
+        link_values.append(tuple(feature.attribute(field) for field in fields))
     link_xy = link_xy.reshape((-1, 2))
-    return link_xy
+    return link_fid, link_xy, link_values
 
 
 def infer_link_type(from_node_type: str) -> str:
@@ -95,43 +337,276 @@ def infer_link_type(from_node_type: str) -> str:
         return "flow"
 
 
-def set_link_properties(node: QgsVectorLayer, link: QgsVectorLayer) -> None:
+def change_attribute_values(
+    layer: QgsVectorLayer, changes: dict[int, dict[int, Any]]
+) -> None:
+    """
+    Change the attribute values of many features at once.
+
+    If the layer is being edited the changes go into the edit buffer as a single
+    undo command, otherwise they are written to the data provider in one go.
+    """
+    if not changes:
+        return
+
+    try:
+        # Avoid infinite recursion
+        layer.blockSignals(True)
+        if layer.isEditable():
+            layer.beginEditCommand("Set link properties")
+            for fid, attributes in changes.items():
+                layer.changeAttributeValues(fid, attributes)
+            layer.endEditCommand()
+        else:
+            provider = layer.dataProvider()
+            assert provider is not None
+            provider.changeAttributeValues(changes)
+    finally:
+        layer.blockSignals(False)
+
+    if not layer.isEditable():
+        # Let the layer and its attribute table pick up the changes of the provider
+        layer.reload()
+    layer.triggerRepaint()
+
+
+def set_link_properties(
+    node: QgsVectorLayer, link: QgsVectorLayer, tolerance: float | None = None
+) -> None:
     """
     Set link properties based on the node and link geometries.
 
     Based on the location of the first and last vertex of every link geometry,
-    derive which nodes it connects.
+    derive which nodes within ``tolerance`` it connects. The tolerance defaults
+    to the snapping tolerance in the map units of the node layer.
+    Only the links of which the properties change are written.
 
     Sets values for:
     * from_node_id
     * to_node_id
     * link_type
     """
+    if tolerance is None:
+        tolerance = snapping_tolerance(node)
     node_xy, node_index, node_identifiers = collect_node_properties(node)
-    link_xy = collect_link_coordinates(link)
-    from_fid, to_fid = derive_connectivity(node_index, node_xy, link_xy)
+    link_fid, link_xy, link_values = collect_link_properties(link)
+    from_fid, to_fid = derive_connectivity(node_index, node_xy, link_xy, tolerance)
 
     link_fields = link.fields()
-    from_id_field = link_fields.indexFromName("from_node_id")
-    to_id_field = link_fields.indexFromName("to_node_id")
-    link_type_field = link_fields.indexFromName("link_type")
-
-    try:
-        # Avoid infinite recursion
-        link.blockSignals(True)
-        with edit(link):
-            link_iterator = cast(Iterable[QgsFeature], link.getFeatures())
-            for feature, fid1, fid2 in zip(link_iterator, from_fid, to_fid):
-                type1, id1 = node_identifiers[fid1]
-                _, id2 = node_identifiers[fid2]
-                link_type = infer_link_type(type1)
-
-                fid = feature.id()
-                link.changeAttributeValue(fid, from_id_field, id1)
-                link.changeAttributeValue(fid, to_id_field, id2)
-                link.changeAttributeValue(fid, link_type_field, link_type)
+    fields = [
+        link_fields.indexFromName("from_node_id"),
+        link_fields.indexFromName("to_node_id"),
+        link_fields.indexFromName("link_type"),
+    ]
 
-    finally:
-        link.blockSignals(False)
+    changes = {}
+    for fid, fid1, fid2, current in zip(
+        link_fid.tolist(), from_fid.tolist(), to_fid.tolist(), link_values
+    ):
+        type1, id1 = node_identifiers[fid1]
+        _, id2 = node_identifiers[fid2]
+        values = (id1, id2, infer_link_type(type1))
+        if values != tuple(current):
+            changes[fid] = dict(zip(fields, values))
 
+    change_attribute_values(link, changes)
     return
+
+
+class NodeIndex:
+    """
+    A spatial hash of the node locations, to find the nodes near a link vertex.
+
+    The nodes are stored in square cells of ``cell_size``, which is at least
+    ``tolerance``, such that a lookup only compares the nodes in the
+    neighbouring cells.
+    """
+
+    def __init__(self, tolerance: float = SNAPPING_TOLERANCE, cell_size: float = 1.0):
+        self.tolerance = tolerance
+        self.cell_size = max(cell_size, tolerance)
+        self.cells: defaultdict[tuple[int, int], set[int]] = defaultdict(set)
+        self.xy: dict[int, tuple[float, float]] = {}
+        self.identifiers: dict[int, tuple[str, int]] = {}
+
+    @classmethod
+    def from_layer(
+        cls, node: QgsVectorLayer, tolerance: float | None = None
+    ) -> "NodeIndex":
+        if tolerance is None:
+            tolerance = snapping_tolerance(node)
+        node_xy, node_index, node_identifiers = collect_node_properties(node)
+        index = cls(tolerance, grid_cell_size(node_xy, tolerance))
+        for fid, (x, y) in zip(node_index.tolist(), node_xy.tolist()):
+            index.insert(fid, x, y)
+        index.identifiers = node_identifiers
+        return index
+
+    def _cell(self, x: float, y: float) -> tuple[int, int]:
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def insert(self, fid: int, x: float, y: float) -> None:
+        self.remove(fid)
+        self.xy[fid] = (x, y)
+        self.cells[self._cell(x, y)].add(fid)
+
+    def remove(self, fid: int) -> None:
+        xy = self.xy.pop(fid, None)
+        if xy is not None:
+            self.cells[self._cell(*xy)].discard(fid)
+
+    def find(self, x: float, y: float) -> list[int]:
+        """Return the feature ids of the nodes within the tolerance of (x, y)."""
+        i, j = self._cell(x, y)
+        return [
+            fid
+            for di in (-1, 0, 1)
+            for dj in (-1, 0, 1)
+            for fid in self.cells.get((i + di, j + dj), ())
+            if math.dist(self.xy[fid], (x, y)) <= self.tolerance
+        ]
+
+
+class LinkConnectivity:
+    """
+    Keep the link properties up to date with the node and link geometries.
+
+    The links that are added or changed in an edit session are tracked through
+    the committed signals of the link layer, such that only those links are
+    connected when editing stops. The nodes are looked up in a NodeIndex that
+    follows the committed changes of the node layer.
+    Since any node change may affect existing links, it makes the next update
+    connect all links again.
+    """
+
+    def __init__(
+        self,
+        node: QgsVectorLayer,
+        link: QgsVectorLayer,
+        tolerance: float | None = None,
+    ):
+        self.node = node
+        self.link = link
+        self.tolerance = snapping_tolerance(node) if tolerance is None else tolerance
+        self.index: NodeIndex | None = None
+        self.changed_links: set[int] = set()
+        self.update_all = True
+
+        node_fields = node.fields()
+        self.type_field = node_fields.indexFromName("node_type")
+        self.id_field = node_fields.indexFromName("node_id")
+        link_fields = link.fields()
+        self.link_fields = [
+            link_fields.indexFromName("from_node_id"),
+            link_fields.indexFromName("to_node_id"),
+            link_fields.indexFromName("link_type"),
+        ]
+
+        link.committedFeaturesAdded.connect(self.links_added)
+        link.committedGeometriesChanges.connect(self.links_moved)
+        link.committedAttributeValuesChanges.connect(self.links_changed)
+        link.committedFeaturesRemoved.connect(self.links_removed)
+        node.committedFeaturesAdded.connect(self.nodes_added)
+        node.committedGeometriesChanges.connect(self.nodes_moved)
+        node.committedAttributeValuesChanges.connect(self.nodes_changed)
+        node.committedFeaturesRemoved.connect(self.nodes_removed)
+
+    def links_added(self, layer_id: str, features: list[QgsFeature]) -> None:
+        self.changed_links.update(feature.id() for feature in features)
+
+    def links_moved(self, layer_id: str, geometries: dict[int, Any]) -> None:
+        self.changed_links.update(geometries.keys())
+
+    def links_changed(self, layer_id: str, changes: dict[int, dict[int, Any]]) -> None:
+        # A manual edit of the link properties is overwritten by the derived values
+        self.changed_links.update(
+            fid
+            for fid, attributes in changes.items()
+            if not attributes.keys().isdisjoint(self.link_fields)
+        )
+
+    def links_removed(self, layer_id: str, fids: list[int]) -> None:
+        self.changed_links.difference_update(fids)
+
+    def nodes_added(self, layer_id: str, features: list[QgsFeature]) -> None:
+        if self.index is not None:
+            for feature in features:
+                point = feature.geometry().asPoint()
+                self.index.insert(feature.id(), point.x(), point.y())
+                self.index.identifiers[feature.id()] = (
+                    feature.attribute(self.type_field),
+                    feature.attribute(self.id_field),
+                )
+        self.update_all = True
+
+    def nodes_moved(self, layer_id: str, geometries: dict[int, Any]) -> None:
+        if self.index is not None:
+            for fid, geometry in geometries.items():
+                point = geometry.asPoint()
+                self.index.insert(fid, point.x(), point.y())
+        self.update_all = True
+
+    def nodes_changed(self, layer_id: str, changes: dict[int, dict[int, Any]]) -> None:
+        fields = (self.type_field, self.id_field)
+        changes = {
+            fid: attributes
+            for fid, attributes in changes.items()
+            if not attributes.keys().isdisjoint(fields)
+        }
+        if not changes:
+            return
+        if self.index is not None:
+            for fid, attributes in changes.items():
+                node_type, node_id = self.index.identifiers[fid]
+                self.index.identifiers[fid] = (
+                    attributes.get(self.type_field, node_type),
+                    attributes.get(self.id_field, node_id),
+                )
+        self.update_all = True
+
+    def nodes_removed(self, layer_id: str, fids: list[int]) -> None:
+        if self.index is not None:
+            for fid in fids:
+                self.index.remove(fid)
+                self.index.identifiers.pop(fid, None)
+        self.update_all = True
+
+    def update(self) -> None:
+        """Set the properties of the changed links, or of all links if needed."""
+        if self.update_all or self.index is None:
+            set_link_properties(self.node, self.link, self.tolerance)
+            self.index = NodeIndex.from_layer(self.node, self.tolerance)
+            self.update_all = False
+        elif self.changed_links:
+            self.update_links(self.index, self.changed_links)
+        self.changed_links.clear()
+
+    def update_links(self, index: NodeIndex, fids: set[int]) -> None:
+        request = (
+            QgsFeatureRequest()
+            .setFilterFids(list(fids))
+            .setSubsetOfAttributes(self.link_fields)
+        )
+        features = list(cast(Iterable[QgsFeature], self.link.getFeatures(request)))
+        vertices = []
+        for feature in features:
+            geometry = feature.geometry().asPolyline()
+            vertices.extend([geometry[0], geometry[-1]])
+
+        matches = [index.find(vertex.x(), vertex.y()) for vertex in vertices]
+        if any(len(match) != 1 for match in matches):
+            xy = np.array([(vertex.x(), vertex.y()) for vertex in vertices])
+            n_match = np.array([len(match) for match in matches])
+            raise snapping_error(xy[n_match == 0], xy[n_match > 1], self.tolerance)
+
+        changes = {}
+        for i, feature in enumerate(features):
+            (fid1,), (fid2,) = matches[2 * i], matches[2 * i + 1]
+            type1, id1 = index.identifiers[fid1]
+            _, id2 = index.identifiers[fid2]
+            values = (id1, id2, infer_link_type(type1))
+            current = tuple(feature.attribute(field) for field in self.link_fields)
+            if values != current:
+                changes[feature.id()] = dict(zip(self.link_fields, values))
+
+        change_attribute_values(self.link, changes)
@@ -0,0 +1,134 @@
+import struct
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from qgis.core import QgsCoordinateReferenceSystem, QgsVectorLayer
+from qgis.testing import unittest
+
+from ribasim_qgis.core.nodes import Link, Node
+from ribasim_qgis.core.topology import (
+    SNAPPING_TOLERANCE,
+    WKB_LINESTRING,
+    WKB_POINT,
+    NodeIndex,
+    _parse_geometries,
+    collect_link_properties,
+    collect_node_properties,
+    derive_connectivity,
+    set_link_properties,
+    snapping_tolerance,
+)
+
+
+def gpkg_blob(wkb_type: int, coords: list[tuple[float, ...]], envelope: int = 0):
+    """Create a little endian GeoPackage geometry blob."""
+    header = b"GP" + bytes([0, 1 | envelope << 1]) + struct.pack("<i", 28992)
+    header += bytes(8 * [0, 4, 6, 6, 8][envelope])
+    body = struct.pack("<BI", 1, wkb_type)
+    if wkb_type % 1000 == WKB_LINESTRING:
+        body += struct.pack("<I", len(coords))
+    for coord in coords:
+        body += struct.pack(f"<{len(coord)}d", *coord)
+    return header + body
+
+
+class TestTopology(unittest.TestCase):
+    def test_parse_points(self):
+        blobs = [gpkg_blob(1, [(0.0, 1.0)]), gpkg_blob(1001, [(2.0, 3.0, 4.0)], 2)]
+        xy, _ = _parse_geometries(blobs, WKB_POINT)
+        np.testing.assert_array_equal(xy, [[0.0, 1.0], [2.0, 3.0]])
+
+    def test_parse_lines(self):
+        blobs = [
+            gpkg_blob(2, [(0.0, 0.0), (1.0, 1.0), (2.0, 0.0)], 1),
+            gpkg_blob(3002, [(5.0, 5.0, 0.0, 0.0), (6.0, 7.0, 0.0, 0.0)]),
+        ]
+        first, last = _parse_geometries(blobs, WKB_LINESTRING)
+        np.testing.assert_array_equal(first, [[0.0, 0.0], [5.0, 5.0]])
+        np.testing.assert_array_equal(last, [[2.0, 0.0], [6.0, 7.0]])
+
+    def test_parse_empty(self):
+        for geometry_type in (WKB_POINT, WKB_LINESTRING):
+            first, last = _parse_geometries([], geometry_type)
+            self.assertEqual(first.shape, (0, 2))
+            self.assertEqual(last.shape, (0, 2))
+
+    def test_parse_unsupported(self):
+        multiline = gpkg_blob(5, [])
+        with self.assertRaises(ValueError):
+            _parse_geometries([multiline], WKB_LINESTRING)
+        with self.assertRaises(ValueError):
+            _parse_geometries([None], WKB_POINT)
+
+    def test_derive_connectivity(self):
+        node_index = np.array([10, 20, 30])
+        node_xy = np.array([[0.0, 0.0], [1.0, 0.0], [2.0, 0.0]])
+        link_xy = np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 0.0], [2.0, 0.0]])
+        from_id, to_id = derive_connectivity(node_index, node_xy, link_xy)
+        np.testing.assert_array_equal(from_id, [10, 20])
+        np.testing.assert_array_equal(to_id, [20, 30])
+
+        # Small offsets are snapped to the nearby node
+        from_id, to_id = derive_connectivity(node_index, node_xy, link_xy + 1e-9)
+        np.testing.assert_array_equal(from_id, [10, 20])
+        np.testing.assert_array_equal(to_id, [20, 30])
+
+        # An empty link layer, with or without nodes
+        for xy in (node_xy, node_xy[:0]):
+            from_id, to_id = derive_connectivity(node_index, xy, link_xy[:0])
+            self.assertEqual(len(from_id), 0)
+            self.assertEqual(len(to_id), 0)
+
+        with self.assertRaisesRegex(ValueError, "not within"):
+            derive_connectivity(node_index, node_xy, link_xy + 0.5)
+        with self.assertRaisesRegex(ValueError, "multiple nodes"):
+            derive_connectivity(node_index, node_xy, link_xy, tolerance=1.5)
+
+    def test_node_index(self):
+        index = NodeIndex(tolerance=0.1, cell_size=10.0)
+        index.insert(1, 0.0, 0.0)
+        index.insert(2, 5.0, 5.0)
+        index.insert(3, 25.0, -5.0)
+        self.assertEqual(index.find(5.0, 5.0), [2])
+        self.assertEqual(index.find(25.0, -5.05), [3])
+        self.assertEqual(index.find(-0.01, 0.0), [1])
+        self.assertEqual(index.find(5.0, 5.5), [])
+
+        # Moving and removing nodes updates the cells
+        index.insert(2, 100.0, 100.0)
+        self.assertEqual(index.find(5.0, 5.0), [])
+        self.assertEqual(index.find(100.0, 100.0), [2])
+        index.remove(1)
+        self.assertEqual(index.find(0.0, 0.0), [])
+
+    def test_empty_layers(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        path = Path(tmp_dir.name) / "database.gpkg"
+        crs = QgsCoordinateReferenceSystem("EPSG:28992")
+        node = Node.create(path, crs, names=[])
+        node.write()
+        link = Link.create(path, crs, names=[])
+        link.write()
+
+        node_xy, node_index, node_identifiers = collect_node_properties(node.layer)
+        self.assertEqual(node_xy.shape, (0, 2))
+        self.assertEqual(len(node_index), 0)
+        self.assertEqual(node_identifiers, {})
+        link_fid, link_xy, link_values = collect_link_properties(link.layer)
+        self.assertEqual(len(link_fid), 0)
+        self.assertEqual(link_xy.shape, (0, 2))
+        self.assertEqual(link_values, [])
+
+        set_link_properties(node.layer, link.layer)
+        self.assertEqual(NodeIndex.from_layer(node.layer).find(0.0, 0.0), [])
+
+    def test_snapping_tolerance(self):
+        projected = QgsVectorLayer("Point?crs=EPSG:28992", "node", "memory")
+        self.assertEqual(snapping_tolerance(projected), SNAPPING_TOLERANCE)
+        # A degree is about 111 km at the equator
+        geographic = QgsVectorLayer("Point?crs=EPSG:4326", "node", "memory")
+        tolerance = snapping_tolerance(geographic)
+        self.assertAlmostEqual(tolerance * 111e3 / SNAPPING_TOLERANCE, 1.0, places=2)
+        self.assertEqual(NodeIndex.from_layer(geographic).tolerance, tolerance)
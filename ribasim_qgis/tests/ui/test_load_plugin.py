@@ -1,3 +1,4 @@
+import tempfile
 from pathlib import Path
 
 from qgis.core import QgsProject
@@ -44,24 +45,31 @@ class TestPlugin(unittest.TestCase):
         ribawidget = ribadock.widget()
         datawidget = ribawidget.tabwidget.widget(0)
 
-        # Write an empty model
-        datawidget._new_model("test.toml")
-        self.assertTrue(Path("test.toml").exists(), "test.toml not created")
-        self.assertTrue(Path("database.gpkg").exists(), "database.gpkg not created")
+        # Write an empty model, outside of the source tree
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        # Cleanups run in reverse, so the layers release the files first
+        self.addCleanup(QgsProject.instance().removeAllMapLayers)
+        directory = Path(tmp_dir.name)
+        toml_path = directory / "test.toml"
+        database_path = directory / "database.gpkg"
+        datawidget._new_model(str(toml_path))
+        self.assertTrue(toml_path.exists(), "test.toml not created")
+        self.assertTrue(database_path.exists(), "database.gpkg not created")
         self.assertTrue(
             len(QgsProject.instance().mapLayers()) == 2,
             "Not just the Node and Link layers",
         )
 
         # Check schema version
-        with sqlite3_cursor("database.gpkg") as cursor:
+        with sqlite3_cursor(database_path) as cursor:
             cursor.execute(
                 "SELECT value FROM ribasim_metadata WHERE key='schema_version'"
             )
             self.assertTrue(int(cursor.fetchone()[0]) == 1, "schema_version is wrong")
 
         # Open the model
-        datawidget._open_model("test.toml")
+        datawidget._open_model(str(toml_path))
         self.assertTrue(
             len(QgsProject.instance().mapLayers()) == 4,
             "Not just the Node and Link layers twice",
@@ -6,6 +6,8 @@ It also allows enabling or disabling individual elements for a computation.
 
 from __future__ import annotations
 
+from collections import defaultdict
+from collections.abc import Iterable
 from datetime import datetime
 from functools import partial
 from pathlib import Path
@@ -28,6 +30,7 @@ from PyQt5.QtWidgets import (
 )
 from qgis.core import (
     QgsEditorWidgetSetup,
+    QgsFeature,
     QgsFeatureRequest,
     QgsMapLayer,
     QgsProject,
@@ -41,7 +44,7 @@ from ribasim_qgis.core.model import (
     get_directory_path_from_model_file,
 )
 from ribasim_qgis.core.nodes import Input, Link, Node, load_nodes_from_geopackage
-from ribasim_qgis.core.topology import set_link_properties
+from ribasim_qgis.core.topology import LinkConnectivity
 
 
 class DatasetTreeWidget(QTreeWidget):
@@ -94,20 +97,20 @@ class DatasetTreeWidget(QTreeWidget):
         assert project is not None
 
         for element in elements:
-            layer = element.layer
+            # Tables that were never loaded have no layer
+            layer = getattr(element, "layer", None)
             # QGIS layers
-            if layer is None:
-                continue
-            try:
-                project.removeMapLayer(layer.id())
-            except (RuntimeError, AttributeError) as e:
-                if e.args[0] in (
-                    "wrapped C/C++ object of type QgsVectorLayer has been deleted",
-                    "'NoneType' object has no attribute 'id'",
-                ):
-                    pass
-                else:
-                    raise
+            if layer is not None:
+                try:
+                    project.removeMapLayer(layer.id())
+                except (RuntimeError, AttributeError) as e:
+                    if e.args[0] in (
+                        "wrapped C/C++ object of type QgsVectorLayer has been deleted",
+                        "'NoneType' object has no attribute 'id'",
+                    ):
+                        pass
+                    else:
+                        raise
 
             # Geopackage
             element.remove_from_geopackage()
@@ -120,6 +123,53 @@ class DatasetTreeWidget(QTreeWidget):
         return
 
 
+class RelationIndex:
+    """
+    An index from the referenced node_id to the feature ids of a referencing layer.
+
+    It is built once, and again after the referencing layer commits changes,
+    such that selecting nodes doesn't need a query per selected node.
+    Changes that bypass the edit buffer, like connecting the links to the nodes,
+    need an explicit `build`.
+    """
+
+    def __init__(self, rel: QgsRelation):
+        self.rel = rel
+        ((self.referencing_field, self.referenced_field),) = rel.fieldPairs().items()
+        self.index: dict[Any, list[int]] = {}
+        referencing = rel.referencingLayer()
+        assert referencing is not None
+        referencing.afterCommitChanges.connect(self.build)
+        self.build()
+
+    def disconnect(self) -> None:
+        """Stop rebuilding the index, for instance when another model is loaded."""
+        try:
+            referencing = self.rel.referencingLayer()
+            if referencing is not None:
+                referencing.afterCommitChanges.disconnect(self.build)
+        except (RuntimeError, TypeError):
+            # The layer has been deleted, or the signal is no longer connected
+            pass
+
+    def build(self) -> None:
+        layer = self.rel.referencingLayer()
+        assert layer is not None
+        field = layer.fields().indexFromName(self.referencing_field)
+        request = (
+            QgsFeatureRequest()
+            .setFlags(QgsFeatureRequest.NoGeometry)
+            .setSubsetOfAttributes([field])
+        )
+        index = defaultdict(list)
+        for feature in cast(Iterable[QgsFeature], layer.getFeatures(request)):
+            index[feature.attribute(field)].append(feature.id())
+        self.index = dict(index)
+
+    def related_ids(self, keys: Iterable[Any]) -> list[int]:
+        return [fid for key in keys for fid in self.index.get(key, ())]
+
+
 class DatasetWidget(QWidget):
     def __init__(self, parent: QWidget):
         from ribasim_qgis.widgets.ribasim_widget import RibasimWidget
@@ -141,8 +191,12 @@ class DatasetWidget(QWidget):
         self.suppress_popup_checkbox.stateChanged.connect(self.suppress_popup_changed)
         self.remove_button.clicked.connect(self.remove_geopackage_layer)
         self.add_button.clicked.connect(self.add_selection_to_qgis)
+        self.dataset_tree.itemDoubleClicked.connect(self.load_item)
         self.link_layer: QgsVectorLayer | None = None
         self.node_layer: QgsVectorLayer | None = None
+        self.connectivity: LinkConnectivity | None = None
+        self.relation_indices: list[RelationIndex] = []
+        self.link_indices: list[RelationIndex] = []
 
         # Layout
         dataset_layout = QVBoxLayout()
@@ -169,9 +223,13 @@ class DatasetWidget(QWidget):
         link = self.link_layer
         assert link is not None
         assert node is not None
+        assert self.connectivity is not None
 
         if (node.featureCount() > 0) and (link.featureCount() > 0):
-            set_link_properties(node, link)
+            self.connectivity.update()
+            # The node IDs are written through the data provider, without a commit signal
+            for index in self.link_indices:
+                index.build()
 
         return
 
@@ -203,10 +261,13 @@ class DatasetWidget(QWidget):
     def add_selection_to_qgis(self) -> None:
         selection = self.dataset_tree.selectedItems()
         for item in selection:
-            self.add_item_to_qgis(item)
+            if getattr(item.element, "layer", None) is None:
+                self.load_item(item)
+            else:
+                self.add_item_to_qgis(item)
 
     @staticmethod
-    def add_relationship(from_layer, to_layer_id, name, fk="node_id") -> None:
+    def add_relationship(from_layer, to_layer_id, name, fk="node_id") -> QgsRelation:
         rel = QgsRelation()
         rel.setReferencingLayer(from_layer.id())
         rel.setReferencedLayer(to_layer_id)
@@ -230,15 +291,22 @@ class DatasetWidget(QWidget):
             },
         )
         from_layer.setEditorWidgetSetup(field_index, setup)
+        return rel
 
     def load_geopackage(self) -> None:
-        """Load the layers of a GeoPackage into the Layers Panel."""
+        """
+        Load the layers of a GeoPackage into the Layers Panel.
+
+        Only the Node, Link and Basin / area layers are loaded directly, the other
+        tables are added to the dataset tree, and loaded when they are requested.
+        """
         self.dataset_tree.clear()
         geo_path = get_database_path_from_model_file(self.path)
         nodes = load_nodes_from_geopackage(geo_path)
 
         name = self.path.stem
         self.ribasim_widget.create_groups(name)
+        self.disconnect_layers()
 
         # Make sure "Node", "Link", "Basin / area" are the top three layers
         node = nodes.pop("Node")
@@ -246,65 +314,107 @@ class DatasetWidget(QWidget):
         self.add_item_to_qgis(item)
         # Make sure node_id shows up in relationships
         node.layer.setDisplayExpression("node_id")
+        self.node_layer = node.layer
+        assert self.node_layer is not None
 
         link = nodes.pop("Link")
         item = self.dataset_tree.add_node_layer(link)
         self.add_item_to_qgis(item)
-        self.add_relationship(
-            link.layer, node.layer.id(), "LinkFromNode", "from_node_id"
+        # Link relations are special, they have two references to the Node table
+        self.link_indices = [
+            RelationIndex(
+                self.add_relationship(
+                    link.layer, node.layer.id(), "LinkFromNode", "from_node_id"
+                )
+            ),
+            RelationIndex(
+                self.add_relationship(
+                    link.layer, node.layer.id(), "LinkToNode", "to_node_id"
+                )
+            ),
+        ]
+        self.relation_indices.extend(self.link_indices)
+        # When the Node selection changes, select the related links
+        self.node_layer.selectionChanged.connect(
+            partial(self.filter_by_relation, self.link_indices)
         )
-        self.add_relationship(link.layer, node.layer.id(), "LinkToNode", "to_node_id")
 
         basin_area_layer = nodes.pop("Basin / area", None)
         if basin_area_layer is not None:
             item = self.dataset_tree.add_node_layer(basin_area_layer)
             self.add_item_to_qgis(item)
-            self.add_relationship(
-                basin_area_layer.layer, node.layer.id(), "Basin / area"
-            )
+            self.add_related_table(basin_area_layer)
 
-        # Add the remaining layers
-        for table_name, node_layer in nodes.items():
+        # Add the remaining tables, without loading them
+        for node_layer in nodes.values():
             item = self.dataset_tree.add_node_layer(node_layer)
-            self.add_item_to_qgis(item)
-            self.add_relationship(node_layer.layer, node.layer.id(), table_name)
+            item.setToolTip(0, "Double-click or add to QGIS to load this table")
 
         # Connect node and link layer to derive connectivities.
-        self.node_layer = node.layer
-        assert self.node_layer is not None
         self.link_layer = link.layer
+        # Only the links that changed in an edit session are connected again.
+        self.connectivity = LinkConnectivity(self.node_layer, self.link_layer)
         self.link_layer.editingStopped.connect(self.connect_nodes)
+        return
 
-        def filterbyrel(relationships, feature_ids):
-            """Filter all related tables by the selected features in the node table."""
-            ids = []
-            selection = QgsFeatureRequest().setFilterFids(feature_ids)
-            for rel in relationships:
-                for feature in rel.referencedLayer().getFeatures(selection):
-                    ids.extend(f.id() for f in rel.getRelatedFeatures(feature))
-
-            rel.referencingLayer().selectByIds(ids)
+    def disconnect_layers(self) -> None:
+        """Disconnect the signals of the layers of the previously loaded model."""
+        for index in self.relation_indices:
+            index.disconnect()
+        self.relation_indices = []
+        self.link_indices = []
+        if self.link_layer is not None:
+            try:
+                self.link_layer.editingStopped.disconnect(self.connect_nodes)
+            except (RuntimeError, TypeError):
+                pass
+        self.link_layer = None
+        self.connectivity = None
+
+    def add_related_table(self, element: Input) -> None:
+        """Relate a loaded table to the Node table, and filter it by the node selection."""
+        assert self.node_layer is not None
+        rel = self.add_relationship(
+            element.layer, self.node_layer.id(), element.input_type()
+        )
+        index = RelationIndex(rel)
+        self.relation_indices.append(index)
+        self.node_layer.selectionChanged.connect(
+            partial(self.filter_by_relation, [index])
+        )
 
-        # When the Node selection changes, filter all related tables
-        link_rels = []
-        instance = QgsProject.instance()
-        assert instance is not None
-        rel_manager = instance.relationManager()
-        assert rel_manager is not None
-        for rel in rel_manager.relations().values():
-            # Link relations are special, they have two references to the Node table
-            referencing = rel.referencingLayer()
-            referenced = rel.referencedLayer()
-            assert referencing is not None
-            assert referenced is not None
-
-            if referencing.name() == "Link":
-                link_rels.append(rel)
-            else:
-                referenced.selectionChanged.connect(partial(filterbyrel, [rel]))
+    def load_item(self, item) -> None:
+        """Load a table of the dataset tree that has not been loaded yet."""
+        if getattr(item.element, "layer", None) is not None:
+            return
+        item.setToolTip(0, "")
+        self.add_item_to_qgis(item)
+        self.add_related_table(item.element)
 
-        self.node_layer.selectionChanged.connect(partial(filterbyrel, link_rels))
-        return
+    @staticmethod
+    def filter_by_relation(indices: list[RelationIndex], feature_ids) -> None:
+        """Filter a related table by the selected features in the referenced table."""
+        if not indices:
+            return
+        rel = indices[0].rel
+        referenced = rel.referencedLayer()
+        referencing = rel.referencingLayer()
+        assert referenced is not None
+        assert referencing is not None
+
+        field = indices[0].referenced_field
+        request = (
+            QgsFeatureRequest()
+            .setFilterFids(feature_ids)
+            .setFlags(QgsFeatureRequest.NoGeometry)
+            .setSubsetOfAttributes([field], referenced.fields())
+        )
+        keys = [
+            feature.attribute(field)
+            for feature in cast(Iterable[QgsFeature], referenced.getFeatures(request))
+        ]
+        ids = [fid for index in indices for fid in index.related_ids(keys)]
+        referencing.selectByIds(ids)
 
     def new_model(self) -> None:
         """Create a new Ribasim model file, and set it as the active dataset."""
@@ -362,7 +472,7 @@ class DatasetWidget(QWidget):
     def suppress_popup_changed(self):
         suppress = self.suppress_popup_checkbox.isChecked()
         for item in self.dataset_tree.items():
-            layer = item.element.layer
+            layer = getattr(item.element, "layer", None)
             if layer is not None:
                 config = layer.editFormConfig()
                 config.setSuppress(suppress)
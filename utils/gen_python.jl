@@ -13,6 +13,12 @@ pythontype(::Type{<:Bool}) = "Series[Annotated[pd.ArrowDtype, pyarrow.bool_()]]"
 pythontype(::Type{<:Enum}) = "Series[Annotated[pd.ArrowDtype, pyarrow.string()]]"
 pythontype(::Type{<:DateTime}) = "Series[Annotated[pd.ArrowDtype, pyarrow.timestamp('ms')]]"
 
+# Low cardinality string columns are stored as pandas categoricals, to save memory.
+const CATEGORICAL_COLUMNS = (:substance, :control_state)
+
+pythontype(name::Symbol, T::Type) =
+    name in CATEGORICAL_COLUMNS ? "Series[pd.CategoricalDtype]" : pythontype(T)
+
 isnullable(::Any) = "False"
 isnullable(::Type{T}) where {T >: Union{Missing}} = "True"
 
@@ -31,7 +37,7 @@ function get_models()
             name = strip_prefix(T),
             fields = zip(
                 fieldnames(T),
-                map(pythontype, fieldtypes(T)),
+                map(pythontype, fieldnames(T), fieldtypes(T)),
                 map(isnullable, fieldtypes(T)),
             ),
         ) for T in subtypes(Legolas.AbstractRecord)
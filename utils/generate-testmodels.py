@@ -1,9 +1,14 @@
+import hashlib
+import inspect
+import json
 import multiprocessing
+import os
 import shutil
 import sys
 from functools import partial
 from pathlib import Path
 
+import ribasim
 import ribasim_testmodels
 
 selection = (
@@ -11,19 +16,53 @@ selection = (
 )
 
 
+# The package files that affect the generated models: the code,
+# the Delwaq templates and the layer styles written to the GeoPackage
+SOURCE_PATTERNS = ("*.py", "*.j2", "*.qml")
+# Directories with build or run output, such as the Delwaq model directory
+GENERATED_DIRS = {"__pycache__", "model", "results"}
+
+
+def ribasim_digest() -> str:
+    """Hash the version and the source files of the ribasim package."""
+    digest = hashlib.sha256(ribasim.__version__.encode())
+    package_dir = Path(ribasim.__file__).parent
+    paths = {
+        path
+        for pattern in SOURCE_PATTERNS
+        for path in package_dir.rglob(pattern)
+        if GENERATED_DIRS.isdisjoint(path.relative_to(package_dir).parts[:-1])
+    }
+    for path in sorted(paths):
+        digest.update(path.relative_to(package_dir).as_posix().encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def model_digest(model_constructor, package_digest: str) -> str:
+    """Hash the source of the module that defines the model, and the ribasim package.
+
+    The whole module is hashed, since constructors may use helpers from the same module.
+    """
+    module = inspect.getmodule(model_constructor)
+    digest = hashlib.sha256(package_digest.encode())
+    digest.update(model_constructor.__name__.encode())
+    digest.update(inspect.getsource(module).encode())
+    return digest.hexdigest()
+
+
 def generate_model(args, datadir):
     model_name, model_constructor = args
+    model_dir = datadir / model_name
+    # Remove stale files, such as Arrow tables that are no longer used
+    shutil.rmtree(model_dir, ignore_errors=True)
     model = model_constructor()
-    model.write(datadir / model_name / "ribasim.toml")
+    model.write(model_dir / "ribasim.toml")
     return model_name
 
 
 if __name__ == "__main__":
     datadir = Path("generated_testmodels")
-    # Don't remove all models if we only (re)generate a subset
-    if datadir.is_dir() and len(sys.argv) == 0:
-        shutil.rmtree(datadir, ignore_errors=True)
-
     datadir.mkdir(exist_ok=True)
     readme = datadir / "README.md"
     readme.write_text(
@@ -34,12 +73,37 @@ The content of this directory are generated testmodels for Ribasim
 Don't put important stuff in here, it will be emptied for every run."""
     )
 
-    generate_model_partial = partial(generate_model, datadir=datadir)
+    # The manifest stores the digest of each generated model,
+    # such that unchanged models are not generated again.
+    manifest_path = datadir / "manifest.json"
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.is_file() else {}
 
+    package_digest = ribasim_digest()
+    digests = {
+        model_name: model_digest(model_constructor, package_digest)
+        for model_name, model_constructor in ribasim_testmodels.constructors.items()
+        if model_name in selection
+    }
     models = [
-        (k, v) for k, v in ribasim_testmodels.constructors.items() if k in selection
+        (model_name, ribasim_testmodels.constructors[model_name])
+        for model_name, digest in digests.items()
+        if manifest.get(model_name) != digest
+        or not (datadir / model_name / "ribasim.toml").is_file()
     ]
+    n_skipped = len(digests) - len(models)
+    if n_skipped > 0:
+        print(f"Skipped {n_skipped} up to date models")
 
-    with multiprocessing.Pool(processes=4) as p:
-        for model_name in p.imap_unordered(generate_model_partial, models):
-            print(f"Generated {model_name}")
+    if models:
+        generate_model_partial = partial(generate_model, datadir=datadir)
+        n_cpu = (
+            len(os.sched_getaffinity(0))
+            if hasattr(os, "sched_getaffinity")
+            else os.cpu_count() or 1
+        )
+        with multiprocessing.Pool(processes=min(n_cpu, len(models))) as p:
+            for model_name in p.imap_unordered(generate_model_partial, models):
+                manifest[model_name] = digests[model_name]
+                print(f"Generated {model_name}")
+                # Write the manifest as we go, such that an interrupted run keeps its progress
+                manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))